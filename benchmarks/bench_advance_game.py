@@ -0,0 +1,113 @@
+"""
+Engine overhead per action for GameManager.
+
+Plays RandomPlayer games and times only the engine calls
+(advance_game_to_next_action + process_player_action), not the players'
+decisions. Actions are bucketed by their index in the game, so a cost that
+grows with history length shows up as a rising curve.
+
+    python benchmarks/bench_advance_game.py --games 200 --missions 3
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from collections import defaultdict
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+def decide(player, action):
+    if action is SelectRoleAction:
+        return player.select_role({})
+    if action is DiscardableCardAction:
+        return player.play_card({}, discardable=True)
+    if action is PlayCardAction:
+        return player.play_card({})
+    if action is NominatePlayerAction:
+        return player.nominate_player({})
+    if action is VoteAction:
+        return player.vote({})
+    return player.participate_in_discussion({})
+
+
+def play_one(seed, missions, events, bucket_size, advance_buckets, process_buckets):
+    players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+    gm = GameManager(players, total_missions=missions, events_per_mission=events,
+                     turn_based_chat=True, seed=seed)
+    gm.start_mission()
+    n_actions = 0
+    engine = 0.0
+    while True:
+        t0 = time.perf_counter()
+        over = gm.game_over()
+        pending = {} if over else gm.advance_game_to_next_action()
+        dt = time.perf_counter() - t0
+        engine += dt
+        advance_buckets[n_actions // bucket_size].append(dt)
+        if over or pending == 'quit_game' or gm.game_over():
+            break
+        for player in gm.players:
+            for action in pending.get(player.player_id, []):
+                act = decide(player, action)
+                t0 = time.perf_counter()
+                gm.process_player_action(act)
+                dt = time.perf_counter() - t0
+                engine += dt
+                process_buckets[n_actions // bucket_size].append(dt)
+                n_actions += 1
+    return n_actions, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--missions', type=int, default=3)
+    parser.add_argument('--events', type=int, default=5)
+    parser.add_argument('--bucket', type=int, default=25, help='actions per bucket in the per-position table')
+    args = parser.parse_args()
+
+    advance_buckets, process_buckets = defaultdict(list), defaultdict(list)
+    total_actions, total_engine = 0, 0.0
+    # GameManager creates game_logs/ in the cwd; keep it out of the tree
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            wall = time.perf_counter()
+            for g in range(args.games):
+                n, engine = play_one(g, args.missions, args.events, args.bucket, advance_buckets, process_buckets)
+                total_actions += n
+                total_engine += engine
+            wall = time.perf_counter() - wall
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+
+    print(f'{args.games} games, {total_actions} actions, {wall:.2f}s wall')
+    print(f'engine time per action: {1e6 * total_engine / total_actions:.1f} us '
+          '(advance_game_to_next_action + process_player_action)')
+    print(f'{"actions":>12} {"median advance (us)":>20} {"median process (us)":>20}')
+    for b in sorted(process_buckets):
+        lo, hi = b * args.bucket, (b + 1) * args.bucket - 1
+        advance = 1e6 * statistics.median(advance_buckets[b])
+        process = 1e6 * statistics.median(process_buckets[b])
+        print(f'{lo:>5}-{hi:<6} {advance:>20.2f} {process:>20.2f}')
+
+
+if __name__ == '__main__':
+    main()
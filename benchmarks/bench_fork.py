@@ -0,0 +1,101 @@
+"""
+Cost of counterfactual rollouts with GameManager.fork().
+
+Plays a RandomPlayer game up to the first retreat vote of a mission, then
+forks it repeatedly and plays every fork to the end.
+
+    python benchmarks/bench_fork.py --forks 2000 --rollouts 500
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from collections import Counter
+
+from deceptiongame.online_game_manager import GameManager, Phase
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+def act(gm, pending):
+    for player in gm.players:
+        for action in pending.get(player.player_id, []):
+            if action is SelectRoleAction:
+                chosen = player.select_role({})
+            elif action is DiscardableCardAction:
+                chosen = player.play_card({}, discardable=True)
+            elif action is PlayCardAction:
+                chosen = player.play_card({})
+            elif action is NominatePlayerAction:
+                chosen = player.nominate_player({})
+            elif action is VoteAction:
+                chosen = player.vote({})
+            else:
+                chosen = player.participate_in_discussion({})
+            gm.process_player_action(chosen)
+
+
+def play_out(gm):
+    while not gm.game_over():
+        pending = gm.advance_game_to_next_action()
+        if pending == 'quit_game':
+            break
+        act(gm, pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--forks', type=int, default=2000)
+    parser.add_argument('--rollouts', type=int, default=500)
+    parser.add_argument('--mission', type=int, default=2, help='branch at the first vote of this mission')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+            gm = GameManager(players, total_missions=3, turn_based_chat=True, seed=args.seed)
+            gm.start_mission()
+            while True:
+                pending = gm.advance_game_to_next_action()
+                if gm.phase is Phase.VOTE and gm.current_mission >= args.mission:
+                    break
+                act(gm, pending)
+
+            t0 = time.perf_counter()
+            for _ in range(args.forks):
+                gm.fork()
+            fork_time = time.perf_counter() - t0
+
+            outcomes = Counter()
+            t0 = time.perf_counter()
+            for _ in range(args.rollouts):
+                fork = gm.fork()
+                play_out(fork)
+                outcomes[max(fork.cumulative_scores, key=fork.cumulative_scores.get)] += 1
+            rollout_time = time.perf_counter() - t0
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+
+    print(f'branch point: mission {gm.current_mission}, event {gm.mission.mission_event_idx}, phase {gm.phase.value}')
+    print(f'fork():           {1e6 * fork_time / args.forks:8.1f} us  ({args.forks / fork_time:,.0f} forks/s)')
+    print(f'fork + rollout:   {1e3 * rollout_time / args.rollouts:8.2f} ms  ({args.rollouts / rollout_time:,.0f} rollouts/s)')
+    print('top scorer over rollouts:', {NAMES[pid]: n for pid, n in sorted(outcomes.items())})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Prompt tokens per game, and how much of each prompt a prefix cache could
+reuse, per OnlineAI prompt mode and layout.
+
+Serves a local OpenAI-compatible stub that answers every request with a
+random valid choice and keeps the prompts, plays `--games` games with five
+OnlineAI players against it for each mode and layout, and reports the prompt
+tokens sent per game (approximated as characters / 4), and per call how long
+a prefix the prompt shares with the same player's previous call and with
+any earlier call (what vLLM's automatic prefix caching can reuse, up to its
+block size). "new tokens/game" leaves out the prefix shared with the same
+player's previous call, the tokens a warm prefix cache would still compute.
+The system prompt is the same in every call, so the sharing within the rest
+of the prompt, where the layouts differ, is reported as well. The stub answers
+a player's n-th call the same way in every mode and layout, so for a seed they
+all play the same game and make the same calls.
+
+    python benchmarks/bench_prefix_cache.py --games 3 --missions 3
+"""
+import os
+import sys
+import json
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.player_llm import OnlineAI, PROMPT_LAYOUTS
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    /v1/chat/completions stub; `prompts` holds (player, flattened messages) per request in arrival order.
+    The answer to a player's n-th call depends only on (seed, player, n), not on the order concurrent
+    requests arrive in, so every mode and layout plays the same game for a seed.
+    """
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.reset(0)
+
+    def reset(self, seed):
+        self.seed = seed
+        self.prompts.clear()
+        self.n_calls = Counter()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in two writes, don't let them wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        messages = request["messages"]
+        player = messages[-1]["content"].split(",", 1)[0]
+        prompt = "".join(f"<{m['role']}>{m['content']}" for m in messages)
+        with self.server.lock:
+            self.server.prompts.append((player, prompt))
+            n = self.server.n_calls[player]
+            self.server.n_calls[player] += 1
+        rng = random.Random(f"{self.server.seed}/{player}/{n}")
+        properties = request.get("guided_json", {}).get("properties", {})
+        answer = {name: rng.choice(p.get("enum") or [p.get("const", "I have nothing to add.")])
+                  for name, p in properties.items()}
+        content = json.dumps(answer) if properties else "Nothing stood out this mission."
+        body = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def play(url, mode, layout, seed, missions):
+    players = [OnlineAI(i, name, model_name="llama-3.3", url=url, prompt_mode=mode, prompt_layout=layout,
+                        summarization_level=2)
+               for i, name in enumerate(NAMES)]
+    gm = GameManager(players, total_missions=missions, turn_based_chat=True, seed=seed)
+    gm.start_mission()
+    pending = gm.advance_game_to_next_action()
+    while not gm.game_over():
+        state = gm.get_state()
+        results = await asyncio.gather(*(players[pid].perform_action(actions, state) for pid, actions in pending.items()))
+        for actions in results:
+            for action in actions:
+                gm.process_player_action(action)
+        pending = gm.advance_game_to_next_action()
+
+
+def common_prefix(a, b):
+    """ Length of the common prefix of a and b, by bisection on slice comparisons. """
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def shared_prefixes(prompts):
+    """
+    Per call: prompt length, prefix shared with the player's previous call, longest prefix shared with
+    any earlier call, length after the system prompt and its part of the prefix shared with the previous call.
+    """
+    previous = {}
+    seen = []
+    rows = []
+    for player, prompt in prompts:
+        own = common_prefix(previous[player], prompt) if player in previous else 0
+        best = max((common_prefix(earlier, prompt) for earlier in seen), default=0)
+        user_start = prompt.index("<user>")
+        rows.append((len(prompt), own, best, len(prompt) - user_start, max(0, own - user_start)))
+        previous[player] = prompt
+        seen.append(prompt)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=3)
+    parser.add_argument('--missions', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    configs = [("state", layout) for layout in PROMPT_LAYOUTS] + [("transcript", "default")]
+    results = defaultdict(list)
+    # calls per player of each game, the same for every config if they played the same games
+    calls = defaultdict(list)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            for config in configs:
+                for seed in range(args.games):
+                    server.reset(seed)
+                    asyncio.run(play(url, *config, seed, args.missions))
+                    results[config].extend(shared_prefixes(server.prompts))
+                    calls[config].append(dict(server.n_calls))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+            server.shutdown()
+
+    if any(games != calls[configs[0]] for games in calls.values()):
+        print("warning: the configs played different games, tokens/game are not comparable")
+    print(f"{'mode':>10} {'layout':>8} {'calls':>6} {'tokens/game':>12} {'new tokens/game':>16} {'chars/call':>11} "
+          f"{'same player':>12} {'any earlier':>12} {'after system, same player':>26}")
+    for (mode, layout), rows in results.items():
+        total, own, best, user, user_own = (sum(column) for column in zip(*rows))
+        print(f"{mode:>10} {layout:>8} {len(rows):6d} {total / 4 / args.games:12.0f} {(total - own) / 4 / args.games:16.0f} "
+              f"{total / len(rows):11.0f} {100 * own / total:11.1f}% {100 * best / total:11.1f}% {100 * user_own / user:25.1f}%")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Prompt assembly time per decision, with the theme compiled once per process
+against the per-call theme lookups it replaced.
+
+Plays a game with random players for each theme and keeps the state at every
+decision, then times, for an OnlineAI in the deciding player's seat:
+
+  setup         theme, rules.md and system prompt of a new player
+  instructions  the action instructions of the decision
+  event card    the themed event card JSON
+  state         the whole game state prompt, rendered without the prompt cache
+
+"before" fills the INSTRUCTIONS templates with a term lookup per field, runs
+the chain of str.replace over the card JSON on every call and imports the
+theme for every player, as OnlineAI did before themed_prompts; "after" is
+OnlineAI as it is. No model is called.
+
+    python benchmarks/bench_prompt_assembly.py --themes default hospital --repeat 20
+"""
+import os
+import sys
+import string
+import random
+import pathlib
+import argparse
+import importlib
+import tempfile
+import time
+from unittest import mock
+
+from deceptiongame import player_llm
+from deceptiongame.decks import EventCard
+from deceptiongame.llm_instructions import INSTRUCTIONS
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+from deceptiongame.player_llm import OnlineAI
+from deceptiongame.themed_prompts import EVENT_CARD_TERMS, themed_prompts
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+# fields filled per call, everything else in the templates is a theme term
+CALL_FIELDS = {"available_roles", "hand_cards", "other_players"}
+ACTION_KEYS = {
+    SelectRoleAction: "select_role",
+    DiscardableCardAction: "play_card_discardable",
+    PlayCardAction: "play_card_non_discardable",
+    NominatePlayerAction: "nominate",
+    VoteAction: "vote",
+}
+
+
+def legacy_term(theme, key):
+    """ OnlineAI._get_theme_term before themed_prompts. """
+    keyl = key.lower()
+    if not theme or "terms" not in theme:
+        raise ValueError("Theme terms not defined")
+    if keyl not in theme["terms"]:
+        raise KeyError(f"Term not defined: {key}")
+    result = theme["terms"][keyl]
+    if key[0].isupper():
+        return result[0].upper() + result[1:]
+    return result
+
+
+def legacy_card_info(card, **kwargs):
+    """ EventCard.get_card_info_formatted before it kept its result. """
+    result = card.slot_json_string
+    for key, value in kwargs.items():
+        result = result.replace(f"{{{{{key}}}}}", value)
+    return result
+
+
+def legacy_setup(theme_name):
+    theme = getattr(importlib.import_module(f"deceptiongame.themes.{theme_name}.theme"), f"{theme_name.upper()}_THEME")
+    with open(pathlib.Path(player_llm.__file__).parent / "themes" / theme_name / "rules.md", encoding="utf8") as f:
+        rules_md = f.read()
+    return theme, INSTRUCTIONS["system_prompt_template"].format(rules_md=rules_md)
+
+
+def decide(player, action):
+    if action is SelectRoleAction:
+        return player.select_role({})
+    if action is DiscardableCardAction:
+        return player.play_card({}, discardable=True)
+    if action is PlayCardAction:
+        return player.play_card({})
+    if action is NominatePlayerAction:
+        return player.nominate_player({})
+    if action is VoteAction:
+        return player.vote({})
+    return player.participate_in_discussion({})
+
+
+def record_decisions(theme, seed):
+    """ (player id, INSTRUCTIONS key, state) of every decision but the discussion in a game of random players. """
+    players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+    for player in players:
+        # the OnlineAI renderers find their seat by username
+        player.username = player.name
+    gm = GameManager(players, total_missions=3, turn_based_chat=True, seed=seed, theme=theme)
+    gm.start_mission()
+    decisions = []
+    while not gm.game_over():
+        pending = gm.advance_game_to_next_action()
+        for pid, actions in pending.items():
+            for action in actions:
+                if action in ACTION_KEYS:
+                    # a fork keeps the state as it is now
+                    decisions.append((pid, ACTION_KEYS[action], gm.fork().get_state()))
+                gm.process_player_action(decide(gm.player_from_id(pid), action))
+    return decisions
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_theme(theme, decisions, repeat):
+    renderers = [OnlineAI(i, name, model_name="llama-3.3", url="http://localhost:1/v1", theme_name=theme)
+                 for i, name in enumerate(NAMES)]
+    for renderer in renderers:
+        renderer.cache_prompts = False
+    prompts = themed_prompts(theme)
+    fields = {key: [f for _, f, _, _ in string.Formatter().parse(INSTRUCTIONS[key]) if f and f not in CALL_FIELDS]
+              for key in set(ACTION_KEYS.values())}
+    call_fields = {"available_roles": "a, b", "hand_cards": "a, b, c", "other_players": "Bob, Eve, Unknown"}
+    cards = [state["event_card"] for _, _, state in decisions if state.get("event_card")]
+
+    def instructions_before():
+        for _, key, _ in decisions:
+            INSTRUCTIONS[key].format(**{f: legacy_term(prompts.theme, f) for f in fields[key]}, **call_fields)
+
+    def instructions_after():
+        for _, key, _ in decisions:
+            prompts.instructions[key].format(**call_fields)
+
+    def cards_before():
+        for card in cards:
+            legacy_card_info(card, **{term: legacy_term(prompts.theme, term) for term in EVENT_CARD_TERMS})
+
+    def cards_after():
+        for card in cards:
+            card.get_card_info_formatted(**prompts.event_card_terms)
+
+    def states():
+        for pid, _, state in decisions:
+            renderers[pid].rng = random.Random(0)
+            renderers[pid]._build_game_state_prompt(state, is_summary=False)
+
+    def states_before():
+        with mock.patch.object(EventCard, "get_card_info_formatted", legacy_card_info):
+            for renderer in renderers:
+                renderer._get_theme_term = lambda key: legacy_term(prompts.theme, key)
+            try:
+                states()
+            finally:
+                for renderer in renderers:
+                    del renderer._get_theme_term
+
+    n = len(decisions)
+    return {
+        "setup": (timed(lambda: legacy_setup(theme), repeat),
+                  timed(lambda: themed_prompts(theme).system_prompts["default"], repeat), 1),
+        "instructions": (timed(instructions_before, repeat), timed(instructions_after, repeat), n),
+        "event card": (timed(cards_before, repeat), timed(cards_after, repeat), max(1, len(cards))),
+        "state": (timed(states_before, repeat), timed(states, repeat), n),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--themes', nargs="+", default=["default", "hospital"])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            for theme in args.themes:
+                results[theme] = bench_theme(theme, record_decisions(theme, args.seed), args.repeat)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+
+    print(f"{'theme':>16} {'part':>13} {'before us/call':>15} {'after us/call':>14} {'speedup':>8}")
+    for theme, parts in results.items():
+        for part, (before, after, n) in parts.items():
+            print(f"{theme:>16} {part:>13} {1e6 * before / n:15.2f} {1e6 * after / n:14.2f} {before / after:7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Cost of aggregating a log directory from full traces vs summary sidecars.
+
+Plays `--games` seeded RandomPlayer games with save_trace on, then reads every
+game back three ways: parsing the full trace, streaming its records through
+summarize_records, and reading only the summary sidecar that the tracer
+writes when a game finishes.
+
+    python benchmarks/bench_summaries.py --games 200 --trace_format json
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+from deceptiongame.tracer import Tracer, find_traces, iter_summaries, load_trace, summarize_records, summarize_trace
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+def play(seed, trace_format):
+    players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+    gm = GameManager(players, total_missions=3, turn_based_chat=True,
+                     save_trace=True, seed=seed, trace_format=trace_format)
+    gm.start_mission()
+    while not gm.game_over():
+        pending = gm.advance_game_to_next_action()
+        if pending == 'quit_game':
+            break
+        for player in players:
+            for action in pending.get(player.player_id, []):
+                if action is SelectRoleAction:
+                    chosen = player.select_role({})
+                elif action is DiscardableCardAction:
+                    chosen = player.play_card({}, discardable=True)
+                elif action is PlayCardAction:
+                    chosen = player.play_card({})
+                elif action is NominatePlayerAction:
+                    chosen = player.nominate_player({})
+                elif action is VoteAction:
+                    chosen = player.vote({})
+                else:
+                    chosen = player.participate_in_discussion({})
+                gm.process_player_action(chosen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--trace_format', choices=['json', 'jsonl'], default='json')
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            for seed in range(args.games):
+                play(seed, args.trace_format)
+
+            t0 = time.perf_counter()
+            full = [summarize_trace(load_trace(path)) for path in find_traces('game_logs')]
+            full_time = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            streamed = [summarize_records(Tracer.iter_records(path)) for path in find_traces('game_logs')]
+            stream_time = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            sidecars = [summary for _, summary in iter_summaries('game_logs', fallback=False)]
+            sidecar_time = time.perf_counter() - t0
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+
+    assert len(full) == len(streamed) == len(sidecars) == args.games
+    for name, elapsed in (('full trace', full_time), ('streamed', stream_time), ('sidecar', sidecar_time)):
+        print(f'{name:>10}: {1e3 * elapsed / args.games:6.2f} ms/game, '
+              f'{10000 * elapsed / args.games:6.1f} s per 10k games')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Cost of saving the trace while a game runs: json, jsonl written inline, and
+jsonl written by the background TraceWriter.
+
+Plays the same seeded RandomPlayer games with save_trace on in each mode and
+reports wall time per game and bytes written. The json tracer rewrites the
+whole file on every step, so its cost grows with the square of game length.
+On a fast local disk the background writer mostly adds queue overhead; it
+pays off when flushes are slow (network filesystems, fsync='flush').
+
+    python benchmarks/bench_trace.py --missions 3 10 --games 3
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+MODES = {
+    'json': ('json', None),
+    'jsonl-sync': ('jsonl', {'background': False}),
+    'jsonl-bg': ('jsonl', {'background': True}),
+}
+
+
+def play(seed, total_missions, mode, fsync):
+    trace_format, trace_options = MODES[mode]
+    if trace_options is not None:
+        trace_options = {**trace_options, 'fsync': fsync}
+    players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+    gm = GameManager(players, total_missions=total_missions, turn_based_chat=True,
+                     save_trace=True, seed=seed, trace_format=trace_format, trace_options=trace_options)
+    gm.start_mission()
+    while not gm.game_over():
+        pending = gm.advance_game_to_next_action()
+        if pending == 'quit_game':
+            break
+        for player in players:
+            for action in pending.get(player.player_id, []):
+                if action is SelectRoleAction:
+                    chosen = player.select_role({})
+                elif action is DiscardableCardAction:
+                    chosen = player.play_card({}, discardable=True)
+                elif action is PlayCardAction:
+                    chosen = player.play_card({})
+                elif action is NominatePlayerAction:
+                    chosen = player.nominate_player({})
+                elif action is VoteAction:
+                    chosen = player.vote({})
+                else:
+                    chosen = player.participate_in_discussion({})
+                gm.process_player_action(chosen)
+    return gm.tracer._trace_save_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--missions', type=int, nargs='+', default=[3, 10])
+    parser.add_argument('--games', type=int, default=3)
+    parser.add_argument('--fsync', choices=['never', 'close', 'flush'], default='close')
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            for total_missions in args.missions:
+                for mode in MODES:
+                    t0 = time.perf_counter()
+                    paths = [play(seed, total_missions, mode, args.fsync) for seed in range(args.games)]
+                    elapsed = time.perf_counter() - t0
+                    size = sum(os.path.getsize(p) for p in paths) / len(paths)
+                    results.append((total_missions, mode, elapsed / args.games, size))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+
+    print(f'{"missions":>8} {"mode":>10} {"ms/game":>10} {"KB/file":>9}')
+    for total_missions, mode, per_game, size in results:
+        print(f'{total_missions:>8} {mode:>10} {1e3 * per_game:>10.1f} {size / 1024:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
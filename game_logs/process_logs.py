@@ -1,38 +1,29 @@
 import sys
-import glob
-import json
 from collections import defaultdict
 import pandas as pd
 
+from deceptiongame.tracer import iter_summaries
+
 
 # aggregator[(model, theme)] = { 'n_cooperator': int, 'n_defector': int, 'total': int }
 aggregator = defaultdict(lambda: {'n_cooperator': 0, 'n_defector': 0, 'total': 0, 'n_games': 0})
 
-for path in glob.glob('*.json'):
-    with open(path, 'r') as f:
-        data = json.load(f)
-
+# per-game summary sidecars, the full trace is only parsed for games without one
+for path, summary in iter_summaries('.'):
     # assume all players use same model
     # TODO change when players differ
-    model = data['config']['players'][0]['model_name']
-    prompt = data['prompt_templates']['system_prompt']
-    try:
-        theme = data['config']['theme']
-    except:
-        theme = None        
-        raise ValueError(prompt + path)
+    model = summary['players'][0]['model_name']
+    theme = summary['theme']
+    if theme is None:
+        raise ValueError('No theme in ' + path)
     
     if model is None:
         print('Model is None ' + path + "Is likely a default game with stub players, skipping...")
         continue
     entry = aggregator[(model, theme)]
     entry['n_games'] += 1
-    for mission_id, mission in enumerate(data.get('missions', [])):
-        # adjust if your logs name this field differently
-        for action in mission.get('actions', []):
-            if action.get('phase') != 'select_role':
-                continue
-            role = action['payload'].get('role_default_theme')
+    for mission_id, mission in enumerate(summary['missions']):
+        for role in mission['roles'].values():
             if role not in ('cooperator', 'defector'):
                 print(f'No role for {model}-{theme} mission: {mission_id}')
                 continue
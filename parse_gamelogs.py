@@ -1,6 +1,4 @@
 import sys
-import glob
-import json
 from collections import defaultdict, Counter
 import pandas as pd
 
@@ -9,6 +7,8 @@ from typing import Dict, Tuple
 
 import pickle
 
+from deceptiongame.tracer import iter_summaries
+
 def resolve_accusation(
     player_name_map: Dict[str, str],
     player_role_map: Dict[int, str], 
@@ -72,90 +72,70 @@ def parse_game_logs(log_dir: str = "multiplayer_game_logs"):
     log_dir= "multiplayer_game_logs"
     incomplete_games = 0
     finished_games = []
-    for path in glob.glob(f'{log_dir}/*.json'):
-        with open(path, 'r') as f:
-            data = json.load(f)
-            theme = data['config']['theme']
-            game_finished = 'outcome' in data.keys()
-            
-            if game_finished:
-                outdata = {}
-                #need to loop over each mission, grab roles and scores and such. Compute who was accused
-                outdata['game_id'] = data['game_id']
-                outdata['theme'] = theme
-                outdata['players'] = []
-                for player in data['config']['players']:
-                    outdata['players'].append({
-                        'player_id': player['player_id'],
-                        'model_name': player['model_name'],
-                        'username': player['username'],
-                    })
-                    
-                prev_score = {str(player['player_id']): 0 for player in data['config']['players']}
-                for mission in data['missions']:
-                    # role selection
-                    player_role_map = {}
-                    for action in mission['actions']:
-                        if action['phase'] != 'select_role':
-                            continue
-                        role = action['payload']['role_default_theme']
-                        player_id = action['player_id']
-                        if role not in ('cooperator', 'defector'):
-                            raise ValueError(f'No role for {player_id} in mission {mission["mission_id"]}')
-                        player_role_map[player_id] = role
-                        
-                    #store vote/accusation history
-                    accusations = {}
-                    retreat_counts = defaultdict(int)
-                    for event in mission['events']:
-                        for action in event['actions']:
-                            #votes
-                            if action['phase'] == 'vote' and action['payload']['vote_choice'] == 'yes':
-                                retreat_counts[action['player_id']] += 1
-                            #accusations
-                            if action['phase'] == 'nominate' and player_role_map[action['player_id']] == "cooperator":
-                                #accusation made
-                                accusations[action['player_id']] = action['payload']['nominated_player_id']
-                    #check who was accused
-                    
-                    defector_accused, cooperator_accused = resolve_accusation(
-                        {str(player['player_id']): player['username'] for player in data['config']['players']}, 
-                        player_role_map, 
-                        accusations
-                    )    
-                            
-                    #used scores to backwards compute who won the mission
-                    scores = mission['scores']
-                    score_diff = {player_id: scores[player_id] - prev_score[player_id] for player_id in scores}
-                    prev_score = scores
-                    #compute if cooperators or defectors got more points
-                    cooperator_score = None
-                    defector_score = None
-                    for player_id, score in score_diff.items():
-                        if player_role_map[int(player_id)] == 'cooperator':
-                            cooperator_score = score if cooperator_score is None else cooperator_score
-                        elif player_role_map[int(player_id)] == 'defector':
-                            defector_score = score if defector_score is None else defector_score
-                    
-                    mission_outcome = {
-                        'mission_id': mission['mission_id'],
-                        'cooperator_score': cooperator_score,
-                        'defector_score': defector_score,
-                        'defector_accused': defector_accused,
-                        'cooperator_accused': cooperator_accused,
-                        'retreat_counts': retreat_counts,
-                        'accusations': accusations,
-                        'player_roles': list(player_role_map.values()),
-                        'defector_won': defector_score is not None and (defector_score > cooperator_score),
-                        'cooperator_won': (defector_score is not None and cooperator_score > defector_score) and not cooperator_accused,
-                        'accused': "defector" if defector_accused else "cooperator" if cooperator_accused else "none",
-                    }
-                    outdata.setdefault('missions', []).append(mission_outcome)
-                    
+    # per-game summary sidecars, the full trace is only parsed for games without one
+    for path, summary in iter_summaries(log_dir):
+        if summary['finished']:
+            outdata = {}
+            #need to loop over each mission, grab roles and scores and such. Compute who was accused
+            outdata['game_id'] = summary['game_id']
+            outdata['theme'] = summary['theme']
+            outdata['players'] = [{
+                'player_id': player['player_id'],
+                'model_name': player['model_name'],
+                'username': player['username'],
+            } for player in summary['players']]
 
-                finished_games.append(outdata)
-            else:
-                incomplete_games+=1
+            for mission in summary['missions']:
+                # role selection
+                player_role_map = {}
+                for player_id, role in mission['roles'].items():
+                    if role not in ('cooperator', 'defector'):
+                        raise ValueError(f'No role for {player_id} in mission {mission["mission_id"]}')
+                    player_role_map[int(player_id)] = role
+
+                #store vote/accusation history
+                retreat_counts = defaultdict(int, {int(pid): n for pid, n in mission['retreat_votes'].items()})
+                accusations = {
+                    int(pid): nominee for pid, nominee in mission['nominations'].items()
+                    if player_role_map[int(pid)] == "cooperator"
+                }
+                #check who was accused
+
+                defector_accused, cooperator_accused = resolve_accusation(
+                    {str(player['player_id']): player['username'] for player in summary['players']},
+                    player_role_map,
+                    accusations
+                )
+
+                #used score deltas to backwards compute who won the mission
+                #compute if cooperators or defectors got more points
+                cooperator_score = None
+                defector_score = None
+                for player_id, score in mission['score_deltas'].items():
+                    if player_role_map[int(player_id)] == 'cooperator':
+                        cooperator_score = score if cooperator_score is None else cooperator_score
+                    elif player_role_map[int(player_id)] == 'defector':
+                        defector_score = score if defector_score is None else defector_score
+
+                mission_outcome = {
+                    'mission_id': mission['mission_id'],
+                    'cooperator_score': cooperator_score,
+                    'defector_score': defector_score,
+                    'defector_accused': defector_accused,
+                    'cooperator_accused': cooperator_accused,
+                    'retreat_counts': retreat_counts,
+                    'accusations': accusations,
+                    'player_roles': list(player_role_map.values()),
+                    'defector_won': defector_score is not None and (defector_score > cooperator_score),
+                    'cooperator_won': (defector_score is not None and cooperator_score > defector_score) and not cooperator_accused,
+                    'accused': "defector" if defector_accused else "cooperator" if cooperator_accused else "none",
+                }
+                outdata.setdefault('missions', []).append(mission_outcome)
+
+
+            finished_games.append(outdata)
+        else:
+            incomplete_games+=1
 
     # Save the finished games to a file
     with open(f'{log_dir}/finished_games.pkl', 'wb') as f:
@@ -717,6 +717,8 @@ async def get_next_action(req: GetGameRequest):
     
     scores = game.get_scores()
     print ('DEBUG SUMMARY: ', game_stage_summary)
+    # the manager's snapshot is read-only, copy the player rows before decorating them
+    state = {**state, 'player_info': [dict(p) for p in state['player_info']]}
     for pid, score in scores.items():  # attach scores
         for player in state['player_info']:
             if player['player_id'] == pid:
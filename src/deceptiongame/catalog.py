@@ -0,0 +1,282 @@
+"""
+SQLite catalog of game traces, so questions about many games don't mean
+globbing and parsing every trace again.
+
+    python -m deceptiongame.catalog ingest game_logs multiplayer_game_logs
+    python -m deceptiongame.catalog query --model gemini-2.5-flash --role defector \
+        --theme hospital --accused cooperator
+    python -m deceptiongame.catalog query --sql "SELECT theme, COUNT(*) FROM games GROUP BY theme"
+
+Ingest is incremental: a trace already indexed with the same mtime and size
+is skipped, a changed one (e.g. a game that was still running) is replaced.
+"""
+import os
+import sys
+import json
+import sqlite3
+import logging
+import argparse
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from deceptiongame.mission_manager import resolve_accusation
+from deceptiongame.tracer import find_traces, load_trace, summarize_trace, TRUNCATED_ERRORS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = "catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    game_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    started_at TEXT,
+    theme TEXT,
+    seed INTEGER,
+    total_missions INTEGER,
+    finished INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    game_id TEXT NOT NULL,
+    player_id INTEGER NOT NULL,
+    username TEXT,
+    model_name TEXT,
+    final_score REAL,
+    PRIMARY KEY (game_id, player_id)
+);
+-- accused is 'defector', 'cooperator' or 'none', as resolved by the engine
+CREATE TABLE IF NOT EXISTS missions (
+    game_id TEXT NOT NULL,
+    mission_id INTEGER NOT NULL,
+    n_events INTEGER NOT NULL,
+    nominee TEXT,
+    accused TEXT NOT NULL,
+    PRIMARY KEY (game_id, mission_id)
+);
+CREATE TABLE IF NOT EXISTS mission_players (
+    game_id TEXT NOT NULL,
+    mission_id INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    role TEXT,
+    nomination TEXT,
+    retreat_votes INTEGER NOT NULL,
+    score REAL,
+    score_delta REAL,
+    PRIMARY KEY (game_id, mission_id, player_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    game_id TEXT NOT NULL,
+    mission_id INTEGER NOT NULL,
+    event_id INTEGER NOT NULL,
+    card TEXT,
+    n_actions INTEGER NOT NULL,
+    n_messages INTEGER NOT NULL,
+    n_retreat_votes INTEGER NOT NULL,
+    played_cards TEXT,
+    PRIMARY KEY (game_id, mission_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS idx_games_theme ON games (theme);
+CREATE INDEX IF NOT EXISTS idx_games_finished ON games (finished);
+CREATE INDEX IF NOT EXISTS idx_players_model ON players (model_name);
+CREATE INDEX IF NOT EXISTS idx_mission_players_role ON mission_players (role);
+CREATE INDEX IF NOT EXISTS idx_missions_accused ON missions (accused);
+"""
+
+GAME_TABLES = ("games", "players", "missions", "mission_players", "events")
+
+
+class Catalog:
+    def __init__(self, db_path: str = DEFAULT_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ingest(self, paths: Iterable[str]) -> Dict[str, int]:
+        """ Index every trace in `paths` (files or log directories). Returns how many were added, updated, skipped or failed. """
+        counts = {"added": 0, "updated": 0, "skipped": 0, "failed": 0}
+        for path in paths:
+            for trace_path in (find_traces(path) if os.path.isdir(path) else [path]):
+                counts[self.ingest_file(trace_path)] += 1
+        return counts
+
+    def ingest_file(self, path: str) -> str:
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError as e:
+            # listed by a manifest, but removed since
+            logger.warning(f"Could not index {path}: {e}")
+            return "failed"
+        row = self.conn.execute("SELECT mtime, size FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row == (stat.st_mtime, stat.st_size):
+            return "skipped"
+        try:
+            trace = load_trace(path)
+        except (ValueError, OSError, KeyError) + TRUNCATED_ERRORS as e:
+            # e.g. a json trace caught mid-rewrite; not recorded, so the next ingest retries it
+            logger.warning(f"Could not index {path}: {e}")
+            return "failed"
+        with self.conn:
+            self._forget(path, trace["game_id"])
+            self._insert(path, trace)
+            self.conn.execute(
+                "INSERT INTO files (path, mtime, size, game_id) VALUES (?, ?, ?, ?)",
+                (path, stat.st_mtime, stat.st_size, trace["game_id"]),
+            )
+        return "added" if row is None else "updated"
+
+    def _forget(self, path: str, game_id: str):
+        """ Drop what an earlier ingest of this file, or another copy of this game, left behind. """
+        game_ids = {game_id}
+        row = self.conn.execute("SELECT game_id FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            game_ids.add(row[0])
+        for gid in game_ids:
+            for table in GAME_TABLES:
+                self.conn.execute(f"DELETE FROM {table} WHERE game_id = ?", (gid,))
+            self.conn.execute("DELETE FROM files WHERE game_id = ?", (gid,))
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _insert(self, path: str, trace: Dict[str, Any]):
+        summary = summarize_trace(trace)
+        game_id = summary["game_id"]
+        config = trace.get("config", {})
+        self.conn.execute(
+            "INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (game_id, path, summary["started_at"], summary["theme"], summary["seed"],
+             config.get("total_missions"), int(summary["finished"])),
+        )
+        final_scores = (summary["outcome"] or {}).get("scores") or {}
+        final_scores = {str(pid): score for pid, score in final_scores.items()}
+        names = {}
+        for player in summary["players"]:
+            names[str(player["player_id"])] = player["username"]
+            self.conn.execute(
+                "INSERT INTO players VALUES (?, ?, ?, ?, ?)",
+                (game_id, player["player_id"], player["username"], player["model_name"],
+                 final_scores.get(str(player["player_id"]))),
+            )
+
+        for mission, mission_summary in zip(trace.get("missions", []), summary["missions"]):
+            mission_id = mission["mission_id"]
+            roles = mission_summary["roles"]
+            nominations = mission_summary["nominations"]
+            roles_by_name = {}
+            for pid, role in roles.items():
+                roles_by_name.setdefault(names.get(pid), role)
+            nominee, defector_found, cooperator_found = resolve_accusation(
+                [nominations.get(pid) for pid, role in roles.items() if role == "cooperator"],
+                roles_by_name,
+            )
+            accused = "defector" if defector_found else "cooperator" if cooperator_found else "none"
+            self.conn.execute(
+                "INSERT INTO missions VALUES (?, ?, ?, ?, ?)",
+                (game_id, mission_id, len(mission.get("events", [])), nominee, accused),
+            )
+            scores = mission_summary["scores"] or {}
+            deltas = mission_summary["score_deltas"] or {}
+            for pid in names:
+                self.conn.execute(
+                    "INSERT INTO mission_players VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (game_id, mission_id, int(pid), roles.get(pid), nominations.get(pid),
+                     mission_summary["retreat_votes"].get(pid, 0), scores.get(pid), deltas.get(pid)),
+                )
+            for event in mission.get("events", []):
+                actions = event.get("actions", [])
+                self.conn.execute(
+                    "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (game_id, mission_id, event["event_id"], event.get("card"), len(actions),
+                     sum(a["phase"] == "discussion" for a in actions),
+                     sum(a["phase"] == "vote" and a["payload"].get("vote_choice") == "yes" for a in actions),
+                     json.dumps(event["played_cards"]) if "played_cards" in event else None),
+                )
+
+    def query(self, sql: str, params: Tuple = ()) -> Tuple[List[str], List[Tuple]]:
+        """ Run any SQL against the catalog; returns (column names, rows). """
+        cursor = self.conn.execute(sql, params)
+        columns = [c[0] for c in cursor.description] if cursor.description else []
+        return columns, cursor.fetchall()
+
+    def find_missions(
+        self,
+        model: Optional[str] = None,
+        role: Optional[str] = None,
+        theme: Optional[str] = None,
+        accused: Optional[str] = None,
+        finished: Optional[bool] = None,
+    ) -> Tuple[List[str], List[Tuple]]:
+        """ Missions with a player of `model` (in `role`, if given), filtered by theme, accusation outcome and completion. """
+        where, params = [], []
+        for column, value in (("p.model_name", model), ("mp.role", role), ("g.theme", theme), ("m.accused", accused)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if finished is not None:
+            where.append("g.finished = ?")
+            params.append(int(finished))
+        sql = (
+            "SELECT g.game_id, m.mission_id, g.theme, p.player_id, p.username, p.model_name, mp.role, "
+            "m.accused, m.nominee, mp.score_delta, g.path "
+            "FROM mission_players mp "
+            "JOIN players p ON p.game_id = mp.game_id AND p.player_id = mp.player_id "
+            "JOIN missions m ON m.game_id = mp.game_id AND m.mission_id = mp.mission_id "
+            "JOIN games g ON g.game_id = mp.game_id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY g.started_at, m.mission_id, p.player_id"
+        )
+        return self.query(sql, tuple(params))
+
+
+def _print_rows(columns: List[str], rows: List[Tuple]):
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Index game traces into SQLite and query them.")
+    parser.add_argument("--db", type=str, default=DEFAULT_DB, help="Catalog database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Index new or changed traces")
+    ingest.add_argument("paths", nargs="*", default=["game_logs", "multiplayer_game_logs"],
+                        help="Trace files or log directories")
+
+    query = sub.add_parser("query", help="Find missions by model, role, theme and accusation, or run SQL")
+    query.add_argument("--model", type=str, default=None)
+    query.add_argument("--role", type=str, choices=["cooperator", "defector"], default=None)
+    query.add_argument("--theme", type=str, default=None)
+    query.add_argument("--accused", type=str, choices=["cooperator", "defector", "none"], default=None)
+    query.add_argument("--finished", action="store_true", help="Only finished games")
+    query.add_argument("--sql", type=str, default=None, help="Run this SQL instead")
+    args = parser.parse_args(argv)
+
+    with Catalog(args.db) as catalog:
+        if args.command == "ingest":
+            counts = catalog.ingest(p for p in args.paths if os.path.exists(p))
+            print(", ".join(f"{n} {k}" for k, n in counts.items()))
+        elif args.sql:
+            _print_rows(*catalog.query(args.sql))
+        else:
+            _print_rows(*catalog.find_missions(
+                model=args.model, role=args.role, theme=args.theme, accused=args.accused,
+                finished=True if args.finished else None,
+            ))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Process-wide LLM clients, shared by every player and game.
+
+Building a client per OnlineAI gave every player its own connection pool:
+five players on one vLLM server held five pools and kept five sets of
+connections alive. `shared_client` hands out one client per (provider,
+endpoint, credentials) instead, built with the limits set by
+`configure_pool`, and `pool_stats` reports how busy each one is.
+
+    configure_pool(max_connections=32, keepalive_expiry=60)
+    client = shared_client("vllm", "http://localhost:9000/v1", "test-dummy")
+    print(pool_stats())
+
+The OpenAI-compatible clients (vLLM, Azure) and Gemini run over an httpx
+pool whose requests are counted; Bedrock gets botocore's own pool, sized
+the same way, and xAI is only shared. The SDKs' own retries are turned
+off: deceptiongame.retry retries every call, one request per attempt.
+"""
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from deceptiongame.retry import POLICIES
+
+# seconds for Bedrock to accept a connection
+BEDROCK_CONNECT_TIMEOUT = 10
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    # seconds an idle connection is kept open
+    keepalive_expiry: float = 30.0
+    # used where the h2 package is installed, HTTP/1.1 otherwise
+    http2: bool = True
+
+
+_config = PoolConfig()
+_clients: Dict[tuple, "_PooledClient"] = {}
+_lock = threading.Lock()
+
+
+def configure_pool(**limits) -> PoolConfig:
+    """ Set the PoolConfig fields of the clients created from now on; existing clients keep theirs. """
+    global _config
+    _config = replace(_config, **limits)
+    return _config
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class _CountingTransport(httpx.BaseTransport):
+    """ HTTPTransport that counts the requests in flight, from sending until their response is closed. """
+    def __init__(self, config: PoolConfig, verify=True):
+        self.http2 = config.http2 and _http2_available()
+        self.max_connections = config.max_connections
+        self._transport = httpx.HTTPTransport(
+            verify=verify,
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _done(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def handle_request(self, request):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self._done()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, self._done),
+            extensions=response.extensions,
+        )
+
+    def connections(self):
+        """ (open, idle) connections of the underlying pool. """
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", ()))
+        return len(connections), sum(c.is_idle() for c in connections)
+
+    def close(self):
+        self._transport.close()
+
+
+@dataclass
+class _PooledClient:
+    provider: str
+    endpoint: Optional[str]
+    client: Any
+    transport: Optional[_CountingTransport] = None
+    max_connections: Optional[int] = None
+    users: int = 0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "provider": self.provider,
+            "endpoint": self.endpoint,
+            "users": self.users,
+            "max_connections": self.max_connections,
+        }
+        if self.transport is not None:
+            connections, idle = self.transport.connections()
+            stats.update(
+                http2=self.transport.http2,
+                requests=self.transport.requests,
+                in_flight=self.transport.in_flight,
+                peak_in_flight=self.transport.peak_in_flight,
+                connections=connections,
+                idle_connections=idle,
+                utilization=self.transport.in_flight / self.max_connections,
+            )
+        return stats
+
+
+def _build(provider, endpoint, api_key, api_version, profile, config) -> _PooledClient:
+    if provider == "vllm":
+        from openai import OpenAI
+        transport = _CountingTransport(config)
+        # retried by deceptiongame.retry, the SDK's own retries would multiply its attempts
+        client = OpenAI(base_url=endpoint, api_key=api_key, max_retries=0, http_client=httpx.Client(transport=transport))
+    elif provider == "azure":
+        from openai import AzureOpenAI
+        transport = _CountingTransport(config, verify=False)
+        client = AzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=api_key,
+            api_version=api_version,
+            max_retries=0,
+            http_client=httpx.Client(transport=transport, trust_env=False),
+        )
+    elif provider == "gemini":
+        from google import genai
+        from google.genai import types
+        transport = _CountingTransport(config)
+        client = genai.Client(api_key=api_key, http_options=types.HttpOptions(httpx_client=httpx.Client(transport=transport)))
+    elif provider == "anthropic":
+        import boto3
+        from botocore.config import Config
+        transport = None
+        session = boto3.session.Session(profile_name=profile)
+        client = session.client(
+            service_name="bedrock-runtime",
+            region_name=endpoint,
+            config=Config(
+                max_pool_connections=config.max_connections,
+                tcp_keepalive=True,
+                # retried by deceptiongame.retry
+                retries={"total_max_attempts": 1},
+                # botocore only takes timeouts per client: no read waits past a whole retry deadline
+                connect_timeout=BEDROCK_CONNECT_TIMEOUT,
+                read_timeout=POLICIES["anthropic"].deadline,
+            ),
+        )
+    elif provider == "xai":
+        import xai
+        transport = None
+        client = xai.Client(api_key=api_key)
+    else:
+        raise NotImplementedError(provider)
+    return _PooledClient(provider, endpoint, client, transport, config.max_connections)
+
+
+def shared_client(provider: str, endpoint: Optional[str] = None, api_key: Optional[str] = None,
+                  api_version: Optional[str] = None, profile: Optional[str] = None):
+    """
+    The process's client for `provider` at `endpoint` with these credentials,
+    created on first use. `endpoint` is the base URL, or the AWS region for
+    Bedrock ('anthropic'), whose credentials come from the AWS `profile`.
+    """
+    key = (provider, endpoint, api_key, api_version, profile)
+    with _lock:
+        pooled = _clients.get(key)
+        if pooled is None:
+            pooled = _clients[key] = _build(provider, endpoint, api_key, api_version, profile, _config)
+        pooled.users += 1
+        return pooled.client
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """ One dict per shared client: players using it and, for the httpx-based ones, requests and connections. """
+    with _lock:
+        return [pooled.stats() for pooled in _clients.values()]
+
+
+def close_clients():
+    """ Close every shared client; the next shared_client call builds a new one. """
+    with _lock:
+        pooled_clients = list(_clients.values())
+        _clients.clear()
+    for pooled in pooled_clients:
+        close = getattr(pooled.client, "close", None)
+        if close is not None:
+            close()
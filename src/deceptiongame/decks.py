@@ -34,10 +34,11 @@ class MissionCard:
         self,
         prompt: str,
         events_per_mission: int,
+        rng: Optional[random.Random] = None,
     ):
         self.prompt = prompt
         self.events_per_mission = events_per_mission
-        self.payoff_matrix = get_scores_and_ev()
+        self.payoff_matrix = get_scores_and_ev(rng)
         self.is_valid = self.payoff_matrix.pop('is_valid')
         self.ev = self.payoff_matrix.pop('expected_value')
 
@@ -57,7 +58,7 @@ class MissionCard:
     Unmask Defector: Cooperator voters gain {self.payoff_matrix['defector_found']} points each
     No one accused: Cooperator voters gain {self.payoff_matrix['defector_unknown']} points each
     """
-import random
+
 class MissionDeck:
     def __init__(
         self, 
@@ -65,17 +66,20 @@ class MissionDeck:
         deck_size=10, 
         num_players: int = 5, 
         events_per_mission: int = 5,
-        seed: Optional[int] = None
+        seed: Optional[int] = None,
+        rng: Optional[random.Random] = None,
     ):
         self.num_players = num_players
+        self.rng = rng if rng is not None else random.Random(seed)
         cfg = ThemeConfig(theme)
         self.cards: List[MissionCard] = []
         self.deck_size = deck_size
 
-        for mission_prompt in random.sample(cfg.get_missions(), k=len(cfg.get_missions())):
+        for mission_prompt in self.rng.sample(cfg.get_missions(), k=len(cfg.get_missions())):
             card = MissionCard(
                 prompt=mission_prompt,
                 events_per_mission=events_per_mission,
+                rng=self.rng,
             )
             self.cards.append(card)
             if len(self.cards) >= deck_size:
@@ -86,23 +90,33 @@ class MissionDeck:
         return len(self.cards)
 
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
+
+    def fork(self, rng: random.Random) -> "MissionDeck":
+        """ Copy of the deck that draws from `rng`. Cards are shared, drawing never modifies them. """
+        clone = copy.copy(self)
+        clone.cards = list(self.cards)
+        clone.rng = rng
+        return clone
 
     def draw_mission_card(self) -> MissionCard:
         if not self.cards:
             raise ValueError("No more Missions")
-        mission_card = self.cards.pop()
+        # scale a copy, forked decks share the undrawn cards
+        mission_card = copy.copy(self.cards.pop())
         mission_id = self.deck_size - len(self.cards)
-        for k,v in mission_card.payoff_matrix.items():
-            if isinstance(v, int):
-                mission_card.payoff_matrix[k] = v * mission_id
         #update the payoff matrix based on how many are left in the deck
+        mission_card.payoff_matrix = {
+            k: v * mission_id if isinstance(v, int) else v
+            for k, v in mission_card.payoff_matrix.items()
+        }
         return mission_card
 
 
 class ActionDeck:
-    def __init__(self, total_cards: int = 20, seed: Optional[int] = None):
+    def __init__(self, total_cards: int = 20, seed: Optional[int] = None, rng: Optional[random.Random] = None):
         self.total = total_cards
+        self.rng = rng if rng is not None else random.Random(seed)
         self._build_deck()
 
     def _build_deck(self):
@@ -110,7 +124,13 @@ class ActionDeck:
         self.shuffle()
 
     def shuffle(self):
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
+
+    def fork(self, rng: random.Random) -> "ActionDeck":
+        clone = copy.copy(self)
+        clone.deck = list(self.deck)
+        clone.rng = rng
+        return clone
 
     def draw(self) -> str:
         if not self.deck or len(self.deck) == 0:
@@ -126,7 +146,8 @@ class EventCard:
                  primary_defect: str,
                  attr_map: Dict[str, str],
                  num_players: int,
-                 seed=42):
+                 seed=42,
+                 rng: Optional[random.Random] = None):
         self.theme = theme
         #replace pass and fail with the actual attribute names
         
@@ -140,7 +161,7 @@ class EventCard:
         self.attr_map = attr_map
         self.attribute_slots = {}
         other_slots = [1,1,-1]
-        random.shuffle(other_slots)
+        (rng if rng is not None else random.Random(seed)).shuffle(other_slots)
 
         m = 2
         n = 3
@@ -176,15 +197,28 @@ class EventCard:
         }
 
         self.slot_json_string = json.dumps(card_info)
+        self.coop_requirements = coop_requirements
+        self.defect_requirements = defect_requirements
+        # terms -> formatted card info; the card never changes, so each set of terms is substituted once
+        self._formatted: Dict[tuple, str] = {}
 
     def get_card_info_formatted(self, **kwargs) -> str:
         # Parse the JSON, format the descriptions, then re-encode
         #data = json.loads(self.slot_json_string.format(**kwargs))
-        result = copy.copy(self.slot_json_string)
-        for key, value in kwargs.items():
-            result = result.replace(f"{{{{{key}}}}}", value)
+        terms = tuple(kwargs.items())
+        result = self._formatted.get(terms)
+        if result is None:
+            result = self.slot_json_string
+            for key, value in kwargs.items():
+                result = result.replace(f"{{{{{key}}}}}", value)
+            self._formatted[terms] = result
         return result
 
+    def get_card_info_compact(self) -> str:
+        """ One line for the 'compact' prompt profile: description, then card=name:limit for each side. """
+        need = lambda requirements: " ".join(f"{attr}={r['name']}:{r['limit']}" for attr, r in requirements.items())
+        return f"{self.prompt} | coop_need: {need(self.coop_requirements)} | def_need: {need(self.defect_requirements)}"
+
     def __repr__(self):
         return self.slot_json_string
 
@@ -196,9 +230,11 @@ class EventDeck:
         deck_size=3, 
         num_players: int = 5, 
         seed: Optional[int] = None,
-        copy_first_card: bool = False
+        copy_first_card: bool = False,
+        rng: Optional[random.Random] = None,
     ):
         self.num_players = num_players
+        self.rng = rng if rng is not None else random.Random(seed)
         cfg = ThemeConfig(theme)
         self.cards: List[EventCard] = []
         for event_id, ev in cfg.get_events().items():
@@ -213,7 +249,8 @@ class EventDeck:
                     primary_defect=ev["fail"],
                     attr_map=cfg.action_map,
                     num_players=num_players,
-                    seed=seed
+                    seed=seed,
+                    rng=self.rng,
                 )
             self.cards.append(card)
             if len(self.cards) >= deck_size:
@@ -224,7 +261,14 @@ class EventDeck:
         return len(self.cards)
 
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
+
+    def fork(self, rng: random.Random) -> "EventDeck":
+        """ Copy of the deck that draws from `rng`. Event cards are never modified, so they are shared. """
+        clone = copy.copy(self)
+        clone.cards = list(self.cards)
+        clone.rng = rng
+        return clone
 
     def draw_event_card(self) -> EventCard:
         if not self.cards:
@@ -1,14 +1,101 @@
-import os, re
+import os
 import json
 import time
 from typing import Literal
-from typing import Callable
+from typing import Callable, Optional
+from dataclasses import dataclass, field, asdict
 from google.genai import types
-from openai import RateLimitError
+
+from deceptiongame.rate_limit import EXPECTED_COMPLETION_TOKENS
+from deceptiongame.retry import call_with_retries, client_endpoint
 
 
 from functools import lru_cache
 
+
+@lru_cache(maxsize=None)
+def _local_tokenizer(model_id: str):
+    """ HF tokenizer for a vLLM-served model, or None if it can't be loaded here (API models, no hub access). """
+    try:
+        from transformers import AutoTokenizer
+        # only a tokenizer already cached here, never a download mid-game
+        return AutoTokenizer.from_pretrained(model_id, local_files_only=True)
+    except Exception:
+        return None
+
+
+def count_tokens(model_id: str, text: str) -> int:
+    """ Token count of `text` for calls whose response carries no usage: the model's tokenizer, else ~4 chars per token. """
+    tokenizer = _local_tokenizer(model_id)
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class CallStats:
+    """
+    Cost of one LLM call, filled in by the call_chat_completion_* functions.
+    queue_ms runs from when the call was requested to its first attempt
+    (waits for the models.yaml rate limits included),
+    wall_ms from the first attempt to the last (retry sleeps included).
+    retries counts failed attempts and error is the class of the last one.
+    Token counts come from the response's usage, or count_tokens when
+    there is none (tokens_from says which).
+    """
+    model: str
+    provider: Optional[str] = None
+    queue_ms: Optional[float] = None
+    wall_ms: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    tokens_from: Optional[str] = None
+    retries: int = 0
+    error: Optional[str] = None
+    requested_at: float = field(default_factory=time.perf_counter, repr=False)
+    _started_at: Optional[float] = field(default=None, init=False, repr=False)
+    _prompt: str = field(default="", init=False, repr=False)
+
+    def begin(self, msg):
+        """ Called before the first attempt, with the messages as given (before any provider reshuffling). """
+        self._started_at = time.perf_counter()
+        self.queue_ms = 1e3 * (self._started_at - self.requested_at)
+        self._prompt = "\n".join(m["content"] for m in msg)
+
+    def failed(self, exc: BaseException):
+        self.retries += 1
+        self.error = type(exc).__name__
+
+    def end(self, output=None, prompt_tokens=None, completion_tokens=None):
+        self.wall_ms = 1e3 * (time.perf_counter() - self._started_at)
+        if output is None:
+            # every attempt failed
+            return
+        if prompt_tokens is not None and completion_tokens is not None:
+            self.prompt_tokens, self.completion_tokens, self.tokens_from = prompt_tokens, completion_tokens, "usage"
+        else:
+            text = output if isinstance(output, str) else json.dumps(output)
+            self.prompt_tokens = count_tokens(self.model, self._prompt)
+            self.completion_tokens = count_tokens(self.model, text)
+            self.tokens_from = "estimate"
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if k not in ("requested_at", "_started_at", "_prompt")}
+
+
+def _limit_tokens(limiter, model_id, msg) -> int:
+    """ Tokens a call is expected to use, for limiters with a tokens_per_minute budget. """
+    if limiter is None or not limiter.limits.tokens_per_minute:
+        return 0
+    return count_tokens(model_id, "\n".join(m["content"] for m in msg)) + EXPECTED_COMPLETION_TOKENS
+
+
+def _openai_usage(completion):
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return None, None
+    return usage.prompt_tokens, usage.completion_tokens
+
 @lru_cache(maxsize=None)
 def get_bad_words(N: int = 12, T: int = 20, K: int = 1) -> list[str]:
     """
@@ -23,7 +110,7 @@ def get_bad_words(N: int = 12, T: int = 20, K: int = 1) -> list[str]:
         for p_right in range(K + 1)
     ] + ["\"" +"\n" * i for i in range(N)]
 
-def call_chat_completion_vllm(client, model_id, msg, temperature, action_json=None, max_retries = 10, extra=None) -> str:
+def call_chat_completion_vllm(client, model_id, msg, temperature, action_json=None, max_retries=None, extra=None, stats=None, limiter=None) -> str:
     extra_body = {}
     if action_json:
         extra_body["guided_json"] = action_json.model_json_schema() if action_json else None
@@ -52,31 +139,28 @@ def call_chat_completion_vllm(client, model_id, msg, temperature, action_json=No
         print(f"role counts: {dict(role_count_dict)}")
         exit()
         
-    last_exc = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            completion = client.chat.completions.create(
-                model=model_id,
-                messages=msg,
-                temperature=temperature,
-                extra_body=extra_body,
-            )
-            if action_json:
-                output = json.loads(completion.choices[0].message.content)
-            else:
-                output = completion.choices[0].message.content
-            
-            return output
-            
-        except Exception as e:
-            last_exc = e
-            print(f"[Error] attempt {attempt}/{max_retries} Error: {str(e)}")
-
-    # All retries failed
-    raise last_exc
-
-
-def call_chat_completion_azure(client, model_id, msg, temperature, action_json=None, max_retries=10, extra=None) -> str:
+    stats = stats or CallStats(model_id)
+    stats.begin(msg)
+
+    def attempt(timeout):
+        completion = client.chat.completions.create(
+            model=model_id,
+            messages=msg,
+            temperature=temperature,
+            extra_body=extra_body,
+            timeout=timeout,
+        )
+        if action_json:
+            output = json.loads(completion.choices[0].message.content)
+        else:
+            output = completion.choices[0].message.content
+        return (output, *_openai_usage(completion))
+
+    return call_with_retries(attempt, "vllm", stats, client_endpoint(client), max_retries, limiter,
+                             _limit_tokens(limiter, model_id, msg))
+
+
+def call_chat_completion_azure(client, model_id, msg, temperature, action_json=None, max_retries=None, extra=None, stats=None, limiter=None) -> str:
     response_format = None
     client_fn = client.chat.completions.create
     if action_json:
@@ -85,62 +169,48 @@ def call_chat_completion_azure(client, model_id, msg, temperature, action_json=N
     reasoning = False
     if model_id == 'o4-mini' or model_id == 'o3-mini':
         reasoning = True
-    last_exc = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            if reasoning:
-                completion = client_fn(model=model_id, messages=msg, response_format=response_format)
-            else:
-                completion = client_fn(
-                    model=model_id,
-                    messages=msg,
-                    temperature=temperature,
-                    response_format=response_format
-                )
-            break
-        except Exception as e:
-            last_exc = e
-            text = str(e)
-            # extract “retry after XX seconds” from Azure’s message
-            wait = 5
-            if 'content' in text:
-                wait = 2
-                print ('is_json: ', action_json)
-                attempt -= 1 
-                reason = 'Content Filter'
-            elif 'retry' in text:
-                m = re.search(r'retry after (\d+) seconds', text)
-                wait = int(m.group(1)) if m else 2 ** attempt
-                wait = min(wait, 60)
-                reason = 'Rate Limit'
-
-            
-            print(f"[{reason}] Attempt {attempt}/{max_retries}, sleeping {wait}s... {text}")
-            time.sleep(wait)
-    else:
-        # all retries failed
-        raise last_exc
+    stats = stats or CallStats(model_id)
+    stats.begin(msg)
 
-    if response_format:
-        output = json.loads(completion.choices[0].message.content)
-    else:
-        output = completion.choices[0].message.content
-    return output
+    def attempt(timeout):
+        if reasoning:
+            completion = client_fn(model=model_id, messages=msg, response_format=response_format, timeout=timeout)
+        else:
+            completion = client_fn(
+                model=model_id,
+                messages=msg,
+                temperature=temperature,
+                response_format=response_format,
+                timeout=timeout,
+            )
+        if response_format:
+            output = json.loads(completion.choices[0].message.content)
+        else:
+            output = completion.choices[0].message.content
+        return (output, *_openai_usage(completion))
 
+    return call_with_retries(attempt, "azure", stats, client_endpoint(client), max_retries, limiter,
+                             _limit_tokens(limiter, model_id, msg))
 
-def call_chat_completion_anthropic(client, model_id, msg, temperature, action_json=None, max_retries=5, extra=None) -> str:
+
+def call_chat_completion_anthropic(client, model_id, msg, temperature, action_json=None, max_retries=None, extra=None, stats=None, limiter=None) -> str:
+    stats = stats or CallStats(model_id)
+    stats.begin(msg)
+    tokens = _limit_tokens(limiter, model_id, msg)
     extra_body = {}
     if action_json:
         extra_body["guided_json"] = action_json if action_json else None
     else:
         extra_body = None
     # breakpoint()
+    # copies, the caller may keep the messages as a transcript
+    msg = [dict(m) for m in msg]
     if msg[0]['role'] == 'system':
         system_msg = msg.pop(0)['content']        
     else:
         system_msg = ''
     if extra and extra['claude']:
-        msg[0]['content'] = msg[0]['content'] + extra['claude']
+        msg[-1]['content'] = msg[-1]['content'] + extra['claude']
         
     body = json.dumps({
         "max_tokens": 1600,
@@ -150,64 +220,74 @@ def call_chat_completion_anthropic(client, model_id, msg, temperature, action_js
         'system': system_msg
     })
     inference_profile_arn = 'arn:aws:bedrock:us-west-2:457878818681:inference-profile/us.anthropic.claude-3-7-sonnet-20250219-v1:0' # <-- (Claude 3.7)
-    last_exc = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            completion = client.invoke_model(
-                body=body, 
-                modelId=inference_profile_arn,
-            )
-            output = json.loads(completion.get("body").read())['content'][0]['text']
-            if action_json:
-                output = output[output.index('{') : output.index('}')+1]
-                output = json.loads(output)
-                if 'choice' in output:
-                    if isinstance(output['choice'], list):
-                        output['choice'] = output['choice'][0]
-                action_json.parse_obj(output)
-            return output
-        except Exception as e:
-            last_exc = e
-            print(f"[Error] attempt {attempt}/{max_retries} Error: {str(e)}")
-            # breakpoint()
-    raise last_exc
-
-
-def call_chat_completion_gemini(client, model_id, msg, temperature, action_json=None, max_retries=5, extra=None) -> str:
+
+    # botocore has no per-request timeout, the client's read_timeout bounds the attempt (see client_pool)
+    def attempt(timeout):
+        completion = client.invoke_model(
+            body=body, 
+            modelId=inference_profile_arn,
+        )
+        response = json.loads(completion.get("body").read())
+        output = response['content'][0]['text']
+        if action_json:
+            output = output[output.index('{') : output.index('}')+1]
+            output = json.loads(output)
+            if 'choice' in output:
+                if isinstance(output['choice'], list):
+                    output['choice'] = output['choice'][0]
+            action_json.parse_obj(output)
+        usage = response.get('usage') or {}
+        return output, usage.get('input_tokens'), usage.get('output_tokens')
+
+    return call_with_retries(attempt, "anthropic", stats, client_endpoint(client), max_retries, limiter, tokens)
+
+
+def call_chat_completion_gemini(client, model_id, msg, temperature, action_json=None, max_retries=None, extra=None, stats=None, limiter=None) -> str:
+    stats = stats or CallStats(model_id)
+    stats.begin(msg)
+    tokens = _limit_tokens(limiter, model_id, msg)
     if action_json:
         response_schema = action_json if action_json else None
     else:
         response_schema = None
     if msg[0]['role'] == 'system':
-        system_msg = msg.pop(0)['content']        
+        system_msg = msg[0]['content']
+        msg = msg[1:]
     else:
         system_msg = ''
-    last_exc = None
-    for attempt in range(1, max_retries + 1):
-        try:
-            completion = client.models.generate_content(
-                model=model_id,
-                contents=msg[0]['content'],
-                config={ # configtypes.GenerateContentConfig(
-                    # 'thinking_config': types.ThinkingConfig(thinking_budget=128),
-                    "response_mime_type": "application/json",
-                    'response_schema': response_schema,
-                    'system_instruction': system_msg
-                },#),
-            )
-            if action_json:
-                output = completion.parsed.__dict__
-            else:
-                output = completion.text
-            return output
-        except Exception as e:
-            last_exc = e
-            print(f"[Error] attempt {attempt}/{max_retries} Error: {str(e)}")
-            breakpoint()    
-    return last_exc
-
-
-def call_chat_completion_xai(client, model_id, msg, temperature, action_json=None, extra=None) -> str:
+    if len(msg) == 1:
+        contents = msg[0]['content']
+    else:
+        # a multi-turn transcript, Gemini calls the assistant 'model'
+        contents = [{'role': 'model' if m['role'] == 'assistant' else 'user', 'parts': [{'text': m['content']}]}
+                    for m in msg]
+
+    def attempt(timeout):
+        config = { # configtypes.GenerateContentConfig(
+            # 'thinking_config': types.ThinkingConfig(thinking_budget=128),
+            "response_mime_type": "application/json",
+            'response_schema': response_schema,
+            'system_instruction': system_msg
+        }#)
+        if timeout is not None:
+            # per request, in milliseconds; genai takes 0 for no timeout
+            config['http_options'] = {'timeout': max(1, int(timeout * 1000))}
+        completion = client.models.generate_content(
+            model=model_id,
+            contents=contents,
+            config=config,
+        )
+        if action_json:
+            output = completion.parsed.__dict__
+        else:
+            output = completion.text
+        usage = getattr(completion, 'usage_metadata', None)
+        return output, getattr(usage, 'prompt_token_count', None), getattr(usage, 'candidates_token_count', None)
+
+    return call_with_retries(attempt, "gemini", stats, client_endpoint(client), max_retries, limiter, tokens)
+
+
+def call_chat_completion_xai(client, model_id, msg, temperature, action_json=None, max_retries=None, extra=None, stats=None, limiter=None) -> str:
     extra_body = {}
     if action_json:
         extra_body["guided_json"] = action_json if action_json else None
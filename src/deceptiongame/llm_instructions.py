@@ -64,6 +64,23 @@ INSTRUCTIONS = {
              "First, write a very brief note to yourself about what you want to do next. "
              "Then, choose to {vote} yes or no"
     ),
+    "compact_legend": (
+        "\n\n# Game state format\n"
+        "The game state is written in short lines:\n"
+        "- M: current {mission}/total {missions}: description. E: current {event}/total {events}.\n"
+        "- P: {players} as name:{score}, * marks the {leader}.\n"
+        "- R: reward structure. coop: rewards of {cooperators} when a {defector} is {accused} (def_acc), "
+        "no one is (none_acc) or a {cooperator} is (coop_acc), and per {card} {played} (card). "
+        "def: {defectors} get start {points}, the {mission} {sabotaged} bonus (sab) unless a {defector} is {accused}, "
+        "and the same per {card}.\n"
+        "- EV: current {event}: description | coop_need: {cards} {cooperators} can use | "
+        "def_need: {cards} {defectors} can use to {sabotage} the {mission}, each as {card}=name:limit.\n"
+        "- played: sorted {cards} once all {players} submitted one; coop_total / def_total: the {mission}'s running "
+        "totals of {cooperator} / {defector} {cards}; def_needed: {defector} {cards} still needed to {sabotage}.\n"
+        "- ME: your role, {hand} and, for {defectors}, the {defector} team.\n"
+        "- PRIOR: one line per earlier {mission}: number | {retreat} early | outcome (def_acc, coop_acc or none_acc) | "
+        "{sabotage} successful | {players} as name:role:{score}:who they {accused}.\n"
+    ),
     "summarize": (
         "Summarize the previous {mission}. Particularly, which {players} were successful and who was not. "
         "Highlight the important messages that occurred. "
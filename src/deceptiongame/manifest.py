@@ -0,0 +1,160 @@
+"""
+Sharded log directories and their manifest.
+
+With thousands of games a flat log directory gets slow to list and glob, so
+traces go into `<log_dir>/<YYYYMMDD>/<2 hex chars>/` and every game appends
+a line to `<log_dir>/manifest.jsonl` when it starts and when it finishes:
+
+    {"game_id": ..., "path": "20250710/b2/20250710-002413-b27cf5-default.jsonl",
+     "theme": "default", "models": [...], "status": "running", "bytes": 0, "updated_at": 1752107053.2}
+
+The last line for a path wins. Readers (find_traces and everything built on
+it) list games from the manifest instead of the directory. Lines are short
+and written with a single append, which local filesystems keep whole across
+concurrent games; `rebuild_manifest` rewrites it from the files if needed.
+
+    python -m deceptiongame.manifest rebuild game_logs
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List, Optional
+
+MANIFEST_NAME = "manifest.jsonl"
+TRACE_LAYOUTS = ("sharded", "flat")
+
+_DATE_SHARD = re.compile(r"\d{8}")
+_HASH_SHARD = re.compile(r"[0-9a-f]{2}")
+# <YYYYMMDD-HHMMSS>-<6 hex>-<theme>.<format>, as GameManager names its traces
+_TRACE_NAME = re.compile(r"\d{8}-\d{6}-[0-9a-f]{6}-")
+
+
+def shard_dir(log_dir: str, timestamp: str, suffix: str) -> str:
+    """ Shard for a game started at `timestamp` (YYYYMMDD-HHMMSS) whose file name carries the hex `suffix`. """
+    return os.path.join(log_dir, timestamp[:8], suffix[:2])
+
+
+def log_root(trace_path: str) -> str:
+    """ The log directory a trace belongs to, whether it sits in a shard or directly in it. """
+    directory = os.path.dirname(trace_path)
+    parent = os.path.dirname(directory)
+    if _HASH_SHARD.fullmatch(os.path.basename(directory)) and _DATE_SHARD.fullmatch(os.path.basename(parent)):
+        return os.path.dirname(parent)
+    return directory
+
+
+def manifest_path(log_dir: str) -> str:
+    return os.path.join(log_dir, MANIFEST_NAME)
+
+
+def manifest_entry(trace_path: str, trace: Dict[str, Any], status: str) -> Dict[str, Any]:
+    config = trace.get("config", {})
+    try:
+        size = os.path.getsize(trace_path)
+    except OSError:
+        # a background writer may not have created the file yet
+        size = 0
+    return {
+        "game_id": trace.get("game_id"),
+        "path": os.path.relpath(trace_path, log_root(trace_path)),
+        "theme": config.get("theme"),
+        "models": [p.get("model_name") for p in config.get("players", [])],
+        "status": status,
+        "bytes": size,
+        "updated_at": time.time(),
+    }
+
+
+def append_manifest(log_dir: str, entry: Dict[str, Any]):
+    line = json.dumps(entry) + "\n"
+    # one write on an O_APPEND file, so lines from concurrent games don't interleave
+    fd = os.open(manifest_path(log_dir), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def read_manifest(log_dir: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """ Latest entry per trace path (relative to `log_dir`), in the order games started; None without a manifest. """
+    entries = {}
+    try:
+        with open(manifest_path(log_dir), encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # torn last line
+                    break
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["path"]] = entry
+    except FileNotFoundError:
+        return None
+    return entries
+
+
+def walk_traces(log_dir: str) -> List[str]:
+    """
+    Trace files in `log_dir` and its date/hex shards, by listing them; what the manifest saves readers
+    from doing. Only files named like GameManager's traces count, so other JSON files are left alone.
+    """
+    from deceptiongame.tracer import trace_suffix
+
+    def traces_in(directory):
+        return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+                if _TRACE_NAME.match(f) and trace_suffix(f) and os.path.isfile(os.path.join(directory, f))]
+
+    paths = traces_in(log_dir)
+    for date in sorted(os.listdir(log_dir)):
+        date_dir = os.path.join(log_dir, date)
+        if not (_DATE_SHARD.fullmatch(date) and os.path.isdir(date_dir)):
+            continue
+        for prefix in sorted(os.listdir(date_dir)):
+            if _HASH_SHARD.fullmatch(prefix) and os.path.isdir(os.path.join(date_dir, prefix)):
+                paths.extend(traces_in(os.path.join(date_dir, prefix)))
+    return paths
+
+
+def rebuild_manifest(log_dir: str) -> int:
+    """ Rewrite the manifest of `log_dir` from the traces on disk, e.g. for logs written before it existed. """
+    from deceptiongame.tracer import load_summary, TRUNCATED_ERRORS
+
+    lines = []
+    for path in walk_traces(log_dir):
+        try:
+            summary = load_summary(path)
+        except (ValueError, OSError, KeyError) + TRUNCATED_ERRORS:
+            continue
+        trace = {"game_id": summary["game_id"], "config": {"theme": summary["theme"], "players": summary["players"]}}
+        entry = manifest_entry(path, trace, "finished" if summary["finished"] else "running")
+        entry["path"] = os.path.relpath(path, log_dir)
+        entry["updated_at"] = os.path.getmtime(path)
+        lines.append(json.dumps(entry) + "\n")
+    tmp = f"{manifest_path(log_dir)}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(tmp, manifest_path(log_dir))
+    return len(lines)
+
+
+def ensure_manifest(log_dir: str):
+    """ Index what is already in `log_dir` before the first game appends to a new manifest. """
+    if not os.path.exists(manifest_path(log_dir)) and walk_traces(log_dir):
+        rebuild_manifest(log_dir)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Maintain the manifest of a game log directory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="Rewrite the manifest from the traces on disk")
+    rebuild.add_argument("log_dirs", nargs="+")
+    args = parser.parse_args(argv)
+
+    for log_dir in args.log_dirs:
+        print(f"{log_dir}: {rebuild_manifest(log_dir)} games")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import copy
 import random
 import math
 from typing import Optional, List, Dict, Any, Tuple
@@ -16,13 +17,49 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def resolve_accusation(nominations: List[Any], roles_by_name: Dict[str, str]) -> Tuple[Optional[str], bool, bool]:
+    """
+    Decide the cooperators' accusation from their nominations (player names,
+    'Unknown' abstains). Returns (nominee, defector_found, cooperator_found);
+    nominee is None when there is no clear nominee. Also used offline on traces.
+    """
+    # 1. drop abstentions
+    valid = [pid for pid in nominations if (pid != 'Unknown')]
+
+    # 2. no one voted
+    if not valid:
+        return None, False, False
+
+    # 3. count and find top vote‐getter(s)
+    counts = Counter(valid)
+    max_votes = max(counts.values())
+    top = [pid for pid, v in counts.items() if v == max_votes]
+
+    # 4. ties mean no clear nominee
+    if len(top) != 1:
+        return None, False, False
+
+    nominee_name = top[0]
+    if nominee_name not in roles_by_name:
+        return None, False, False
+
+    # 5. check threshold and role
+    threshold = len(valid) / 2
+    if not max_votes > threshold:
+        return None, False, False
+    defector_found   = roles_by_name[nominee_name] == "defector"
+    cooperator_found = roles_by_name[nominee_name] == "cooperator"
+    return nominee_name, defector_found, cooperator_found
+
+
 class Mission:
     def __init__(
         self, 
         mission_card: Dict[str, Any], 
         event_deck: EventDeck, 
         mission_id: int = 0,
-        tracer: Tracer = None
+        tracer: Tracer = None,
+        rng: Optional[random.Random] = None,
     ):
         self.event_results: List[Dict[int, int]] = []
         self.mission_scores: Dict[int, int] = {}
@@ -48,6 +85,8 @@ class Mission:
         self.coop_scores      = 0
         self.defector_scores  = 0
         self.tracer = tracer
+        # per-game stream for the action decks drawn each event
+        self.rng = rng if rng is not None else random.Random()
         self.init_chat()
         
     def init_chat(self):
@@ -59,6 +98,27 @@ class Mission:
         self.post_event_max = 2
         self.pre_nomination_max = 2
 
+    def fork(self, event_deck: EventDeck, tracer: Tracer, rng: random.Random) -> "Mission":
+        """
+        Independent copy of the mission for a forked game. Lists that are edited in place are copied;
+        finished event results and the event cards are shared since nothing modifies them.
+        """
+        clone = copy.copy(self)
+        clone.event_deck = event_deck
+        clone.tracer = tracer
+        clone.rng = rng
+        if hasattr(self, 'action_deck'):
+            clone.action_deck = self.action_deck.fork(rng)
+        clone.event_results = list(self.event_results)
+        clone.mission_scores = dict(self.mission_scores)
+        clone.event_played = list(self.event_played)
+        clone.event_hand = list(self.event_hand) if self.event_hand is not None else None
+        clone.post_discard_hand = list(self.post_discard_hand) if self.post_discard_hand is not None else None
+        clone.full_chat_history = list(self.full_chat_history)
+        clone.post_event_chat = {pid: list(chats) for pid, chats in self.post_event_chat.items()}
+        clone.pre_nomination_chat = defaultdict(list, {pid: list(chats) for pid, chats in self.pre_nomination_chat.items()})
+        return clone
+
     def add_chat_message(self, player_id: int, message: str):
         """ Add a message to the chat history for a specific player """
         self.full_chat_history.append({
@@ -86,7 +146,7 @@ class Mission:
         }
         """
         self.current_event = self.event_deck.draw_event_card()
-        self.action_deck = ActionDeck()
+        self.action_deck = ActionDeck(rng=self.rng)
         self.event_started = True 
         if len(self.event_results) > 0: # only increment after first event
             self.mission_event_idx += 1
@@ -224,8 +284,9 @@ class Mission:
             'event_started': self.event_started,
             'num_events_left': len(self.event_deck),
             'event_card': self.current_event,
-            'event_hand': self.event_hand,
-            'event_played': self.event_played,
+            # copies: the hand is edited in place while the event is played
+            'event_hand': tuple(self.event_hand) if self.event_hand is not None else None,
+            'event_played': tuple(self.event_played),
             'coop_scores': self.coop_scores,
             'defector_scores': self.defector_scores,
             'mission_id': self.mission_id,
@@ -236,32 +297,10 @@ class Mission:
     
     def _resolve_accusation(self, players: List[Any]) -> Tuple[Optional[Any], bool]:
         nominations = [p.nomination for p in players if p.role_default_theme == "cooperator"]
-        
-        # 1. drop abstentions
-        valid = [pid for pid in nominations if (pid != 'Unknown')]
-
-        # 2. no one voted
-        if not valid:
-            return False, False
-
-        # 3. count and find top vote‐getter(s)
-        counts = Counter(valid)
-        max_votes = max(counts.values())
-        top = [pid for pid, v in counts.items() if v == max_votes]
-
-        # 4. ties mean no clear nominee
-        if len(top) != 1:
-            return False, False
-
-        nominee_name = top[0]
-        nominee = next((p for p in players if p.name == nominee_name), None)
-        if nominee is None:
-            return False, False
-
-        # 5. check threshold and role
-        threshold = len(valid) / 2
-        defector_found   = (max_votes > threshold) and (nominee.role_default_theme == "defector")
-        cooperator_found = (max_votes > threshold) and (nominee.role_default_theme == "cooperator")
+        roles_by_name = {}
+        for p in players:
+            roles_by_name.setdefault(p.name, p.role_default_theme)
+        _, defector_found, cooperator_found = resolve_accusation(nominations, roles_by_name)
         return defector_found, cooperator_found
     
     def calculate_final_mission_scores(
@@ -1,10 +1,13 @@
 import os
 import sys
+import copy
 import uuid
 import numpy as np
 import torch
 import random
+import itertools
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from enum import Enum
 from dataclasses import dataclass
 from collections import Counter
 from datetime import datetime, timezone
@@ -30,16 +33,60 @@ def seed_everything(seed: int):
         pass
     torch.backends.cudnn.deterministic = True
     torch.backends.cudnn.benchmark = False
-seed_everything(42)
 
 from deceptiongame.players import PlayerInterface
 from deceptiongame.actions import * 
 from deceptiongame.mission_manager import Mission
 from deceptiongame.decks import ActionDeck, EventDeck, MissionDeck
-from deceptiongame.tracer import Tracer
+from deceptiongame.tracer import Tracer, NullTracer, JsonlTracer, COMPRESSION_SUFFIXES, resolve_compression, trace_stem
+from deceptiongame.manifest import TRACE_LAYOUTS, ensure_manifest, shard_dir
 from deceptiongame.players import RandomPlayer
 from deceptiongame.state_loader import *
 
+class Phase(Enum):
+    """ Where a game is. Actions only update counters; _advance_game makes the transitions. """
+    SELECT_ROLE = 'select_role'
+    PLAY_CARD = 'play_card'
+    POST_EVENT_CHAT = 'post_event_chat'
+    VOTE = 'vote'
+    PRE_NOMINATION_CHAT = 'pre_nomination_chat'
+    NOMINATE = 'nominate'
+    RESOLVE_EVENT = 'resolve_event'
+    GAME_OVER = 'game_over'
+
+
+class FrozenDict(dict):
+    """ A dict that refuses to be modified. Copy it with dict(state) if you need to change it. """
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Game state snapshots are read-only; copy with dict(state) first")
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """ Read-only copy of nested dicts and lists, as FrozenDicts and tuples; other values are shared. """
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+STATE_SECTIONS = ('players', 'scores', 'mission')
+_history_ids = itertools.count()
+
+# json rewrites the whole trace every step, jsonl appends one record per step
+# (trace_options go to JsonlTracer, e.g. {'flush_every': 64, 'fsync': 'close'}).
+# trace_compression is None, 'gzip', 'zstd' or 'auto'; dedup_prompts stores the
+# system prompt once in <log_dir>/prompts and references it by sha256.
+# trace_layout 'sharded' puts traces in <log_dir>/<YYYYMMDD>/<hex prefix>/,
+# 'flat' directly in <log_dir>; either way the game is listed in <log_dir>/manifest.jsonl.
+TRACE_FORMATS = {'json': Tracer, 'jsonl': JsonlTracer}
+
+
 # The GameManager remains largely the same except that pending_actions now holds action classes.
 class GameManager:
     def __init__(
@@ -51,14 +98,24 @@ class GameManager:
         debug_mode: bool = False,
         turn_based_chat: bool = False,
         save_trace: bool = False,
-        load_action_trace: bool = False,
-        replay_to: Tuple[int] | None = None,
         theme: str = 'default',
-        seed: int = 42,
+        seed: Optional[int] = 42,
         multiplayer=False,
+        trace_format: str = 'json',
+        trace_options: Optional[Dict[str, Any]] = None,
+        trace_compression: Optional[str] = None,
+        dedup_prompts: bool = False,
+        trace_layout: str = 'sharded',
     ):
         if not players:
             raise ValueError("At least one player is required to start the game.")
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace_format {trace_format!r}, expected one of {list(TRACE_FORMATS)}")
+        if trace_options and trace_format != 'jsonl':
+            raise ValueError(f"trace_options only apply to the 'jsonl' trace_format, got {trace_format!r}")
+        if trace_layout not in TRACE_LAYOUTS:
+            raise ValueError(f"Unknown trace_layout {trace_layout!r}, expected one of {list(TRACE_LAYOUTS)}")
+        trace_compression = resolve_compression(trace_compression)
         
         self.leader_rotation = 'player_id'
         if self.leader_rotation == 'alphabetical':
@@ -68,17 +125,29 @@ class GameManager:
         else:
             self.players = players
         self.theme = theme
-        self.seed = seed   
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**32)
+        self.seed = seed
+        # all engine randomness for this game comes from here, so concurrent games don't share state
+        self.rng = random.Random(seed)
         self.debug_mode = debug_mode
         if self.debug_mode:
             print("Debug Mode Set")
         self.pending_actions: Dict[int, List[type]] = {}
-        self.action_deck = ActionDeck(total_cards=len(self.players) * 10, seed=seed)
+        # get_state() cache: bumped on every change, sections are rebuilt only when dirty
+        self.state_version = 0
+        self._dirty = set(STATE_SECTIONS)
+        self._state_cache = None
+        self._state_cache_version = -1
+        self._state_sections: Dict[str, Any] = {}
+        # name -> (list, tuple of its items so far) for the append-only histories in get_state()
+        self._history_snapshots: Dict[str, Any] = {}
+        self.action_deck = ActionDeck(total_cards=len(self.players) * 10, rng=self.rng)
         self.total_missions = total_missions
         self.mission_deck = MissionDeck(
             num_players=len(self.players),
             theme=theme,
-            seed=seed,
+            rng=self.rng,
             deck_size=self.total_missions,
             events_per_mission=events_per_mission
         )
@@ -99,9 +168,15 @@ class GameManager:
         else:
             log_dir = 'game_logs'
         os.makedirs(log_dir, exist_ok=True)
-        trace_save_path = os.path.join(log_dir, f"{timestamp}-{suff}-{theme}.json")
+        game_dir = shard_dir(log_dir, timestamp, suff) if trace_layout == 'sharded' else log_dir
+        if save_trace:
+            os.makedirs(game_dir, exist_ok=True)
+            ensure_manifest(log_dir)
+        trace_save_path = os.path.join(game_dir, f"{timestamp}-{suff}-{theme}.{trace_format}")
+        if trace_compression:
+            trace_save_path += COMPRESSION_SUFFIXES[trace_compression]
         self.save_trace = save_trace
-        self.tracer = Tracer(
+        self.tracer = TRACE_FORMATS[trace_format](
             config={
                 'total_missions': total_missions,
                 'events_per_mission': events_per_mission,
@@ -123,32 +198,31 @@ class GameManager:
                 'system_prompt': self.players[0]._build_system_prompt() if hasattr(self.players[0], 'avatar') else "",
             },
             save_path=trace_save_path,
-            save_trace=save_trace
+            save_trace=save_trace,
+            dedup_prompts=dedup_prompts,
+            manifest=log_dir,
+            **(trace_options or {})
         )
-        if load_action_trace:
-            # store game info
-            tracer_game_id, tracer_started_at = self.tracer.trace['game_id'], self.tracer.trace['started_at']
-            self.tracer = Tracer.load_from_file(load_action_trace)
-            # self.tracer._is_enabled = False
-            logger.info(f'Loaded game trace from {load_action_trace}')
-            self.tracer._trace_save_path = load_action_trace.replace('.json', '.new.json')
-            self.tracer.trace['game_id'] = tracer_game_id
-            self.tracer.trace['started_at'] = tracer_started_at
-        self._replay_to_mission, self._replay_to_event = replay_to if load_action_trace else (None, None)
-        self._replay_ptr = 0 if load_action_trace else None
-        self._replay_pre_mission_ptr = 0 if load_action_trace else None # {
-        #    "ptr": 0 if load_action_trace else None,
-        #    "num_actions": [len(m['actions']) for m in self.tracer['missions']]
-        #}
-        
         for player in self.players:
             player.tracer = self.tracer
+            player.rng = random.Random(f"{seed}:player:{player.player_id}")
             
         self.full_action_history = []
+        # tells this game's history apart from its forks' in get_state()
+        self.history_id = next(_history_ids)
         self.full_event_history = []
         self.mission_history = []
         self.num_rerolls = 0
         self.max_rerolls = 25
+
+        # phase state machine, see _advance_game
+        self.phase = Phase.SELECT_ROLE
+        self._awaiting = set()
+        self._chat_order: List[PlayerInterface] = []
+        self._chat_turn = 0
+        self._chat_turns = 0
+        self._end_of_mission = False
+        self._num_forks = 0
         
     def player_from_id(self, pid: int) -> PlayerInterface | None:
         for player in self.players:
@@ -177,43 +251,94 @@ class GameManager:
         leader_index = self.players.index(leader)
         return self.players[leader_index:] + self.players[:leader_index]
 
+    def _touch(self, *sections: str):
+        """ Record a change to the game; sections name the parts of get_state() that need rebuilding. """
+        self.state_version += 1
+        self._dirty.update(sections)
+
+    def _history_snapshot(self, name: str, items: list, convert=None) -> tuple:
+        """
+        Tuple of the append-only list `items` (each item passed through `convert`), extended with what was
+        appended since the last snapshot of the same list instead of copied again.
+        """
+        source, snapshot = self._history_snapshots.get(name, (None, ()))
+        if source is not items or len(snapshot) > len(items):
+            snapshot = ()
+        if len(snapshot) < len(items):
+            new = items[len(snapshot):]
+            snapshot += tuple(new) if convert is None else tuple(map(convert, new))
+        self._history_snapshots[name] = (items, snapshot)
+        return snapshot
+
     def get_state(self) -> Dict[str, Any]:
-        player_info = [{
-            "player_id": player.player_id,
-            "name": player.name,
-            "role": getattr(player, "role", None),
-            "role_default_theme": getattr(player, "role_default_theme", None),
-            "is_leader": getattr(player, "is_leader", False),
-            "selected_card": getattr(player, "selected_card", None),
-            "hand": getattr(player, "hand", None),
-            "nomination": getattr(player, "nomination", None),
-            "vote_choice": getattr(player, "vote_choice", None),
-            "username": getattr(player, "username", None),
-            "score": getattr(self.cumulative_scores, str(player.player_id), None),
-            
-        } for player in self.players]
-        mission_state = self.mission.get_mission_state() if hasattr(self, 'mission') else {}
-        
-        return {
-            'player_info': player_info, 
-            'cumulative_scores': self.cumulative_scores,
-            "game_over": self.game_over(), 
-            'total_missions': self.total_missions,
-            'full_action_history' : self.full_action_history,     
-            'full_event_history': self.full_event_history,
-            'mission_history': self.mission_history, 
-            **mission_state
-            }
+        """
+        Read-only snapshot of the game. The same object is returned until state_version moves on, and only the
+        dirty sections are rebuilt. Nothing in it changes afterwards: nested dicts and lists are frozen copies
+        and the histories tuples of what they held at this version. history_id tells this game's history apart
+        from a fork's.
+        """
+        if self._state_cache is not None and self._state_cache_version == self.state_version:
+            return self._state_cache
+
+        sections = self._state_sections
+        if 'players' in self._dirty:
+            sections['players'] = tuple(FrozenDict(
+                player_id=player.player_id,
+                name=player.name,
+                role=getattr(player, "role", None),
+                role_default_theme=getattr(player, "role_default_theme", None),
+                is_leader=getattr(player, "is_leader", False),
+                selected_card=getattr(player, "selected_card", None),
+                hand=tuple(player.hand) if getattr(player, "hand", None) is not None else None,
+                nomination=getattr(player, "nomination", None),
+                vote_choice=getattr(player, "vote_choice", None),
+                username=getattr(player, "username", None),
+                score=getattr(self.cumulative_scores, str(player.player_id), None),
+            ) for player in self.players)
+        if 'scores' in self._dirty:
+            sections['scores'] = FrozenDict(self.cumulative_scores)
+        if 'mission' in self._dirty:
+            if hasattr(self, 'mission'):
+                mission_state = dict(self.mission.get_mission_state())
+                # chat messages don't touch the mission section, the chat is taken below on every snapshot
+                del mission_state['chat_history']
+                sections['mission'] = freeze(mission_state)
+            else:
+                sections['mission'] = {}
+        self._dirty.clear()
+        histories = {}
+        if hasattr(self, 'mission'):
+            histories['chat_history'] = self._history_snapshot('chat', self.mission.full_chat_history, freeze)
+
+        self._state_cache = FrozenDict(
+            player_info=sections['players'],
+            cumulative_scores=sections['scores'],
+            game_over=self.game_over(),
+            total_missions=self.total_missions,
+            full_action_history=self._history_snapshot('actions', self.full_action_history),
+            full_event_history=self._history_snapshot('events', self.full_event_history, freeze),
+            mission_history=self._history_snapshot('missions', self.mission_history, freeze),
+            history_id=self.history_id,
+            phase=self.phase.value,
+            state_version=self.state_version,
+            **sections['mission'],
+            **histories,
+        )
+        self._state_cache_version = self.state_version
+        return self._state_cache
 
     def start_mission(self):  
         self.mission_card = self.mission_deck.draw_mission_card()
-        self.event_deck = EventDeck(num_players=len(self.players), deck_size=self.mission_card.events_per_mission, seed=self.seed, theme=self.theme)
+        self.event_deck = EventDeck(num_players=len(self.players), deck_size=self.mission_card.events_per_mission, rng=self.rng, theme=self.theme)
         self.mission = Mission(
             self.mission_card,
             self.event_deck, 
             mission_id=self.current_mission,
-            tracer=self.tracer)
+            tracer=self.tracer,
+            rng=self.rng)
         self.tracer.start_mission(self.current_mission, self.mission.payoff_matrix)
+        self._await(Phase.SELECT_ROLE, attr='role')
+        self._touch('players', 'mission')
 
     def cleanup_mission(self, mission_end_state: Dict[str, Any]):
         self.full_event_history.extend(self.mission.event_results)
@@ -238,77 +363,80 @@ class GameManager:
         )
         print("Game Over")
         if self.save_trace:
-            self.tracer.save_trace_to_json() 
+            self.tracer.flush() 
         
     def advance_game_to_next_action(self) -> Dict[int, List[type]]:
-        pending = {}
-        for _ in range(20):
-            pending = self._advance_game()
-            
-             # 2) if chat is off, strip out any DiscussionAction
-            if not self.turn_based_chat:
-                raise ValueError("Not implemented yet")
-                for pid, actions in pending.items():
-                    pending[pid] = [act for act in actions if act is not DiscussionAction]
-            
-                # remove empty actions
-                pending = {pid: actions for pid, actions in pending.items() if actions}
-                # if all players have no actions, break
-            
-            if self.game_over(): 
-                return {}
-            if pending: break
-            
-        if not pending: 
-            raise ValueError("No pending actions after 20 steps")
-       
-        # 3) stash and return
+        pending = self._advance_game()
+        if not self.turn_based_chat:
+            raise ValueError("Not implemented yet")
+        if self.game_over():
+            return {}
+        if not pending:
+            raise ValueError(f"No pending actions in phase {self.phase}")
         self.pending_actions = pending
         return pending
     
     def get_pending_actions(self) -> Dict[int, List[type]]:
         return self.pending_actions
-    
+
+    def _await(self, phase: Phase, players: Optional[List[PlayerInterface]] = None, attr: Optional[str] = None):
+        """ Enter a phase where every player in `players` acts at once. With `attr`, players that already have it set are skipped. """
+        self.phase = phase
+        players = self.players if players is None else players
+        self._awaiting = {p.player_id for p in players if attr is None or getattr(p, attr, None) is None}
+
+    def _begin_chat(self, phase: Phase, rounds: int):
+        """ Enter a turn-based chat phase: `rounds` messages per player, starting from the leader. """
+        self.phase = phase
+        self._chat_order = self.get_players_by_leader()
+        self._chat_turn = 0
+        self._chat_turns = rounds * len(self._chat_order)
+
+    def _player_votes(self) -> List[Dict[str, Any]]:
+        return [{
+            "player_id": p.player_id,
+            "name": p.name,
+            "vote_choice": p.vote_choice,
+            "nomination": p.nomination,
+        } for p in self.players]
+
     def _advance_game(self) -> Dict[int, List[type]]:
-        req_actions: Dict[int, List[type]] = {}
+        """ Run phase transitions until some player has to act, and return what they owe. """
         if self.save_trace:
-            self.tracer.save_trace_to_json()
+            self.tracer.flush()
         if not hasattr(self, 'mission'):
             self.start_mission()
-        current_state = self.get_state()
-        # Step 1: Role selection
-        #check if all players are cooperators and force em to pick again
-        if any(p["role"] is None for p in current_state['player_info']):
-            for p in current_state['player_info']:
-                if p["role"] is None:
-                    req_actions.setdefault(p["player_id"], []).append(SelectRoleAction)
+        while self.phase is not Phase.GAME_OVER:
+            pending = self._phase_steps[self.phase](self)
+            if pending:
+                return pending
+            # the step moved the game on
+            self._touch('players', 'mission')
+        return {}
+
+    def _step_select_role(self):
+        if self._awaiting:
             logger.debug('[_advance_game] Players need to select their role')
-            return req_actions
-        else:
-            logger.debug(f"Roles: {[p['role'] for p in current_state['player_info']]}")
-            
-        if all(p["role_default_theme"] == "defector" for p in current_state['player_info']):
-            for p in current_state['player_info']:
-                p["role"] = None
-                req_actions.setdefault(p["player_id"], []).append(SelectRoleAction)
-        
+            return {p.player_id: [SelectRoleAction] for p in self.players if p.player_id in self._awaiting}
+
+        # check if all players are defectors and force em to pick again
+        if all(getattr(p, "role_default_theme", None) == "defector" for p in self.players):
             print ('[_advance_game] Making players pick again')
             self.num_rerolls += 1
             if self.num_rerolls > self.max_rerolls:
                 self.quit_game()
                 return 'quit_game'
-            else:
-                print (f'Rerolling {self.num_rerolls}/{self.max_rerolls}')
-            return req_actions
-        
-        # Step 2: Leader check and hand distribution
+            print (f'Rerolling {self.num_rerolls}/{self.max_rerolls}')
+            self._await(Phase.SELECT_ROLE)
+            return {p.player_id: [SelectRoleAction] for p in self.players}
+
+        self._start_event()
+
+    def _start_event(self):
+        # leader check and hand distribution
         if not any(getattr(p, "is_leader", False) for p in self.players):
             leader = self.rotate_leader()
-            logger.debug(f'[_advance_game] Rotated leader to {leader.name}')
-        else:
-            logger.debug(f"is_leader: {[p['is_leader'] for p in current_state['player_info']]}")
-            
-            
+            logger.debug('[_advance_game] Rotated leader to %s', leader.name)
         # new mechanic
         # give a hand to the leader
         # the leader picks 1 card
@@ -318,230 +446,227 @@ class GameManager:
         if not self.mission.event_started:
             logger.debug('starting new event')
             self.mission.start_new_event()
-            self._replay_ptr = 0
-            #get id of leader
-            #leader = next((p for p in self.players if getattr(p, "is_leader", False)))
-            #leader_index = self.players.index(leader)
-            #order is circular starting from the leader
-            #self.player_card_selection_order = self.players[leader_index:] + self.players[:leader_index]
-        
-       
-        #give the hand to the next player in the order
-        if len(self.player_card_selection_order) > 0:
-            # get player who has a card to play
+        self.phase = Phase.PLAY_CARD
+
+    def _step_play_card(self):
+        # give the hand to the next player in the order
+        while self.player_card_selection_order:
             current_player = self.player_card_selection_order[0]
-            
-            # check if player has a card to play
             if current_player.selected_card:
                 move_to_next_player = self.mission.advance_event_step(current_player.selected_card)
                 current_player.selected_card = None
+                self._touch('players', 'mission')
                 # played card
-                if move_to_next_player: 
+                if move_to_next_player:
                     current_player.hand = []
                     self.player_card_selection_order.pop(0)
-                    return {} #
+                    continue
                 # else, they discarded
-                
-            #give the hand to the player
-            current_player.hand, card_action_type = self.mission.get_current_cards()
-            #remove the player from the order
-            logger.debug(f'[_advance_game] Gave hand {self.mission.event_hand} to {current_player.name}')
-            req_actions.setdefault(current_player.player_id, []).append(card_action_type)
-            return req_actions
-        
-        self.mission.compute_event_outcome()
+            cards, card_action_type = self.mission.get_current_cards()
+            if current_player.hand is not cards:
+                current_player.hand = cards
+                self._touch('players')
+            logger.debug('[_advance_game] Gave hand %s to %s', self.mission.event_hand, current_player.name)
+            return {current_player.player_id: [card_action_type]}
 
-        #check for chats:
-        # this is a defeault dict of lists per player id
-        min_chats = min([len(self.mission.post_event_chat[p.pid] ) for p in self.players])
-        max_chats = max([len(self.mission.post_event_chat[p.pid] ) for p in self.players])
+        self.mission.compute_event_outcome()
         self.last_chat_phase = 'post_event'
-        # all players who have less than max chats get a chat action
-        if min_chats < self.mission.post_event_max:
-            for player in self.get_players_by_leader():
-                chats = self.mission.post_event_chat[player.pid]
-                # check if its their turn
-                if len(chats) == min_chats:
-                    req_actions.setdefault(player.pid, []).append(DiscussionAction)
-                    logger.debug("[_advance_game] players need to chat POST EVENT")
-                    return req_actions
-
-        # all players have played their cards, but voting/pointing not done yet
-        nomination_needed = any(p.get("nomination") is None for p in current_state["player_info"])
-        vote_needed = any(p.get("vote_choice") is None for p in current_state["player_info"])
-        is_final_event = self.mission.events_complete()
-        
-        logger.debug(f'nomination needed: {nomination_needed}')
-        logger.debug(f'vote needed: {vote_needed}')
-        logger.debug(f'IS FINAL EVENT: {is_final_event}')
-        logger.debug(f'CHAT PHASE: {self.last_chat_phase}')
-
-        if not is_final_event and vote_needed:
-            for p in current_state["player_info"]:
-                if p.get("vote_choice") is None:
-                    req_actions.setdefault(p["player_id"], []).append(VoteAction)
-            logger.debug("[_advance_game] players need to vote")
-            return req_actions
-        
-        #check if players voted to retreat
-        withdraw_from_mission = self.mission.retreat_mission(current_state['player_info'])
-        '''if self.turn_based_chat:
-            min_chats = min([len(self.mission.post_vote_chat[p.pid] ) for p in self.players])
-            self.last_chat_phase = 'post_vote'
-            if min_chats < 1:  # TODO reset to 3
-                for player in self.get_players_by_leader():
-                    chats = self.mission.post_vote_chat[player.pid]
-                    # check if its their turn
-                    if len(chats) == min_chats:
-                        req_actions.setdefault(player.pid, []).append(DiscussionAction)
-                        print("[_advance_game] players need to chat POST VOTE")
-                        return req_actions'''
+        self._begin_chat(Phase.POST_EVENT_CHAT, self.mission.post_event_max)
 
-                
-        end_of_mission = is_final_event or withdraw_from_mission
+    def _step_chat(self):
+        if self._chat_turn < self._chat_turns:
+            player = self._chat_order[self._chat_turn % len(self._chat_order)]
+            logger.debug('[_advance_game] %s needs to chat (%s)', player.name, self.phase.value)
+            return {player.player_id: [DiscussionAction]}
+
+        if self.phase is Phase.PRE_NOMINATION_CHAT:
+            self._await(Phase.NOMINATE, attr='nomination')
+        elif self.mission.events_complete():
+            # no retreat vote on the final event
+            self._end_of_event()
+        else:
+            self._await(Phase.VOTE, attr='vote_choice')
+
+    def _step_vote(self):
+        if self._awaiting:
+            logger.debug('[_advance_game] players need to vote')
+            return {p.player_id: [VoteAction] for p in self.players if p.player_id in self._awaiting}
+        self._end_of_event()
+
+    def _end_of_event(self):
+        # check if players voted to retreat
+        withdraw_from_mission = self.mission.retreat_mission(self._player_votes())
+        self._end_of_mission = self.mission.events_complete() or withdraw_from_mission
         if self.debug_mode:
-            logger.debug(f'[DEBUG] end of mission??: {end_of_mission} -- ({is_final_event} or {withdraw_from_mission})')
-        if end_of_mission and nomination_needed:
-            #nomination chat
-            if self.turn_based_chat:
-                min_chats = min([len(self.mission.pre_nomination_chat[p.pid] ) for p in self.players])
-                self.last_chat_phase = 'pre_nomination'
-                # all players who have less than max chats get a chat action
-                if min_chats < self.mission.pre_nomination_max: # TODO RESET TO 3
-                    for player in self.get_players_by_leader():
-                        chats = self.mission.pre_nomination_chat[player.pid]
-                        # check if its their turn
-                        if len(chats) == min_chats:
-                            req_actions.setdefault(player.pid, []).append(DiscussionAction)
-                            logger.debug("[_advance_game] players need to chat")
-                            return req_actions
-            
-            
-            for p in current_state["player_info"]:
-                if p.get("nomination") is None:
-                    req_actions.setdefault(p["player_id"], []).append(NominatePlayerAction)
-            logger.debug("[_advance_game] players need to nominate")
-            return req_actions
-        
-        #quick error handling
-        players_voted = all([p.get("vote_choice") for p in current_state['player_info']])
-        players_nominated = all([p.get("nomination") != None for p in current_state['player_info']])
-        if not players_voted and not players_nominated: raise ValueError("Unhandled state: all players have not voted and nominated")
-        
-        #players have played their cards, and voted (and nominated): event is finished 
-        if players_nominated:
-            self.mission.resolve_nomination(current_state['player_info'])
+            logger.debug(f'[DEBUG] end of mission??: {self._end_of_mission}')
+        if not self._end_of_mission:
+            self.phase = Phase.RESOLVE_EVENT
+        elif self.turn_based_chat:
+            # nomination chat
+            self.last_chat_phase = 'pre_nomination'
+            self._begin_chat(Phase.PRE_NOMINATION_CHAT, self.mission.pre_nomination_max)
+        else:
+            self._await(Phase.NOMINATE, attr='nomination')
+
+    def _step_nominate(self):
+        if self._awaiting:
+            logger.debug('[_advance_game] players need to nominate')
+            return {p.player_id: [NominatePlayerAction] for p in self.players if p.player_id in self._awaiting}
+        self.phase = Phase.RESOLVE_EVENT
+
+    def _step_resolve_event(self):
+        # players have played their cards, and voted (and nominated): event is finished
+        if self._end_of_mission:
+            self.mission.resolve_nomination(self._player_votes())
         else:
             self.mission._resolve_event()
-        
-        if not end_of_mission:
+
+        self.last_leader = None
+        for p in self.players:
+            if getattr(p, "is_leader", False):
+                self.last_leader = p
+                break
+
+        if not self._end_of_mission:
             logger.debug("[_advance_game] retreat vote failed. Start new event with no change")
-            # self.mission.resolve_event(current_state['player_info'])
-            
-            self.last_leader = None
-            for p in self.players:
-                if getattr(p, "is_leader", False):
-                    self.last_leader = p
-                    break
             for player in self.players:
                 player.partial_reset()
-                logger.debug(f'Partially resetting {player}')
-            return {}
-        
-        
-        votes = [p['vote_choice'] for p in current_state['player_info']]
-        logger.debug(f'[_advance_game] Votes are in!: {votes}')
-        nominations = [(p['name'], p['nomination']) for p in current_state['player_info']]
-        logger.debug(f'[_advance_game] Nominations: {nominations}')
-            
-        self._replay_pre_mission_ptr = 0
+            self._start_event()
+            return
+
         scores_breakdown, mission_end_state = self.mission.calculate_final_mission_scores(self.players) # potentially a score change
         for pid, score in scores_breakdown.items():
             self.cumulative_scores[pid] += score
+        self._touch('scores')
         self.tracer.record_mission_scores(self.cumulative_scores)
         if self.debug_mode:
             logger.debug(f"[_advance_game] mission over. Current score: {self.cumulative_scores}")
-            for pid, score in self.cumulative_scores.items():
-                logger.debug(f'\t {self.player_from_id(pid).name}: {score}')
-            
-        # Reset per-event player attributes
-        self.last_leader = None
-        for p in self.players:
-            if getattr(p, "is_leader", False):
-                self.last_leader = p
-                break
+
+        # Reset per-mission player attributes
         for p in self.players:
             p.full_reset()
-        
+
         self.tracer.end_mission()
         # If mission events are complete, advance mission
         self.current_mission += 1
-        
+
         # utilties that help showing final mission progress to front-end before it get wiped on new mission init
         self.cleanup_mission(mission_end_state)
-        
+
         if self.game_over():
+            self.phase = Phase.GAME_OVER
             self.tracer.finish_game(
                 outcome={'scores': self.cumulative_scores}
             )
             logger.debug("Game Over")
             if self.save_trace:
-                self.tracer.save_trace_to_json()
+                self.tracer.flush()
         else:
             self.start_mission()
-        return {}             
 
-    def process_player_action(self, action: GameAction, replay: Tuple[int] | bool = False) -> Dict[str, Any]:
+    _phase_steps = {
+        Phase.SELECT_ROLE: _step_select_role,
+        Phase.PLAY_CARD: _step_play_card,
+        Phase.POST_EVENT_CHAT: _step_chat,
+        Phase.VOTE: _step_vote,
+        Phase.PRE_NOMINATION_CHAT: _step_chat,
+        Phase.NOMINATE: _step_nominate,
+        Phase.RESOLVE_EVENT: _step_resolve_event,
+    }
+
+    # per-player attributes the engine reads and writes, carried over to substitute players in fork()
+    _PLAYER_GAME_STATE = ('role', 'role_default_theme', 'hand', 'is_leader', 'vote_choice',
+                          'nominated', 'nomination', 'selected_card')
+
+    def fork(
+        self,
+        seed: Optional[int] = None,
+        players: Optional[List[PlayerInterface]] = None,
+        same_stream: bool = False,
+    ) -> "GameManager":
+        """
+        Branch the game here for counterfactual rollouts. The fork shares everything that is never modified
+        (event and mission cards, finished history entries, LLM clients) and copies what the engine edits in
+        place. It has no trace and never writes to disk.
+
+        :param seed: seed for the fork's random stream. By default it is derived from the game seed and the
+            number of forks taken so far, so repeated forks differ but are reproducible. The parent's
+            stream is never touched.
+        :param players: optional stand-ins (e.g. scripted or cached policies), matched by player_id, that
+            take over the current player state. Otherwise each player is forked with player.fork().
+        :param same_stream: continue the parent's random streams instead of branching new ones, so the fork
+            plays out exactly like the parent would. Used for replay checkpoints.
+        """
+        if same_stream:
+            seed = self.seed
+        elif seed is None:
+            seed = f"{self.seed}:fork:{self._num_forks}"
+            self._num_forks += 1
+
+        fork = copy.copy(self)
+        fork.seed = seed
+        fork.rng = random.Random(seed)
+        if same_stream:
+            fork.rng.setstate(self.rng.getstate())
+        fork.tracer = NullTracer(config=self.tracer.trace['config'])
+        fork.save_trace = False
+        fork._num_forks = 0
+
+        fork.action_deck = self.action_deck.fork(fork.rng)
+        fork.mission_deck = self.mission_deck.fork(fork.rng)
+        if hasattr(self, 'mission'):
+            fork.event_deck = self.event_deck.fork(fork.rng)
+            fork.mission = self.mission.fork(fork.event_deck, fork.tracer, fork.rng)
+
+        # players; the current hand is usually the mission's event hand itself, keep that aliasing
+        hands = {}
+        if hasattr(self, 'mission'):
+            for old, new in ((self.mission.event_hand, fork.mission.event_hand),
+                             (self.mission.post_discard_hand, fork.mission.post_discard_hand)):
+                if old is not None:
+                    hands[id(old)] = new
+        stand_ins = {p.player_id: p for p in players} if players is not None else {}
+        clones = {}
+        for player in self.players:
+            if player.player_id in stand_ins:
+                clone = stand_ins[player.player_id]
+                for attr in self._PLAYER_GAME_STATE:
+                    setattr(clone, attr, copy.copy(getattr(player, attr, None)))
+            else:
+                clone = player.fork()
+            if getattr(player, 'hand', None) is not None:
+                clone.hand = hands.get(id(player.hand), clone.hand)
+            clone.tracer = fork.tracer
+            clone.rng = random.Random(f"{seed}:player:{player.player_id}")
+            if same_stream:
+                clone.rng.setstate(player.rng.getstate())
+            clones[player.player_id] = clone
+        remap = lambda ps: [clones[p.player_id] for p in ps] if ps is not None else None
+        fork.players = remap(self.players)
+        fork.player_card_selection_order = remap(self.player_card_selection_order)
+        fork._chat_order = remap(self._chat_order)
+        fork.last_leader = clones[self.last_leader.player_id] if self.last_leader is not None else None
+
+        fork.cumulative_scores = dict(self.cumulative_scores)
+        fork.pending_actions = {pid: list(actions) for pid, actions in self.pending_actions.items()}
+        fork.full_action_history = list(self.full_action_history)
+        fork.full_event_history = list(self.full_event_history)
+        fork.mission_history = list(self.mission_history)
+        fork._awaiting = set(self._awaiting)
+
+        fork._dirty = set(STATE_SECTIONS)
+        fork._state_cache = None
+        fork._state_sections = {}
+        fork._history_snapshots = {}
+        fork.history_id = next(_history_ids)
+        return fork
+
+    def process_player_action(self, action: GameAction) -> Dict[str, Any]:
         # Check that the player's action type is pending
         pending = self.pending_actions.get(action.player_id, [])
         logger.debug(f"[DEBUG] Processing action {type(action).__name__} for player {action.player_id}")
         logger.debug(f"[DEBUG] Current pending actions for player {action.player_id}: {[act.__name__ for act in pending]}")
 
-        if replay:
-            game_progressed = (
-                (self.mission.mission_id - 1) >= self._replay_to_mission
-                and (self.mission.mission_event_idx - 1) >= self._replay_to_event
-            )
-            if not game_progressed:
-                print ('[In Replay]')
-                pre_event_actions = len(self.tracer.trace['missions'][self.mission.mission_id-1]['actions'])
-                event = self.tracer.trace["missions"][self.mission.mission_id-1]["events"][self.mission.mission_event_idx-1]
-                if self._replay_pre_mission_ptr < pre_event_actions:
-                    print ('pre mission ptr: ', self._replay_pre_mission_ptr)
-                    ev = self.tracer.trace['missions'][self.mission.mission_id-1]
-                    try:
-                        entry = ev['actions'][self._replay_pre_mission_ptr]
-                    except:
-                        breakpoint()
-                    self._replay_pre_mission_ptr += 1
-                else:
-                    print ('ptr value: ', self._replay_ptr)
-                    entry = event["actions"][self._replay_ptr]
-                    self._replay_ptr += 1
-
-                phase     = entry["phase"]
-                player_id = entry["player_id"]
-                payload   = entry["payload"]
-                if phase == "note_to_self" or phase == pending[0].phase:
-                    pass
-                else:
-                    breakpoint()
-                    raise ValueError(f"Phase mismatch: expected {pending[0].phase}, got {phase}")
-                # map your trace phases → your dataclass constructors
-                cls = {
-                    "select_role":   SelectRoleAction,
-                    "play_card":     (DiscardableCardAction if "is_discard" in payload else PlayCardAction),
-                    "discussion":    DiscussionAction,
-                    "nominate":      NominatePlayerAction,
-                    "vote":          VoteAction,
-                    "note_to_self":  NoteToSelfAction,
-                }[phase]
-                # rehydrate the exact same action object they originally took
-                action = cls(player_id=player_id, **payload)
-                print(f"[REPLAY] Injected action: {phase} by P{player_id} → {payload}")
-                # Log the action
-            else:
-                self.tracer._is_enabled = True            
         if type(action) in pending or isinstance(action, NoteToSelfAction):
             pass
         else:
@@ -573,8 +698,15 @@ class GameManager:
         else:
             raise ValueError("Unhandled action type")
         
+        # Phase bookkeeping; _advance_game makes the transition once nothing is outstanding
+        if isinstance(action, (SelectRoleAction, VoteAction, NominatePlayerAction)):
+            self._awaiting.discard(player.player_id)
+        elif isinstance(action, DiscussionAction) and self.phase in (Phase.POST_EVENT_CHAT, Phase.PRE_NOMINATION_CHAT):
+            self._chat_turn += 1
+
         # Log the action
         self.full_action_history.append((player.player_id, action))
+        self._touch('players')
         
         # Remove the processed action from pending actions
         self.pending_actions[action.player_id] = [
@@ -582,7 +714,9 @@ class GameManager:
         ]
 
 # Test code for running the game manager from start to finish.
+# For win-rate estimates over many games use deceptiongame.sim instead.
 if __name__ == "__main__":
+    seed_everything(42)
     # Create a list of RandomPlayers.
     players = [ RandomPlayer(0, "Alice"), 
                 RandomPlayer(1, "Bob"), 
@@ -602,24 +736,22 @@ if __name__ == "__main__":
     load_action_trace = False
 
     if load_action_trace:
+        from deceptiongame.replay import TraceReplay
         load_action_trace = browse_json_files()
         mission_to_load, event_to_load = state_browser(load_action_trace)
+        print (f'loading to mission {mission_to_load} and event {event_to_load}')
+        replay = TraceReplay.from_file(load_action_trace)
+        replay.seek(mission_to_load, event_to_load)
+        gm = replay.resume(players, save_trace=save_trace, save_path=trace_stem(load_action_trace) + '.new.json')
     else:
-        mission_to_load, event_to_load = None, None
-    print (f'loading to mission {mission_to_load} and event {event_to_load}')
-    import time
-    time.sleep(3)
-        
-    gm = GameManager(
-        players, 
-        total_missions=3, 
-        turn_based_chat=True,  
-        debug_mode=False,
-        save_trace=save_trace,
-        load_action_trace=load_action_trace,
-        replay_to=(mission_to_load, event_to_load),
-        seed=42)
-    gm.start_mission()
+        gm = GameManager(
+            players, 
+            total_missions=3, 
+            turn_based_chat=True,  
+            debug_mode=False,
+            save_trace=save_trace,
+            seed=42)
+        gm.start_mission()
     
     # Run a loop to process pending actions.
     while not gm.game_over():  # fixed number of iterations for testing
@@ -641,8 +773,8 @@ if __name__ == "__main__":
                     act = player.play_card({})
                     #act = PlayCardAction(player.player_id, res["card"])
                 elif action.__name__ == "NominatePlayerAction":
-                    available_ids = [p.player_id for p in players]
-                    act = player.nominate_player({"available_players": available_ids})
+                    available_names = [p.name for p in players]
+                    act = player.nominate_player({"available_players": available_names})
                     #act = NominatePlayerAction(player.player_id, res["nominated_player_id"])
                 elif action.__name__ == "VoteAction":
                     act = player.vote({})
@@ -656,11 +788,7 @@ if __name__ == "__main__":
                     continue
                 
                 #print("player ", player.player_id, "actions: ", act)
-                if load_action_trace:
-                    replay = True
-                else:
-                    replay = None
-                gm.process_player_action(act, replay=replay)
+                gm.process_player_action(act)
     print("Final Game scores:")
     print(gm.cumulative_scores)
     
@@ -263,21 +263,29 @@ def check_score_valid_and_ev(starting_points_defector, sabotage_bonus, defector_
     return is_valid, ev
 
 
-def get_scores_and_ev():
-    #results from looking at the filtered data when def_unknown = 0 and the accused = each other
-    unusable = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (3, 0)]
-    possible_starting_def_points = [1, 2, 3, 4]
-    possible_sabotage_bonuses = [3, 4, 5]
-    
-    # Generate all possible combinations and filter out unusable ones
+#results from looking at the filtered data when def_unknown = 0 and the accused = each other
+UNUSABLE_COMBINATIONS = [(0, 0), (0, 1), (0, 2), (0, 3), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (3, 0)]
+POSSIBLE_STARTING_DEF_POINTS = [1, 2, 3, 4]
+POSSIBLE_SABOTAGE_BONUSES = [3, 4, 5]
+
+
+def get_valid_combinations():
+    """ (starting_points_defector, sabotage_bonus) pairs that get_scores_and_ev samples from """
     valid_combinations = []
-    for starting_points in possible_starting_def_points:
-        for sabotage_bonus in possible_sabotage_bonuses:
-            if (starting_points, sabotage_bonus) not in unusable:
+    for starting_points in POSSIBLE_STARTING_DEF_POINTS:
+        for sabotage_bonus in POSSIBLE_SABOTAGE_BONUSES:
+            if (starting_points, sabotage_bonus) not in UNUSABLE_COMBINATIONS:
                 valid_combinations.append((starting_points, sabotage_bonus))
+    return valid_combinations
+
+
+def get_scores_and_ev(rng=None):
+    # rng: a per-game random.Random; falls back to the global random module
+    rng = rng if rng is not None else random
+    valid_combinations = get_valid_combinations()
     
     # Sample from valid combinations
-    starting_points_defector, sabotage_bonus = random.choice(valid_combinations)
+    starting_points_defector, sabotage_bonus = rng.choice(valid_combinations)
     
     # Calculate the base score for defector_accused range
     base_score = starting_points_defector + sabotage_bonus
@@ -285,10 +293,10 @@ def get_scores_and_ev():
     # Select defector_accused within +/-1 of base_score
     min_accused = max(0, base_score - 1)  # Ensure non-negative
     max_accused = base_score + 1
-    defector_accused = random.randint(min_accused, max_accused)
+    defector_accused = rng.randint(min_accused, max_accused)
     
     # Set constraints as specified  
-    defector_unknown = random.randint(0, min(possible_sabotage_bonuses) - 1)
+    defector_unknown = rng.randint(0, min(POSSIBLE_SABOTAGE_BONUSES) - 1)
     cooperator_accused = defector_accused
     
     # Get validation and expected value
@@ -1,8 +1,6 @@
 import json
-import random
-import pathlib
-import importlib
-from openai import OpenAI
+import asyncio
+import functools
 from typing import Dict, Any, List, Literal, Union
 from collections import Counter
 from pydantic import BaseModel, create_model
@@ -19,9 +17,14 @@ from deceptiongame.inference_utils import (
     call_chat_completion_gemini,
     call_chat_completion_azure,
     call_chat_completion_xai,
+    CallStats,
+    count_tokens,
 )
+from deceptiongame.client_pool import shared_client
+from deceptiongame.rate_limit import limiter_for
 from deceptiongame.players import PlayerInterface
 from deceptiongame.llm_instructions import INSTRUCTIONS
+from deceptiongame.themed_prompts import themed_prompts
 from deceptiongame.actions import (    
     SelectRoleAction,
     PlayCardAction,
@@ -111,37 +114,49 @@ _XAI_MODELS         = {"grok-2": "grok-2","grok-3": "grok-3"}
 _MISTRAL_MODELS     = {"mistral-small": "mistralai/Mistral-Small-3.2-24B-Instruct-2506"}
 _PROPRIETARY_MODELS = dict(_OPENAI_MODELS, **_ANTHROPIC_MODELS, **_GOOGLE_MODELS, **_XAI_MODELS, **_MISTRAL_MODELS)
 
+# Order of the game state sections in the prompt. 'default' is the original order. 'prefix' goes
+# from most to least stable (prior missions, payoffs, action history, then the event, players table
+# and private info) and shuffles the players table once per mission, so consecutive calls of a
+# player share a long prefix that vLLM's automatic prefix caching can reuse.
+PROMPT_LAYOUTS = ('default', 'prefix')
+
+# How the game state reaches the model. 'state' sends [system, user] with the whole state rendered
+# anew on every call, so prompt tokens per game grow quadratically. 'transcript' keeps one chat per
+# mission: its first call sends the whole state, later calls append only what changed since the
+# player's last turn after its previous answers, and the next mission starts over from the state
+# (with the summary of the last one, if summarization_level is set).
+PROMPT_MODES = ('state', 'transcript')
+
+# How the game state sections are written. 'default' is indented JSON with themed keys. 'compact'
+# writes one short line per section with theme-independent keys, explained once by a legend at
+# the end of the system prompt; the action history and instructions are the same in both.
+PROMPT_PROFILES = ('default', 'compact')
+
+# With a prompt_budget, the action history is cut down until the prompt fits, oldest entries first
+# and one step after the other: nominations and votes are left out, our notes cut to NOTE_CHARS,
+# chat messages cut to CHAT_CHARS, then chat messages and at last any action left out. The last
+# 2 * num_players actions are always kept. What was elided goes on the call's trace entry.
+NOTE_CHARS = 120
+CHAT_CHARS = 80
+
 
 def load_proprietary_model(model_name, provider, api_key, url, api_version):
     if provider == 'azure':
-        from openai import AzureOpenAI
-        import httpx
         logger.info(model_name, provider, api_key, url, api_version)
-        client = AzureOpenAI(
-            azure_endpoint=url,
-            api_key=api_key,
-            api_version=api_version,
-            http_client=httpx.Client(verify=False, trust_env=False),
-        )
+        client = shared_client('azure', url, api_key, api_version)
         model_name = _OPENAI_MODELS[model_name]
         inference_fn = call_chat_completion_azure
     elif provider == 'anthropic':
-        import anthropic, boto3
-        #client = anthropic.Anthropic(api_key=api_key)
         model_name = _ANTHROPIC_MODELS[model_name]
         my_profile_name = '457878818681_AWSAdministratorAccess'
-        dev = boto3.session.Session(profile_name=my_profile_name)
-        client = dev.client(service_name="bedrock-runtime", region_name="us-west-2")
+        client = shared_client('anthropic', 'us-west-2', profile=my_profile_name)
         inference_fn = call_chat_completion_anthropic
     elif provider == 'gemini':
-        from google import genai
-        from google.genai import types
-        client = genai.Client(api_key=api_key)
+        client = shared_client('gemini', api_key=api_key)
         model_name = _GOOGLE_MODELS[model_name]
         inference_fn = call_chat_completion_gemini
     elif provider == 'xai':
-        import xai
-        client = xai.Client(api_key=api_key)
+        client = shared_client('xai', api_key=api_key)
         model_name = _XAI_MODELS[model_name]
         inference_fn = call_chat_completion_xai
     else:
@@ -149,7 +164,39 @@ def load_proprietary_model(model_name, provider, api_key, url, api_version):
     return client, model_name, inference_fn
 
 
+class _PromptCache:
+    """ Prompt sections one player has rendered in one game, identified by the state's history_id. """
+    def __init__(self, history_id):
+        self.history_id = history_id
+        # action history: one (text, prunable) per action from history_key's start, the final part joined
+        self.history_key = None
+        self.history_lines = []
+        self.history_text = ""
+        self.history_stable = 0
+        # name -> (key, rendered)
+        self.sections = {}
+        # (mission_id, order) of the players table in the 'prefix' layout
+        self.players_order = None
+        # history line -> its tokens, for the prompt budget
+        self.line_tokens = {}
+
+
+class _Transcript:
+    """ One player's chat in the current mission of one game, in the 'transcript' prompt mode. """
+    def __init__(self, history_id, mission_id):
+        self.history_id = history_id
+        self.mission_id = mission_id
+        # user and assistant turns after the system prompt
+        self.messages = []
+        # 'actions': number of actions of the history shown so far, other names: what that section showed last
+        self.shown = {}
+
+
 class OnlineAI(PlayerInterface):
+    _fork_copied = PlayerInterface._fork_copied + ('scratchpad', 'mission_summarizations', 'llm_calls')
+    # reuse rendered prompt sections while the state they come from is unchanged
+    cache_prompts = True
+
     def __init__(
         self, 
         player_id: int, 
@@ -166,6 +213,10 @@ class OnlineAI(PlayerInterface):
         tracer: Tracer = None,
         theme_name: str = 'default',
         summarization_level: int = 0,
+        prompt_layout: str = 'default',
+        prompt_mode: str = 'state',
+        prompt_profile: str = 'default',
+        prompt_budget: int = None,
     ):
         """
         Initializes the OnlinePlayer.
@@ -186,16 +237,16 @@ class OnlineAI(PlayerInterface):
         if model_name not in _PROPRIETARY_MODELS:
             self.model_name = _HF_MODEL_TO_URL[model_name]
             self.api_key = "test-dummy"
-            self.client = OpenAI(
-               base_url=self.url,
-               api_key=self.api_key,
-            )
+            # one client, and connection pool, per server for all players in the process
+            self.client = shared_client('vllm', self.url, self.api_key)
             self.provider = 'vllm'
             self.inference_fn = call_chat_completion_vllm
         else:
             self.api_key = api_key
             self.client, self.model_name, self.inference_fn = load_proprietary_model(model_name, provider, api_key, url, api_version)
             self.provider = provider
+        # models.yaml limits for this model and endpoint, shared by every player calling it
+        self.limiter = limiter_for(model_name, self.url)
         self.is_leader = False
         self.avatar = avatar
         self.is_ai = True
@@ -205,91 +256,148 @@ class OnlineAI(PlayerInterface):
         self.is_computing_action = False
         self.tracer = tracer
         self.scratchpad = []
+        # CallStats of the calls behind the action being chosen, attached to its trace entry by log_action
+        self.llm_calls = []
         self.theme_name = theme_name
         self.summarization_level = summarization_level
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt_layout {prompt_layout!r}, expected one of {list(PROMPT_LAYOUTS)}")
+        self.prompt_layout = prompt_layout
+        if prompt_mode not in PROMPT_MODES:
+            raise ValueError(f"Unknown prompt_mode {prompt_mode!r}, expected one of {list(PROMPT_MODES)}")
+        self.prompt_mode = prompt_mode
+        if prompt_profile not in PROMPT_PROFILES:
+            raise ValueError(f"Unknown prompt_profile {prompt_profile!r}, expected one of {list(PROMPT_PROFILES)}")
+        self.prompt_profile = prompt_profile
+        if prompt_budget is not None and prompt_mode != 'state':
+            raise ValueError("prompt_budget only applies to the 'state' prompt mode")
+        # max prompt tokens per call, counted with the model's tokenizer when it is cached locally
+        self.prompt_budget = prompt_budget
+        self._system_tokens = None
+        self._transcript = None
         self.summarization_gamehistory_index = 0
         self.most_recent_note = ""
         self.mission_summarizations = []
-        theme_pkg = f"deceptiongame.themes.{self.theme_name}"
+        self._prompt_sections = None
         self.INSTRUCTIONS = INSTRUCTIONS
-        try:
-            theme_module = importlib.import_module(f"{theme_pkg}.theme")
-            theme_const_name = f"{self.theme_name.upper()}_THEME"
-            self.theme = getattr(theme_module, theme_const_name)
-        except (ImportError, AttributeError) as e:
-            raise RuntimeError(f"Could not import theme data for '{self.theme_name}': {e}")
-        rules_path = pathlib.Path(__file__).parent / "themes" / self.theme_name / "rules.md"
-        if not rules_path.exists():
-            raise FileNotFoundError(f"rules.md not found for theme '{self.theme_name}' at {rules_path}")
-        with open(rules_path, "r", encoding="utf8") as f:
-            self.rules_md = f.read()
+        # theme, rules and instruction templates with the theme terms in, shared by every player of the theme
+        self.prompts = themed_prompts(self.theme_name)
+        self.theme = self.prompts.theme
+        self.rules_md = self.prompts.rules_md
         self.system_prompt = self._build_system_prompt()
 
         
+    def fork(self) -> "OnlineAI":
+        clone = super().fork()
+        # the forked game has its own history, and renders it in another thread
+        clone._prompt_sections = None
+        clone._transcript = None
+        return clone
+
+    def _prompt_cache(self, state: dict) -> _PromptCache:
+        cache = self._prompt_sections
+        if cache is None or cache.history_id != state["history_id"]:
+            cache = self._prompt_sections = _PromptCache(state["history_id"])
+        return cache
+
+    def _cached_section(self, state: dict, name: str, key, render):
+        """ render(), or what it returned last time for the same key in this game; key None means don't cache. """
+        if key is None or not self.cache_prompts:
+            return render()
+        sections = self._prompt_cache(state).sections
+        hit = sections.get(name)
+        if hit is not None and hit[0] == key:
+            return hit[1]
+        rendered = render()
+        sections[name] = (key, rendered)
+        return rendered
+
     def _build_system_prompt(self) -> str:
-        base_template = self.INSTRUCTIONS["system_prompt_template"]
-        sys_prompt =    base_template.format(rules_md=self.rules_md)
+        return self.prompts.system_prompts[self.prompt_profile]
+
+    def _render_history_entry(self, pid, action, player_name_map, im_defector):
+        """ Line of the action history for one action, and whether it is a nomination/vote that may be pruned. """
+        t = self._get_theme_term
+        is_self = pid == self.player_id
+        name = f"You ({player_name_map[pid]})" if is_self else player_name_map[pid]
+
+        # You can re‐theme “played card” → “committed competency” in the action classes
+        if isinstance(action, SelectRoleAction):
+            text = f"{name} selected role {action.role}\n" if is_self or im_defector else ""
+        elif isinstance(action, DiscardableCardAction):
+            verb = t("trashed") if action.is_discard else t("played")
+            show_card = f" {action.card}" if is_self else ""
+            text = f"{name} {verb} {t('card')} {show_card}\n"
+        elif isinstance(action, PlayCardAction):
+            show_card = f" {action.card}" if is_self else ""
+            text = f"{name} {t('played')} {t('card')}{show_card}\n"
+        elif isinstance(action, DiscussionAction):
+            act_msg = action.message.replace("\n","\t")
+            text = f'{name} said: {act_msg}\n'
+        elif isinstance(action, NoteToSelfAction):
+            if is_self:
+                act_msg = action.note.replace("\n", "\t")
+                text = f'Note to self: {act_msg}\n'
+            else:
+                text = ""
+        elif isinstance(action, NominatePlayerAction):
+            return f"{name} {t('nominated')} {action.nominated_player_id}\n", True
+        elif isinstance(action, VoteAction):
+            return f"{name} {t('voted')} {action.vote_choice}\n", True
+        else:
+            raise ValueError("Unhandled action type")
+        return text, False
 
-        return sys_prompt
-    
     def _build_full_history_prompt(self, state: dict) -> str:
         t = self._get_theme_term
         full_history = state["full_action_history"]
-        
-        full_history = full_history[self.summarization_gamehistory_index:]
-        output_prompt = ""
-        
+        start = self.summarization_gamehistory_index
+        n_history = len(full_history)
 
         player_name_map = {p['player_id']: p['username'] for p in state["player_info"]}
         player_id_map   = {p['player_id']: p for p in state["player_info"]}
         num_players = len(state["player_info"])
 
-        maybe_prune = False
-        if len(full_history) >= num_players * 2:
-            last_entries = full_history[-num_players * 2 :]
-            last_actions = [a for (_, a) in last_entries if not isinstance(a, NoteToSelfAction)]
-            la_type = [type(x) for x in last_actions]
-            if len(set(la_type)) > 1:
-                maybe_prune = True
-
-        self_id = self.player_id
-        self_role = player_id_map[self_id].get("role", None)
-        im_defector = self_role and self_role.startswith("defector")
-        for i, (pid, action) in enumerate(full_history):
-            is_self = pid == self_id
-            name = f"You ({player_name_map[pid]})" if is_self else player_name_map[pid]
-
-            # You can re‐theme “played card” → “committed competency” in the action classes
-            if isinstance(action, SelectRoleAction):
-                text = f"{name} selected role {action.role}\n" if is_self or im_defector else ""
-            elif isinstance(action, DiscardableCardAction):
-                verb = t("trashed") if action.is_discard else t("played")
-                show_card = f" {action.card}" if is_self else ""
-                text = f"{name} {verb} {t('card')} {show_card}\n"
-            elif isinstance(action, PlayCardAction):
-                show_card = f" {action.card}" if is_self else ""
-                text = f"{name} {t('played')} {t('card')}{show_card}\n"
-            elif isinstance(action, DiscussionAction):
-                act_msg = action.message.replace("\n","\t")
-                text = f'{name} said: {act_msg}\n'
-            elif isinstance(action, NoteToSelfAction):
-                if is_self:
-                    act_msg = action.note.replace("\n", "\t")
-                    text = f'Note to self: {act_msg}\n'
-                else:
-                    text = ""
-            elif isinstance(action, NominatePlayerAction):
-                if i + 2 * num_players > len(full_history) and maybe_prune:
-                    continue
-                text = f"{name} {t('nominated')} {action.nominated_player_id}\n"
-            elif isinstance(action, VoteAction):
-                if i + 2 * num_players > len(full_history) and maybe_prune:
-                    continue
-                text = f"{name} {t('voted')} {action.vote_choice}\n"
-            else:
-                raise ValueError("Unhandled action type")
-            output_prompt += text
-            
+        maybe_prune = self._prune_recent(full_history, start, num_players)
+
+        self_role = player_id_map[self.player_id].get("role", None)
+        im_defector = bool(self_role and self_role.startswith("defector"))
+
+        # lines are rendered once per action; the history only grows, and what an action shows
+        # changes only with our role (defectors see everyone's role choice) or a summary cutting it off
+        cache = self._prompt_cache(state)
+        key = (start, im_defector, tuple(player_name_map.items()))
+        if cache.history_key != key or not self.cache_prompts:
+            cache.history_key = key
+            cache.history_lines = []
+            cache.history_text = ""
+            cache.history_stable = start
+        lines = cache.history_lines
+        for pid, action in full_history[start + len(lines):]:
+            lines.append(self._render_history_entry(pid, action, player_name_map, im_defector))
+
+        # only nominations and votes among the last 2 * num_players actions may be pruned,
+        # everything before them is final and kept joined
+        stable = max(start, n_history - 2 * num_players + 1)
+        if stable > cache.history_stable:
+            cache.history_text += "".join(text for text, _ in lines[cache.history_stable - start:stable - start])
+            cache.history_stable = stable
+        tail = "".join(text for text, prunable in lines[stable - start:] if not (prunable and maybe_prune))
+        output_prompt = cache.history_text + tail
+        return self._history_heading(output_prompt) + output_prompt
+
+    @staticmethod
+    def _prune_recent(full_history, start, num_players) -> bool:
+        """ Whether the nominations and votes among the last 2 * num_players actions are left out. """
+        if len(full_history) - start < num_players * 2:
+            return False
+        last_entries = full_history[-num_players * 2 :]
+        last_actions = [a for (_, a) in last_entries if not isinstance(a, NoteToSelfAction)]
+        la_type = [type(x) for x in last_actions]
+        return len(set(la_type)) > 1
+
+    def _history_heading(self, output_prompt: str) -> str:
+        t = self._get_theme_term
         post_first_mission =  len(self.mission_summarizations) > 0
         start_of_mission = output_prompt == ""
         if start_of_mission:
@@ -298,24 +406,91 @@ class OnlineAI(PlayerInterface):
             prompt_start = f"Here is the action history for the current {t('mission')}:\n"
         else:
             prompt_start = f"Here is the full action history for the {t('mission')}:\n"
-        
+        return prompt_start
+
+    def _fit_prompt_budget(self, state: dict, is_summary, action_prompt: str):
+        """
+        State part of the user prompt, with the action history cut down (see NOTE_CHARS) until the
+        whole prompt fits in prompt_budget tokens. Also returns a record of the history entries that
+        were elided, by index in the full action history, or None when the prompt fit as it was.
+        """
+        lead = f"{self.username}, here is the current state:\n "
+        state_prompt = self._build_game_state_prompt(state, is_summary=is_summary)
+        if self.prompt_budget is None:
+            return lead + state_prompt, None
+        count = functools.partial(count_tokens, self.model_name)
+        if self._system_tokens is None:
+            self._system_tokens = count(self.system_prompt)
+        tokens = self._system_tokens + count(f"{lead}{state_prompt}\n{action_prompt}")
+        if tokens <= self.prompt_budget:
+            return lead + state_prompt, None
+
+        # the history lines as rendered for this call, from the cache _build_game_state_prompt just filled
+        full_history = state["full_action_history"]
+        cache = self._prompt_cache(state)
+        start = cache.history_key[0]
+        num_players = len(state["player_info"])
+        stable = max(start, len(full_history) - 2 * num_players + 1)
+        maybe_prune = self._prune_recent(full_history, start, num_players)
+        texts = [("" if prunable and maybe_prune and start + i >= stable else text)
+                 for i, (text, prunable) in enumerate(cache.history_lines)]
 
-        return prompt_start + output_prompt
+        def line_tokens(text):
+            if text not in cache.line_tokens:
+                cache.line_tokens[text] = count(text) if text else 0
+            return cache.line_tokens[text]
+
+        steps = [
+            ("dropped", (NominatePlayerAction, VoteAction), lambda text: ""),
+            ("truncated", NoteToSelfAction, lambda text: text[:NOTE_CHARS].rstrip() + "…\n"),
+            ("condensed", DiscussionAction, lambda text: text[:CHAT_CHARS].rstrip() + "…\n"),
+            ("dropped", DiscussionAction, lambda text: ""),
+            ("dropped", object, lambda text: ""),
+        ]
+
+        def build(texts):
+            history = "".join(texts)
+            history = (self._history_heading(history) + "Some older actions are shortened or left out to fit the prompt.\n"
+                       + history)
+            state_prompt = self._build_game_state_prompt(state, is_summary=is_summary, history=history)
+            return state_prompt, self._system_tokens + count(f"{lead}{state_prompt}\n{action_prompt}")
+
+        elided = {}
+        n_old = max(0, len(texts) - 2 * num_players)
+        fitted = tokens
+        while fitted > self.prompt_budget:
+            # history lines add up to about the tokens of the history, recount once they seem to fit
+            excess = fitted - self.prompt_budget
+            changed = False
+            for how, kinds, shorten in steps:
+                for i in range(n_old):
+                    if excess <= 0:
+                        break
+                    if not texts[i] or not isinstance(full_history[start + i][1], kinds):
+                        continue
+                    shortened = shorten(texts[i])
+                    if len(shortened) >= len(texts[i]):
+                        continue
+                    excess -= line_tokens(texts[i]) - line_tokens(shortened)
+                    texts[i] = shortened
+                    elided[start + i] = how
+                    changed = True
+            if not changed:
+                # nothing left to elide
+                break
+            state_prompt, fitted = build(texts)
+        record = {
+            "budget": self.prompt_budget,
+            "tokens": tokens,
+            "fitted_tokens": fitted,
+        }
+        for how in ("dropped", "truncated", "condensed"):
+            record[how] = sorted(i for i, h in elided.items() if h == how)
+        return lead + state_prompt, record
 
     def _get_theme_term(self, key: str, ) -> str:
         """Get themed term, auto-capitalizing if key starts with uppercase"""
-        keyl = key.lower()
-        if not self.theme or "terms" not in self.theme:
-            raise ValueError(f"Theme terms not defined for theme: {self.theme_name}")
-        
-        if keyl not in self.theme["terms"]:
-            raise KeyError(f"Term not defined: {key}")
-        
-        result = self.theme["terms"][keyl]
-        
-        if key[0].isupper():
-            return result[0].upper() + result[1:]
-        return result
+        return self.prompts.term(key)
     
     def _format_prior_mission_results(self, state: dict) -> str:
         t = self._get_theme_term
@@ -323,6 +498,8 @@ class OnlineAI(PlayerInterface):
         
         if not prior_missions:
             return ""
+        if self.prompt_profile == 'compact':
+            return self._format_prior_mission_results_compact(prior_missions)
         
         game_state = {
             f"prior_{t('missions')}": {
@@ -390,8 +567,30 @@ class OnlineAI(PlayerInterface):
         json_output = json.dumps(game_state, indent=0)
         return json_output
     
+    def _format_prior_mission_results_compact(self, prior_missions) -> str:
+        lines = ["PRIOR:"]
+        for i, m in enumerate(prior_missions):
+            if m['cooperator_found']:
+                outcome = "coop_acc"
+            elif m['defector_found']:
+                outcome = "def_acc"
+            else:
+                outcome = "none_acc"
+            has_defectors = any(p.get('role') == self._get_theme_term("defector") for p in m.get("player_info", []))
+            sabotaged = ("yes" if m['sabotage_successful'] else "no") if has_defectors else "N/A"
+            players = " ".join(f"{p['name']}:{p.get('role')}:{p.get('score')}:{p.get('nomination') or '-'}"
+                               for p in m.get("player_info", []))
+            early = "no" if m.get('mission_complete') else "yes"
+            lines.append(f"{i + 1} | {early} | {outcome} | {sabotaged} | {players}")
+            if i < len(self.mission_summarizations):
+                lines.append(f"summary {i + 1} (you wrote): " + self.mission_summarizations[i].replace("\n", " "))
+        return "\n".join(lines)
+
     def _format_header(self, state: dict) -> str:
         t = self._get_theme_term
+        if self.prompt_profile == 'compact':
+            return (f"M {state['mission_id']}/{state['total_missions']}: {state['mission_text']} | "
+                    f"E {state['current_event_idx']}/{state['total_events']}")
         
         ret = {
             f"{t('mission')} info": {
@@ -411,12 +610,25 @@ class OnlineAI(PlayerInterface):
         t = self._get_theme_term
         players: Any = []
         for p in state["player_info"]:
+            if self.prompt_profile == 'compact':
+                name = p["username"] + ("(you)" if self.username == p['username'] else "") + ("*" if p["is_leader"] else "")
+                players.append(f"{name}:{state['cumulative_scores'].get(p['player_id'], 0)}")
+                continue
             players.append({
                 t('player'): p["username"] + ' (you)' if self.username==p['username'] else p["username"],
                 t('leader'): p["is_leader"],
                 t('score'): state["cumulative_scores"].get(p["player_id"], 0)
             })
-        random.shuffle(players)
+        if self.prompt_layout == 'prefix':
+            # the same order for the whole mission
+            cache = self._prompt_cache(state)
+            if cache.players_order is None or cache.players_order[0] != state.get("mission_id"):
+                cache.players_order = (state.get("mission_id"), self.rng.sample(range(len(players)), len(players)))
+            players = [players[i] for i in cache.players_order[1]]
+        else:
+            self.rng.shuffle(players)
+        if self.prompt_profile == 'compact':
+            return ["P: " + " ".join(players)]
         lines = json.dumps(players, indent=2).splitlines()
         return [f"Description of other {t('players')}: "] + lines
 
@@ -424,6 +636,11 @@ class OnlineAI(PlayerInterface):
         t = self._get_theme_term
         payoffs: Any = state.get("payoff_matrix", {})
         if not payoffs: return [f"No Reward Structure defined for this {t('mission')} yet."]
+        if self.prompt_profile == 'compact':
+            per_card = payoffs['points_per_card']
+            return [f"R coop: def_acc +{payoffs['defector_found']}, none_acc +{payoffs['defector_unknown']}, "
+                    f"coop_acc -{payoffs['cooperator_found']}, card +{per_card} | "
+                    f"def: start {payoffs['starting_points_defector']}, sab {payoffs['mission_sabotaged']}, card +{per_card}"]
         
         output = {
             f"{t('cooperator')}_reward_structure": {
@@ -449,17 +666,11 @@ class OnlineAI(PlayerInterface):
         parts: List[str] = []
         t = self._get_theme_term
 
+        if self.prompt_profile == 'compact':
+            return self._format_event_summary_compact(state)
         if state.get("event_card"):
             # Re-use event_card.get_card_info(), which should itself be themed appropriately
-            parts.append(state["event_card"].get_card_info_formatted(
-                        event=t('event'),
-                        mission=t('mission'),
-                        cards=t('cards'),
-                        cooperators=t('cooperators'),
-                        defectors=t('defectors'),
-                        sabotage=t('sabotage'),
-                    )
-                )
+            parts.append(state["event_card"].get_card_info_formatted(**self.prompts.event_card_terms))
             parts.append("")  # blank line
 
         played = state.get("event_played", [])
@@ -480,9 +691,28 @@ class OnlineAI(PlayerInterface):
                 parts.append(f"{num_sabotages_needed} more {t('defector')} {t('card')}(s) need for {t('sabotage')}.")
         return parts
     
+    def _format_event_summary_compact(self, state: dict) -> List[str]:
+        parts: List[str] = []
+        if state.get("event_card"):
+            parts.append("EV: " + state["event_card"].get_card_info_compact())
+        played = state.get("event_played", [])
+        if len(played) == len(state["player_info"]):
+            line = f"played: {','.join(played)} | coop_total {state['coop_scores']} | def_total {state['defector_scores']}"
+            my_role = state["player_info"][self.player_id].get('role')
+            if my_role is not None and my_role.startswith("defector"):
+                num_defectors = len([p for p in state["player_info"] if p.get("role", "").startswith("defector")])
+                line += f" | def_needed {max(0, (num_defectors * 3) - state['defector_scores'])}"
+            parts.append(line)
+        return parts
+
     def _format_private_section(self, state: dict) -> str:
         t = self._get_theme_term
         me = next(p for p in state["player_info"] if p["username"] == self.username)
+        if self.prompt_profile == 'compact':
+            line = f"ME: {me.get('role') or '?'} | hand: {','.join(me.get('hand', []))}"
+            if me["role"] and me["role"].startswith("defector"):
+                line += " | def_team: " + ",".join(p["username"] for p in state["player_info"] if p.get("role", "").startswith("defector"))
+            return [line]
         private_info: Any = {
             "role": me.get("role", "?"),
             f"{t('hand')}": me.get("hand", [])
@@ -495,29 +725,97 @@ class OnlineAI(PlayerInterface):
         lines = ['Private Info: '] + s.splitlines()
         return lines
 
-    def _build_game_state_prompt(self, state: dict, is_summary) -> str:
+    def _build_game_state_prompt(self, state: dict, is_summary, history: str = None) -> str:
         sections: List[str] = []
-        # full mission history
-        mission_history = self._format_prior_mission_results(state)
+        if history is None:
+            history = self._build_full_history_prompt(state)
+        cached = functools.partial(self._cached_section, state)
+        version = state.get("state_version")
+        # full mission history, which only changes when a mission ends or gets its summary
+        mission_history = cached("prior_missions", (len(state.get("mission_history", [])), len(self.mission_summarizations)),
+                                 lambda: self._format_prior_mission_results(state))
         if mission_history:
             sections.append(mission_history)
-        # full history of actions 
-        sections.append(self._build_full_history_prompt(state))
-        # header themed mission/event
-        sections.append(self._format_header(state))
-        # player table
-        sections.extend(self._format_players_table(state))
-        # payoff
-        sections.extend(self._format_payoffs(state))
-        # event summary
-        sections.extend(self._format_event_summary(state))
-        # private section: hand
-        sections.extend(self._format_private_section(state))
+        payoffs = cached("payoffs", state.get("mission_id"), lambda: self._format_payoffs(state))
+        if self.prompt_layout == 'prefix':
+            sections.extend(payoffs)
+            sections.append(history)
+            sections.append(cached("header", version, lambda: self._format_header(state)))
+            sections.extend(cached("event_summary", version, lambda: self._format_event_summary(state)))
+            sections.extend(self._format_players_table(state))
+            sections.extend(cached("private", version, lambda: self._format_private_section(state)))
+        else:
+            # full history of actions 
+            sections.append(history)
+            # header themed mission/event
+            sections.append(cached("header", version, lambda: self._format_header(state)))
+            # player table, shuffled anew on every call
+            sections.extend(self._format_players_table(state))
+            # payoff
+            sections.extend(payoffs)
+            # event summary
+            sections.extend(cached("event_summary", version, lambda: self._format_event_summary(state)))
+            # private section: hand
+            sections.extend(cached("private", version, lambda: self._format_private_section(state)))
         
         if is_summary and mission_history:
             sections.append(mission_history)
         
         return "\n".join(sections)
+
+    def _build_transcript_turn(self, state: dict, is_summary):
+        """
+        The transcript to continue and the state part of its next user turn: the whole state when the
+        transcript is new, else the actions and sections that changed since the player's last turn.
+        Also returns what the turn shows, for the transcript to remember once the call went through.
+        """
+        history = state["full_action_history"]
+        transcript = self._transcript
+        if (transcript is None or transcript.history_id != state["history_id"]
+                or len(history) < transcript.shown.get("actions", 0)
+                or (transcript.mission_id != state.get("mission_id") and not is_summary)):
+            # new game, fork or mission; the summary of a mission still goes to that mission's chat
+            transcript = self._transcript = _Transcript(state["history_id"], state.get("mission_id"))
+
+        cached = functools.partial(self._cached_section, state)
+        version = state.get("state_version")
+        shown = {
+            "actions": len(history),
+            "header": cached("header", version, lambda: self._format_header(state)),
+            "event_summary": cached("event_summary", version, lambda: self._format_event_summary(state)),
+            # the table is shuffled on every render, compare what it says
+            "players": tuple((p["username"], p["is_leader"], state["cumulative_scores"].get(p["player_id"], 0))
+                             for p in state["player_info"]),
+            "private": "\n".join(cached("private", version, lambda: self._format_private_section(state))),
+        }
+        if not transcript.messages:
+            state_prompt = self._build_game_state_prompt(state, is_summary=is_summary)
+            return transcript, f"{self.username}, here is the current state:\n {state_prompt}", shown
+
+        player_name_map = {p['player_id']: p['username'] for p in state["player_info"]}
+        self_role = next(p for p in state["player_info"] if p['player_id'] == self.player_id).get("role")
+        im_defector = bool(self_role and self_role.startswith("defector"))
+        new_actions = ""
+        for pid, action in history[transcript.shown["actions"]:]:
+            # our own notes are in our previous answers already
+            if pid == self.player_id and isinstance(action, NoteToSelfAction):
+                continue
+            new_actions += self._render_history_entry(pid, action, player_name_map, im_defector)[0]
+
+        parts = [new_actions] if new_actions else []
+        for name in ("header", "private"):
+            if shown[name] != transcript.shown.get(name):
+                parts.append(shown[name])
+        # the event card once, then the lines added below it
+        parts.extend(line for line in shown["event_summary"] if line and line not in transcript.shown["event_summary"])
+        if shown["players"] != transcript.shown.get("players"):
+            parts.extend(self._format_players_table(state))
+        if is_summary:
+            parts.append(self._format_prior_mission_results(state))
+        if not parts:
+            parts.append("Nothing has changed.")
+        delta = "\n".join(parts)
+        return transcript, f"{self.username}, since your last turn:\n{delta}", shown
            
     def _call_chat_completion_vllm(self, msg, temperature, action_json=None, extra=None) -> str:
         raise NotImplementedError(
@@ -547,21 +845,46 @@ class OnlineAI(PlayerInterface):
         return output
     
     #hopefully extendable to other LLMs later
-    def _call_chat_completion(self, msg, temperature, action_json=None, extra=None) -> str:
-        return self.inference_fn(self.client, self.model_name, msg, temperature, action_json, extra=extra) 
+    def _call_chat_completion(self, msg, temperature, action_json=None, extra=None, stats=None) -> str:
+        return self.inference_fn(self.client, self.model_name, msg, temperature, action_json, extra=extra, stats=stats,
+                                 limiter=self.limiter)
     
     def _generate_action_response(self, state: str, action_prompt: str, temperature: float=None, action_json=None, is_summary=False, extra=None) -> str:
         system_prompt = self.system_prompt
-        state_prompt = self._build_game_state_prompt(state, is_summary=is_summary)
+        if self.prompt_mode == 'transcript':
+            transcript, state_prompt, shown = self._build_transcript_turn(state, is_summary)
+            earlier = transcript.messages
+            elided = None
+        else:
+            state_prompt, elided = self._fit_prompt_budget(state, is_summary, action_prompt)
+            earlier = []
         
-        user_prompt = f"{self.username}, here is the current state:\n {state_prompt}\n{action_prompt}"
+        user_prompt = f"{state_prompt}\n{action_prompt}"
 
         msg =  [
             {'role': 'system', 'content': system_prompt}, 
+            *earlier,
             {'role': 'user', 'content': user_prompt}
         ]
         
-        completion = self._call_chat_completion(msg, temperature, action_json, extra)
+        stats = CallStats(model=self.model_name, provider=self.provider)
+        try:
+            completion = self._call_chat_completion(msg, temperature, action_json, extra, stats=stats)
+        finally:
+            call = stats.to_dict()
+            if elided is not None:
+                # what the model didn't see of the history
+                call["elided"] = elided
+            self.llm_calls.append(call)
+        if self.prompt_mode == 'transcript':
+            if is_summary:
+                # the summary stands in for the mission's chat from now on
+                self._transcript = None
+            else:
+                # the instructions were for this turn only, the chat keeps what the player was told and answered
+                answer = completion if isinstance(completion, str) else json.dumps(completion)
+                transcript.messages += [{'role': 'user', 'content': state_prompt}, {'role': 'assistant', 'content': answer}]
+                transcript.shown = shown
         logger.debug('\n[PROMPT] ', user_prompt)
         #breakpoint()
         logger.debug('\n[COMPLETION] ', completion)
@@ -634,23 +957,8 @@ class OnlineAI(PlayerInterface):
 
     @log_action(phase='select_role')
     def select_role(self, state):
-        t = self._get_theme_term
-        
         available_themed = list(self.theme['roles'].values())
-        prompt = self.INSTRUCTIONS["select_role"].format(
-            cooperators=t('cooperators'),
-            win=t('win'),
-            card=t('card'),
-            players=t('players'),
-            missions=t('missions'),
-            defectors=t('defectors'),
-            sabotage=t('sabotage'),
-            accused=t('accused'),
-            lose=t('lose'),
-            defector=t('defector'),
-            nominated=t('nominated'),
-            available_roles=", ".join(available_themed)
-        )
+        prompt = self.prompts.instructions["select_role"].format(available_roles=", ".join(available_themed))
         
         #need to check if the last 5 actions are all select_role actions, but ignore NoteToSelfAction
         last_5_actions = []
@@ -660,14 +968,7 @@ class OnlineAI(PlayerInterface):
             if len(last_5_actions) >= 5: break
         if len(last_5_actions)== 5 and all(isinstance(a, SelectRoleAction) for a in last_5_actions):
             if all(a.role == self.theme['roles']['defector'] for a in last_5_actions):
-                prompt = self.INSTRUCTIONS["all_defectors"].format(
-                    players=t('players'),
-                    defector=t('defector'),
-                    cooperator=t('cooperator'),
-                    won=t('won'),
-                    mission=t('mission'),
-                    available_roles=", ".join(available_themed)
-                )
+                prompt = self.prompts.instructions["all_defectors"].format(available_roles=", ".join(available_themed))
 
         schema = make_schema("Schema", {
             "note2self": None,
@@ -726,23 +1027,7 @@ class OnlineAI(PlayerInterface):
             prompt = f"{self.username}, looks like you actually chose {self.theme['roles']['defector']}\n"
         else:
             prompt = ''
-        prompt = self.INSTRUCTIONS[key].format(
-            play=t('play'),
-            card=t('card'),
-            trash=t('trash'),
-            player=t('player'),
-            players=t('players'),
-            playing=t('playing'),
-            cards=t('cards'),
-            played=t('played'),
-            hand=t('hand'),
-            mission=t('mission'),
-            sabotage=t('sabotage'),
-            cooperator=t('cooperator'),
-            defector=t('defector'),
-            defectors=t('defectors'),
-            hand_cards=", ".join(self.hand)
-        )
+        prompt = self.prompts.instructions[key].format(hand_cards=", ".join(self.hand))
 
         schema = make_schema("Schema", schema)
 
@@ -776,17 +1061,7 @@ class OnlineAI(PlayerInterface):
         
     @log_action(phase='discussion')  
     def participate_in_discussion(self, state):
-        t = self._get_theme_term
-        
-        prompt = self.INSTRUCTIONS["discussion"].format(
-            players=t('players'),
-            cooperators=t('cooperators'),
-            win=t('win'),
-            missions=t('missions'),
-            defectors=t('defectors'),
-            sabotaging=t('sabotaging'),
-            accused=t('accused')
-        )
+        prompt = self.prompts.instructions["discussion"].format()
         extra = {
             'claude': '\nFormat your response as the following JSON: \n```\n{"note2self": note, "message": message}\n```\n'
         }
@@ -838,8 +1113,6 @@ class OnlineAI(PlayerInterface):
         
     @log_action(phase='summarize')  
     def summarize(self, state):
-        t = self._get_theme_term
-        
         if self.summarization_level  == 0: return
         #check if the game hasn't just started / we havent already summarized
         if state['mission_id'] - 1 == len(self.mission_summarizations): return
@@ -847,12 +1120,7 @@ class OnlineAI(PlayerInterface):
         if self.summarization_level != 2:
             raise ValueError(f"level {self.summarization_level} summarization not implemented")
         
-        prompt = self.INSTRUCTIONS["summarize"].format(
-            mission=t('mission'),
-            cooperators=t('cooperators'),
-            defectors=t('defectors'),
-            players=t('players')
-        )
+        prompt = self.prompts.instructions["summarize"].format()
 
         message = self._generate_action_response(
             state=state,
@@ -871,28 +1139,14 @@ class OnlineAI(PlayerInterface):
 
     @log_action(phase='nominate')  
     def nominate_player(self, state):
-        t = self._get_theme_term
-        
         available = [p['name'] for p in state['player_info']]
         
         #remove self and replace it with Unknown
         available.remove(self.username)
         available.append("Unknown")
-        random.shuffle(available)
+        self.rng.shuffle(available)
         
-        prompt = self.INSTRUCTIONS["nominate"].format(
-            player=t('player'),
-            defector=t('defector'),
-            defectors=t('defectors'),
-            nominating=t('nominating'),
-            cooperators=t('cooperators'),
-            sabotage=t('sabotage'),
-            cooperator=t('cooperator'),
-            votes=t('votes'),
-            nomination=t('nomination'),
-            nominated=t('nominated'),
-            other_players=", ".join(available)
-        )
+        prompt = self.prompts.instructions["nominate"].format(other_players=", ".join(available))
         extra = {
             'claude': f'\nFormat your response as the following JSON: \n```\n{{"note2self": note, "nomination": {available}}}\n```',
         }
@@ -920,21 +1174,8 @@ class OnlineAI(PlayerInterface):
        
     @log_action(phase='vote')
     def vote(self, state):
-        t = self._get_theme_term
-        
         choices = ["yes", "no"]
-        prompt = self.INSTRUCTIONS["vote"].format(
-            mission=t('mission'),
-            nomination=t('nomination'),
-            defector=t('defector'),
-            accusing=t('accusing'),
-            retreat=t('retreat'),
-            retreating=t('retreating'),
-            cooperator=t('cooperator'),
-            sabotage=t('sabotage'),
-            defectors=t('defectors'),
-            vote=t('vote')
-        )
+        prompt = self.prompts.instructions["vote"].format()
         extra = {
             'claude': f'\nFormat your response as the following JSON: \n```\n{{"note2self": note, "choice": {choices}}}\n```',
         }
@@ -961,43 +1202,49 @@ class OnlineAI(PlayerInterface):
         
         return [note, vote]
         
+    def _decide(self, act, state):
+        if act.__name__ in {"DiscardableCardAction"}:
+            # checks the hand against the cards played so far
+            self._build_card_play_prompt(state)
+
+        if act.__name__ == "SelectRoleAction":
+            self.summarize(state)
+
+        match act.__name__:
+            case "SelectRoleAction":
+                return self.select_role(state)
+            case "DiscardableCardAction":
+                return self.play_card(state, discardable=True)
+            case "PlayCardAction":
+                return self.play_card(state, discardable=False)
+            case "NominatePlayerAction":
+                return self.nominate_player(state)
+            case "VoteAction":
+                return self.vote(state)
+            case "DiscussionAction":
+                return self.participate_in_discussion(state)
+            case _:
+                raise ValueError(f"Unknown action: {act.__name__}")
+
     async def perform_action(self, actions, state):
         if self.is_computing_action:
             return None
         self.is_computing_action = True
 
         out_actions = []
-
-        for act in actions:
-            extra = ""
-            if act.__name__ in {"DiscardableCardAction"}:
-                extra = self._build_card_play_prompt(state)
-                
-            if act.__name__ == "SelectRoleAction":
-                self.summarize(state)
-                
-
-            match act.__name__:
-                case "SelectRoleAction":
-                    selected_action = self.select_role(state)
-                case "DiscardableCardAction":
-                    selected_action = self.play_card(state, discardable=True)
-                case "PlayCardAction":
-                    selected_action = self.play_card(state, discardable=False)
-                case "NominatePlayerAction":
-                    selected_action = self.nominate_player(state)
-                case "VoteAction":
-                    selected_action = self.vote(state)
-                case "DiscussionAction":
-                    selected_action = self.participate_in_discussion(state)
-                case _:
-                    raise ValueError(f"Unknown action: {act.__name__}")
-            if isinstance(selected_action, list):
-                out_actions.extend(selected_action)
-            else:
-                out_actions.append(selected_action)
-
-        self.is_computing_action = False
+        try:
+            for act in actions:
+                # the provider clients block, so each decision runs on a worker thread; the players
+                # gathered in a simultaneous phase then wait on their calls together, not one by one.
+                # Those are the limiter's threads, players waiting for a slot don't hold the loop's default ones
+                loop = asyncio.get_running_loop()
+                selected_action = await loop.run_in_executor(self.limiter.executor, self._decide, act, state)
+                if isinstance(selected_action, list):
+                    out_actions.extend(selected_action)
+                else:
+                    out_actions.append(selected_action)
+        finally:
+            self.is_computing_action = False
         return out_actions
     
     #no more functions
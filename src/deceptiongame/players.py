@@ -1,4 +1,5 @@
 import abc
+import copy
 import random
 from typing import Dict, Any, List
 from deceptiongame.actions import * 
@@ -35,10 +36,24 @@ class PlayerInterface(abc.ABC):
         self.nomination = None
         self.selected_card = None
         self.is_ai = False
+        # GameManager replaces this with a per-game, per-player stream
+        self.rng = random.Random()
         
         # Message queue for discussion messages; each player may maintain their own queue.
         self.message_queue: List[Dict[str, Any]] = []
         
+    # containers the game edits in place; fork() gives the copy its own
+    _fork_copied = ('hand', 'message_queue')
+
+    def fork(self) -> "PlayerInterface":
+        """ Shallow copy for a forked game. Clients and other I/O handles are shared, not copied. """
+        clone = copy.copy(self)
+        for attr in self._fork_copied:
+            value = getattr(self, attr, None)
+            if value is not None:
+                setattr(clone, attr, copy.copy(value))
+        return clone
+
     #return player_id for attribute pid
     @property
     def pid(self) -> int:
@@ -230,7 +245,8 @@ class RandomPlayer(PlayerInterface):
     @log_action(phase='selectrole')
     def select_role(self, context: Dict[str, Any]) -> Dict[str, Any]:
         roles = ["cooperator", "defector"]#, "jester"]
-        return SelectRoleAction(self.player_id, random.choice(roles))
+        role = self.rng.choice(roles)
+        return SelectRoleAction(self.player_id, role, role)
         #return {"role": random.choice(roles)}
     
     @log_action(phase='playcard')
@@ -240,34 +256,35 @@ class RandomPlayer(PlayerInterface):
         
         if discardable:
             #return {"card": random.choice(self.hand), "discard": random.choice([True, False])}
-            return DiscardableCardAction(self.player_id, random.choice(self.hand), random.choice([True, False]))
+            return DiscardableCardAction(self.player_id, self.rng.choice(self.hand), self.rng.choice([True, False]))
         else:
-            return PlayCardAction(self.player_id, random.choice(self.hand))
+            return PlayCardAction(self.player_id, self.rng.choice(self.hand))
 
             #return {"card": random.choice(self.hand), "discard":  False}
     
     def select_card_as_leader(self, context: Dict[str, Any]) -> Dict[str, Any]:
         if not self.hand:
             return {"card": None}
-        return {"card": random.choice(self.hand)}
+        return {"card": self.rng.choice(self.hand)}
     
     @log_action(phase='discussion')  
     def participate_in_discussion(self, context: Dict[str, Any]) -> Dict[str, Any]:
         messages = ["I played my card.", "Let's see how it goes.", "I trust my luck."]
-        return DiscussionAction(self.player_id, random.choice(messages))
+        return DiscussionAction(self.player_id, self.rng.choice(messages))
         # return {"message": random.choice(messages)}
     
     @log_action(phase='nominate')  
     def nominate_player(self, context: Dict[str, Any]) -> Dict[str, Any]:
         available = context.get("available_players", [])
-        choices = [pid for pid in available if pid != self.player_id]
-        nominated = random.choice(choices) if choices else self.player_id
+        # nominations are by name, like the LLM players; ids still work for older callers
+        choices = [pid for pid in available if pid not in (self.player_id, self.name)]
+        nominated = self.rng.choice(choices) if choices else self.player_id
         return NominatePlayerAction(self.player_id, nominated)
         #return {"nominated_player_id": nominated}
     
     @log_action(phase='vote')
     def vote(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        return VoteAction(self.player_id, random.choice(['yes', 'no']))
+        return VoteAction(self.player_id, self.rng.choice(['yes', 'no']))
         #return {"vote_choice": random.choice(["yes", "no"])}
 
 # --------------------------------------------------------------------
@@ -0,0 +1,113 @@
+"""
+Prompt tokens of recorded games under each OnlineAI prompt profile.
+
+Replays every trace in the given log directories and, at each decision a
+player made, renders the system prompt and game state that player would
+have been sent under each profile, then counts their tokens with
+inference_utils.count_tokens (the model's tokenizer if it is cached here,
+else ~4 characters per token). The action instructions are the same in
+every profile and are left out. Players are rendered without mission
+summaries, whatever the recorded players had.
+
+    python -m deceptiongame.prompt_report game_logs --model meta-llama/Llama-3.3-70B-Instruct
+"""
+import sys
+import random
+import argparse
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from deceptiongame.inference_utils import count_tokens
+from deceptiongame.player_llm import OnlineAI, PROMPT_PROFILES
+from deceptiongame.replay import TraceReplay
+from deceptiongame.tracer import Tracer, find_traces
+
+# trace phases where a player was asked for a decision
+DECISION_PHASES = ("select_role", "play_card", "discussion", "nominate", "vote")
+
+
+def _renderer(player: dict, theme: str, profile: str) -> OnlineAI:
+    """ OnlineAI in the seat of a recorded player, only used to render prompts (it never calls its model). """
+    renderer = OnlineAI(player["player_id"], player["username"], model_name="llama-3.3", url="http://localhost:1/v1",
+                        theme_name=theme, prompt_profile=profile)
+    renderer.rng = random.Random(0)
+    return renderer
+
+
+def trace_prompt_tokens(trace: dict, profiles: Sequence[str] = PROMPT_PROFILES,
+                        model: Optional[str] = None) -> Dict[str, Dict[str, List[Tuple[int, int]]]]:
+    """
+    phase -> profile -> (system prompt, game state) tokens of each decision in `trace`.
+    Tokens are counted for `model`, by default the first recorded player's.
+    """
+    config = trace["config"]
+    theme = config.get("theme", "default")
+    model = model or next((p["model_name"] for p in config["players"] if p.get("model_name")), "")
+    renderers = {profile: [_renderer(p, theme, profile) for p in config["players"]] for profile in profiles}
+    system_tokens = {profile: count_tokens(model, players[0].system_prompt) for profile, players in renderers.items()}
+
+    replay = TraceReplay(trace)
+    tokens = defaultdict(lambda: defaultdict(list))
+    for pos, entry in enumerate(replay.entries):
+        if entry.phase not in DECISION_PHASES:
+            continue
+        # the player decided before writing the note that comes with the action
+        previous = replay.entries[pos - 1] if pos else None
+        decided_at = pos - 1 if previous and previous.phase == "note_to_self" and previous.player_id == entry.player_id else pos
+        state = replay.seek_to(decided_at).get_state()
+        for profile, players in renderers.items():
+            state_prompt = players[entry.player_id]._build_game_state_prompt(state, is_summary=False)
+            tokens[entry.phase][profile].append((system_tokens[profile], count_tokens(model, state_prompt)))
+    return tokens
+
+
+def prompt_token_report(paths: Sequence[str], profiles: Sequence[str] = PROMPT_PROFILES,
+                        model: Optional[str] = None) -> Dict[Tuple[str, str], Dict[str, List[Tuple[int, int]]]]:
+    """ (theme, phase) -> profile -> (system prompt, game state) tokens of each decision, over the traces in `paths`. """
+    report = defaultdict(lambda: defaultdict(list))
+    for path in paths:
+        trace = Tracer.load_from_file(path).trace
+        theme = trace["config"].get("theme", "default")
+        for phase, by_profile in trace_prompt_tokens(trace, profiles, model).items():
+            for profile, counts in by_profile.items():
+                report[(theme, phase)][profile].extend(counts)
+    return report
+
+
+def _change(new, old):
+    return 100 * (new / old - 1) if old else 0.0
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Prompt tokens per decision of recorded games, per prompt profile.")
+    parser.add_argument("log_dirs", nargs="+")
+    parser.add_argument("--model", default=None, help="Tokenizer to count with (HF repo), default the recorded model")
+    parser.add_argument("--profiles", nargs="+", choices=PROMPT_PROFILES, default=list(PROMPT_PROFILES))
+    args = parser.parse_args(argv)
+
+    paths = [path for log_dir in args.log_dirs for path in find_traces(log_dir)]
+    report = prompt_token_report(paths, args.profiles, args.model)
+    # the whole theme, then phase by phase
+    rows = {}
+    for (theme, phase), by_profile in sorted(report.items()):
+        rows[(theme, phase)] = by_profile
+        total = rows.setdefault((theme, "all"), defaultdict(list))
+        for profile, counts in by_profile.items():
+            total[profile].extend(counts)
+
+    # mean tokens per decision: of the game state, and of the whole prompt but the action instructions;
+    # the changes are of the last profile against the first
+    base, last = args.profiles[0], args.profiles[-1]
+    print(f"{len(paths)} traces, mean tokens per decision")
+    print(f"{'theme':>16} {'phase':>12} {'decisions':>10} " + " ".join(f"{'state ' + p:>16}" for p in args.profiles)
+          + f" {'state change':>13} {'prompt change':>14}")
+    for (theme, phase), by_profile in sorted(rows.items()):
+        n = len(by_profile[base])
+        state = {p: sum(s for _, s in by_profile[p]) / n for p in args.profiles}
+        prompt = {p: sum(a + s for a, s in by_profile[p]) / n for p in args.profiles}
+        print(f"{theme:>16} {phase:>12} {n:10d} " + " ".join(f"{state[p]:16.0f}" for p in args.profiles)
+              + f" {_change(state[last], state[base]):12.1f}% {_change(prompt[last], prompt[base]):13.1f}%")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Limits on the LLM calls of every player in the process, read from models.yaml.
+
+Any model entry may set
+
+    max_concurrency: 5            # calls in flight at once
+    requests_per_minute: 300
+    tokens_per_minute: 200000     # prompt + completion tokens
+
+and each call of an OnlineAI first takes a slot from `limiter_for(model, endpoint)`:
+it waits for one of the concurrent slots, then for a request and for its
+estimated tokens from the per-minute buckets. Buckets hold at most a
+minute's worth and refill continuously, and a caller reserves what it
+needs and sleeps until it is covered, so callers are served in the order
+they came instead of all retrying at once. Once the call is done, the
+estimate is corrected with the tokens the call actually used.
+
+Waiting for a slot blocks the calling thread, so OnlineAI runs its calls on
+the limiter's own `executor`, with as many threads as the limiter lets call
+at once. Players beyond that wait in its queue, and none of them hold a
+worker of the event loop's default executor.
+
+Limits are kept per model and endpoint: two vLLM replicas of one model
+each get their own. The file is the one named by $MODELS_YAML, else
+models.yaml in the working directory or at the repository root.
+"""
+import os
+import time
+import pathlib
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
+
+import yaml
+
+MODELS_YAML_ENV = "MODELS_YAML"
+# completion tokens assumed for a call before it returns
+EXPECTED_COMPLETION_TOKENS = 256
+# executor threads of a limiter without a concurrency cap, as many as ThreadPoolExecutor's default
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    max_concurrency: Optional[int] = None
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+class TokenBucket:
+    """ `per_minute` units a minute, at most a minute's worth banked. take() reserves and sleeps off any shortfall. """
+    def __init__(self, per_minute: float, clock=time.monotonic, sleep=time.sleep):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, n: float) -> float:
+        """ Take n units, sleeping until the bucket covers them; returns the seconds slept. """
+        with self._lock:
+            self._refill()
+            # a request bigger than the bucket would never fit, it waits for a full one
+            self.level -= min(n, self.capacity)
+            wait = max(0.0, -self.level / self.rate)
+        if wait:
+            self._sleep(wait)
+        return wait
+
+    def adjust(self, n: float):
+        """ Take n more units (give back if negative) without waiting, e.g. to settle an estimate. """
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level - n)
+
+
+class Limiter:
+    def __init__(self, limits: ModelLimits, clock=time.monotonic, sleep=time.sleep):
+        self.limits = limits
+        self._clock = clock
+        self._slots = threading.BoundedSemaphore(limits.max_concurrency) if limits.max_concurrency else None
+        self._requests = TokenBucket(limits.requests_per_minute, clock, sleep) if limits.requests_per_minute else None
+        self._tokens = TokenBucket(limits.tokens_per_minute, clock, sleep) if limits.tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._executor = None
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waited_s = 0.0
+
+    @contextlib.contextmanager
+    def slot(self, tokens: int = 0):
+        """ Hold a call slot for a call expected to use `tokens` tokens; yields the reservation to settle. """
+        start = self._clock()
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            if self._requests is not None:
+                self._requests.take(1)
+            if self._tokens is not None:
+                self._tokens.take(tokens)
+            with self._lock:
+                self.calls += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                self.waited_s += self._clock() - start
+            reservation = _Reservation(self, tokens)
+            try:
+                yield reservation
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """ Threads for the blocking calls under this limiter, one per call it lets through at once. """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.limits.max_concurrency or DEFAULT_WORKERS,
+                                                    thread_name_prefix="llm-call")
+            return self._executor
+
+    def shutdown(self):
+        """ Let the executor's threads exit once their calls are done. """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waited_s": self.waited_s,
+                **{f.name: getattr(self.limits, f.name) for f in fields(self.limits)},
+            }
+
+
+class _Reservation:
+    def __init__(self, limiter: Limiter, tokens: int):
+        self._limiter = limiter
+        self.tokens = tokens
+
+    def settle(self, tokens: Optional[int]):
+        """ Correct the token bucket with what the call used, once known. """
+        if tokens is not None and self._limiter._tokens is not None:
+            self._limiter._tokens.adjust(tokens - self.tokens)
+            self.tokens = tokens
+
+
+_limits: Optional[Dict[str, ModelLimits]] = None
+_limiters: Dict[tuple, Limiter] = {}
+_lock = threading.Lock()
+
+
+def models_yaml_path() -> Optional[pathlib.Path]:
+    if os.environ.get(MODELS_YAML_ENV):
+        return pathlib.Path(os.environ[MODELS_YAML_ENV])
+    for path in (pathlib.Path.cwd() / "models.yaml", pathlib.Path(__file__).resolve().parents[2] / "models.yaml"):
+        if path.exists():
+            return path
+    return None
+
+
+def load_model_limits(path=None) -> Dict[str, ModelLimits]:
+    """ ModelLimits per model key (and per hf_repo, the name vLLM serves it under) from a models.yaml. """
+    path = path or models_yaml_path()
+    if path is None:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        entries = yaml.safe_load(f) or []
+    limits = {}
+    for entry in entries:
+        model_limits = ModelLimits(**{f.name: entry.get(f.name) for f in fields(ModelLimits)})
+        limits[entry["key"]] = model_limits
+        if entry.get("hf_repo"):
+            limits[entry["hf_repo"]] = model_limits
+    return limits
+
+
+def configure_limits(limits=None):
+    """ Use `limits` (a dict of ModelLimits, or a models.yaml path) for limiters created from now on; None rereads the default file. """
+    global _limits
+    with _lock:
+        _limits = limits if isinstance(limits, dict) else load_model_limits(limits)
+        for limiter in _limiters.values():
+            limiter.shutdown()
+        _limiters.clear()
+
+
+def limiter_for(model: str, endpoint: Optional[str] = None) -> Limiter:
+    """ The process's limiter for `model` (models.yaml key or HF repo) served at `endpoint`. """
+    global _limits
+    with _lock:
+        if _limits is None:
+            _limits = load_model_limits()
+        key = (model, endpoint)
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = Limiter(_limits.get(model, ModelLimits()))
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        return {f"{model}@{endpoint}" if endpoint else model: limiter.stats()
+                for (model, endpoint), limiter in _limiters.items()}
@@ -0,0 +1,230 @@
+"""
+Random-access replay of a saved game trace.
+
+The trace is indexed once into a flat list of engine actions. Seeking applies
+the recorded actions straight to a GameManager (no players are asked for
+anything), starting from the nearest checkpoint at or before the target, so a
+seek costs time proportional to the actions skipped. A checkpoint is a
+GameManager.fork() taken at the start of every mission and event, which also
+makes seeking backwards cheap.
+
+    replay = TraceReplay.from_file("game_logs/20250710-002413-b27cf5.json")
+    gm = replay.seek(mission=1, event=2)          # 0-based, like state_browser
+    gm = replay.seek(mission=0, event=3, action=5)
+    gm = replay.resume(players, save_trace=True)  # continue with live players
+"""
+import copy
+import bisect
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from deceptiongame.actions import (
+    SelectRoleAction,
+    PlayCardAction,
+    DiscardableCardAction,
+    DiscussionAction,
+    NoteToSelfAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.players import PlayerInterface
+from deceptiongame.tracer import Tracer
+
+logger = logging.getLogger(__name__)
+
+# trace phases that the engine processes; everything else (e.g. summarize) is player-side only
+_PHASE_ACTIONS = {
+    "select_role": SelectRoleAction,
+    "play_card": PlayCardAction,
+    "discussion": DiscussionAction,
+    "nominate": NominatePlayerAction,
+    "vote": VoteAction,
+    "note_to_self": NoteToSelfAction,
+}
+
+
+@dataclass(frozen=True)
+class TraceEntry:
+    """ One recorded engine action and where it sits in the trace. event is -1 for mission-level actions. """
+    mission: int
+    event: int
+    action: int
+    phase: str
+    player_id: int
+    payload: Dict[str, Any]
+
+    def to_action(self):
+        cls = _PHASE_ACTIONS[self.phase]
+        if cls is PlayCardAction and "is_discard" in self.payload:
+            cls = DiscardableCardAction
+        return cls(player_id=self.player_id, **self.payload)
+
+
+class ReplayPlayer(PlayerInterface):
+    """ Placeholder seat for a replayed game; every decision comes from the trace. """
+    _fork_copied = PlayerInterface._fork_copied + ('scratchpad',)
+
+    def __init__(self, player_id: int, name: str):
+        super().__init__(player_id, name)
+        self.username = name
+        self.scratchpad = []
+
+    def _replay_only(self, *args, **kwargs):
+        raise RuntimeError("ReplayPlayer only replays recorded actions; use TraceReplay.resume() to continue a game")
+
+    select_role = play_card = participate_in_discussion = nominate_player = vote = _replay_only
+
+
+class TraceReplay:
+    def __init__(self, trace: Dict[str, Any]):
+        self.trace = trace
+        self.entries: List[TraceEntry] = []
+        # (mission, event) -> (first flat position, raw action indices of the engine actions)
+        self._groups: Dict[Tuple[int, int], Tuple[int, List[int]]] = {}
+        self._index()
+        self._group_starts = {start for start, raw in self._groups.values() if raw}
+
+        config = trace["config"]
+        players = [ReplayPlayer(p["player_id"], p["username"]) for p in config["players"]]
+        gm = GameManager(
+            players,
+            total_missions=config["total_missions"],
+            events_per_mission=config["events_per_mission"],
+            turn_based_chat=config.get("turn_based_chat", True),
+            theme=config.get("theme", "default"),
+            seed=config.get("seed", 42),
+        )
+        gm.start_mission()
+        # the live game is always a fork: no trace of its own, and checkpoints can be taken the same way
+        self.game = gm.fork(same_stream=True)
+        self.pos = 0
+        self._checkpoints: Dict[int, GameManager] = {}
+        self._checkpoint_positions: List[int] = []
+        self._checkpoint()
+
+    @classmethod
+    def from_file(cls, path: str) -> "TraceReplay":
+        return cls(Tracer.load_from_file(path).trace)
+
+    def _index(self):
+        for m, mission in enumerate(self.trace.get("missions", [])):
+            groups = [(-1, mission.get("actions", []))] + [(e, ev["actions"]) for e, ev in enumerate(mission["events"])]
+            for e, actions in groups:
+                raw = []
+                start = len(self.entries)
+                for a, entry in enumerate(actions):
+                    if entry["phase"] not in _PHASE_ACTIONS:
+                        continue
+                    raw.append(a)
+                    self.entries.append(TraceEntry(m, e, a, entry["phase"], entry["player_id"], entry["payload"]))
+                self._groups[(m, e)] = (start, raw)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def position(self, mission: int, event: Optional[int] = None, action: int = 0) -> int:
+        """
+        Flat position of the state just before raw action `action` of the given event.
+        event=None is the start of the mission, before roles are picked.
+        """
+        key = (mission, -1 if event is None else event)
+        if key not in self._groups:
+            raise ValueError(f"Trace has no mission {mission} event {event}")
+        start, raw = self._groups[key]
+        return start + bisect.bisect_left(raw, action)
+
+    def locate(self, pos: int) -> Tuple[int, int, int]:
+        """ (mission, event, action) of the entry at flat position `pos`, i.e. the next action to be applied. """
+        entry = self.entries[pos]
+        return entry.mission, entry.event, entry.action
+
+    def seek(self, mission: int, event: Optional[int] = None, action: int = 0) -> GameManager:
+        return self.seek_to(self.position(mission, event, action))
+
+    def seek_to(self, pos: int) -> GameManager:
+        """ Move the game to flat position `pos` (0..len) and return it with the next action pending. """
+        if not 0 <= pos <= len(self.entries):
+            raise IndexError(f"Position {pos} outside trace of {len(self.entries)} actions")
+        if pos < self.pos or self._nearest_checkpoint(pos) > self.pos:
+            start = self._nearest_checkpoint(pos)
+            self.game = self._checkpoints[start].fork(same_stream=True)
+            self.pos = start
+        while self.pos < pos:
+            self._apply(self.entries[self.pos])
+            self.pos += 1
+            if self.pos in self._group_starts:
+                self._checkpoint()
+        if not self.game.game_over():
+            self.game.advance_game_to_next_action()
+        return self.game
+
+    def _nearest_checkpoint(self, pos: int) -> int:
+        return self._checkpoint_positions[bisect.bisect_right(self._checkpoint_positions, pos) - 1]
+
+    def _checkpoint(self):
+        if self.pos in self._checkpoints:
+            return
+        self._checkpoints[self.pos] = self.game.fork(same_stream=True)
+        bisect.insort(self._checkpoint_positions, self.pos)
+
+    def _apply(self, entry: TraceEntry):
+        gm = self.game
+        if not gm.game_over():
+            gm.advance_game_to_next_action()
+        try:
+            gm.process_player_action(entry.to_action())
+        except (ValueError, TypeError) as e:
+            raise ValueError(
+                f"Trace does not match the engine at mission {entry.mission} event {entry.event} "
+                f"action {entry.action} ({entry.phase} by player {entry.player_id}): {e}"
+            ) from e
+
+    def resume(self, players: List[PlayerInterface], save_trace: bool = False, save_path: Optional[str] = None) -> GameManager:
+        """
+        Hand the game at the current position to live players. The returned manager traces from here on,
+        starting from the recorded trace cut at the current position.
+        """
+        gm = self.game.fork(players=players, same_stream=True)
+        for replayed, player in zip(self.game.players, gm.players):
+            if hasattr(player, 'scratchpad'):
+                player.scratchpad = list(replayed.scratchpad)
+
+        tracer = Tracer(
+            config=self.trace["config"],
+            prompt_templates=self.trace.get("prompt_templates", {}),
+            save_path=save_path,
+            save_trace=save_trace,
+        )
+        tracer.trace["missions"] = self._trace_prefix()
+        if not gm.game_over() and tracer.trace["missions"]:
+            tracer._current_mission = tracer.trace["missions"][-1]
+            events = tracer._current_mission["events"]
+            tracer._current_event = events[-1] if events else None
+        gm.tracer = tracer
+        gm.save_trace = save_trace
+        gm.mission.tracer = tracer
+        for player in gm.players:
+            player.tracer = tracer
+        return gm
+
+    def _trace_prefix(self) -> List[Dict[str, Any]]:
+        """ Recorded missions up to the current position; the mission in progress is cut at it. """
+        missions = self.trace["missions"]
+        if self.pos == len(self.entries):
+            return copy.deepcopy(missions)
+        m, e, a = self.locate(self.pos)
+        prefix = copy.deepcopy(missions[:m + 1])
+        current = prefix[-1]
+        current["scores"] = None
+        if e == -1:
+            current["actions"] = current["actions"][:a]
+            current["events"] = []
+        else:
+            current["events"] = current["events"][:e + 1]
+            event = current["events"][-1]
+            event["actions"] = event["actions"][:a]
+            event.pop("played_cards", None)
+            event.pop("used_attributes", None)
+        return prefix
@@ -0,0 +1,216 @@
+"""
+One retry policy for the LLM calls of every provider.
+
+`call_with_retries` runs an attempt until it succeeds, sleeping between
+attempts for an exponential backoff with full jitter (or as long as the
+endpoint asked, for rate limits). It gives up early, raising the last
+error, when the error won't go away by retrying (bad request, auth, a
+bug) or when the next attempt would start past the policy's deadline.
+Each attempt gets the time left before the deadline as its timeout, which
+the vLLM, Azure and Gemini calls are cut off at. Bedrock only takes
+timeouts per client, so there the deadline stops new attempts and a
+running one is bounded by the client's read timeout, a whole deadline
+per socket read (see client_pool).
+
+Every endpoint also has a circuit breaker. After `FAILURE_THRESHOLD`
+consecutive connection or server errors, calls to it fail at once with
+CircuitOpenError for `RESET_AFTER` seconds; then a single trial call
+decides whether it is back. A dead vLLM replica then costs each action
+one fast failure instead of ten immediate retries in every game.
+"""
+import re
+import time
+import random
+import threading
+import contextlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+import openai
+
+FAILURE_THRESHOLD = 5
+RESET_AFTER = 30.0
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+    # seconds after the first attempt past which no attempt starts; None for no limit
+    deadline: Optional[float] = 300.0
+
+    def backoff(self, attempt: int, rng=random) -> float:
+        """ Sleep after failed attempt number `attempt`: uniform in [0, base_delay * multiplier**(attempt-1)], capped. """
+        return rng.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1)))
+
+
+POLICIES: Dict[str, RetryPolicy] = {
+    "vllm": RetryPolicy(max_attempts=10, base_delay=0.5, max_delay=10.0),
+    "azure": RetryPolicy(max_attempts=10),
+    "anthropic": RetryPolicy(),
+    "gemini": RetryPolicy(),
+    "xai": RetryPolicy(),
+}
+
+
+class CircuitOpenError(ConnectionError):
+    """ Raised instead of calling an endpoint whose circuit breaker is open. """
+
+
+class CircuitBreaker:
+    def __init__(self, endpoint: str, failure_threshold: int = FAILURE_THRESHOLD, reset_after: float = RESET_AFTER,
+                 clock=time.monotonic):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if self._clock() - self._opened_at < self.reset_after:
+                    raise CircuitOpenError(f"{self.endpoint} failed {self.failures} times in a row, not calling it for now")
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "half_open":
+                if self._trial_running:
+                    raise CircuitOpenError(f"{self.endpoint} is being tried again by another call")
+                self._trial_running = True
+
+    def record(self, endpoint_failed: bool):
+        """ Outcome of a call let through: endpoint_failed for connection and server errors, False if it answered. """
+        with self._lock:
+            self._trial_running = False
+            if not endpoint_failed:
+                self.state = "closed"
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = self._clock()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+
+def client_endpoint(client) -> Optional[str]:
+    """ Base URL of an OpenAI-style or boto3 client, None for clients that don't expose one. """
+    base_url = getattr(client, "base_url", None)
+    if base_url:
+        return str(base_url)
+    return getattr(getattr(client, "meta", None), "endpoint_url", None)
+
+
+_RETRY_AFTER = re.compile(r"retry after (\d+(?:\.\d+)?) seconds?", re.IGNORECASE)
+# statuses worth another attempt that don't say the endpoint is down
+_RETRYABLE_STATUS = {408, 409, 429}
+_BEDROCK_UNAVAILABLE = {"ServiceUnavailableException", "InternalServerException", "ModelNotReadyException", "ModelTimeoutException"}
+_BEDROCK_RETRYABLE = {"ThrottlingException", "TooManyRequestsException"}
+_TRANSPORT_ERRORS = (ConnectionError, TimeoutError, httpx.TransportError, openai.APIConnectionError)
+
+
+def _retry_after(exc) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass
+    match = _RETRY_AFTER.search(str(exc))
+    return float(match.group(1)) if match else None
+
+
+def classify(provider: str, exc: BaseException) -> Tuple[bool, bool]:
+    """ (worth retrying, endpoint failed) for an attempt that raised `exc`. """
+    if isinstance(exc, CircuitOpenError):
+        return False, False
+    if isinstance(exc, _TRANSPORT_ERRORS) or type(exc).__name__ in ("EndpointConnectionError", "ConnectTimeoutError", "ReadTimeoutError"):
+        return True, True
+    # botocore ClientError
+    response = getattr(exc, "response", None)
+    bedrock_code = response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+    if bedrock_code:
+        return bedrock_code in _BEDROCK_UNAVAILABLE | _BEDROCK_RETRYABLE, bedrock_code in _BEDROCK_UNAVAILABLE
+    # openai.APIStatusError has status_code, google.genai.errors.APIError an int code
+    status = getattr(exc, "status_code", None)
+    if status is None and isinstance(getattr(exc, "code", None), int):
+        status = exc.code
+    if isinstance(status, int):
+        if status >= 500:
+            return True, True
+        if status in _RETRYABLE_STATUS:
+            return True, False
+        if provider == "azure" and "content_filter" in str(exc):
+            # another sample may get past the filter
+            return True, False
+        return False, False
+    if isinstance(exc, (TypeError, NotImplementedError)):
+        # bugs, not bad luck
+        return False, False
+    # output that didn't parse or validate: sample again
+    return True, False
+
+
+_rng = random.Random()
+
+
+def call_with_retries(attempt: Callable[[Optional[float]], Tuple[Any, Optional[int], Optional[int]]], provider: str,
+                      stats, endpoint: Optional[str] = None, max_attempts: Optional[int] = None, limiter=None,
+                      tokens: int = 0, policy: Optional[RetryPolicy] = None, sleep=time.sleep, clock=time.monotonic):
+    """
+    Run `attempt(timeout)` until it returns (output, prompt_tokens, completion_tokens) and return the output.
+    timeout is the time left before the policy's deadline, for the provider call. Each attempt takes a
+    slot from `limiter` for `tokens` tokens and goes through the circuit breaker of `endpoint`, if given.
+    Fills in `stats` (begun by the caller) and raises the last error when the attempts run out.
+    """
+    policy = policy or POLICIES.get(provider, RetryPolicy())
+    max_attempts = max_attempts or policy.max_attempts
+    breaker = breaker_for(endpoint) if endpoint else None
+    start = clock()
+    for n in range(1, max_attempts + 1):
+        let_through = False
+        try:
+            if breaker is not None:
+                breaker.before_call()
+                let_through = True
+            with limiter.slot(tokens) if limiter is not None else contextlib.nullcontext() as reservation:
+                # what is left once the limiter let the call through
+                timeout = None if policy.deadline is None else max(policy.deadline - (clock() - start), 0.0)
+                output, prompt_tokens, completion_tokens = attempt(timeout)
+                stats.end(output, prompt_tokens, completion_tokens)
+                if reservation is not None:
+                    reservation.settle(stats.prompt_tokens + stats.completion_tokens)
+            if breaker is not None:
+                breaker.record(endpoint_failed=False)
+            return output
+        except Exception as e:
+            retryable, endpoint_failed = classify(provider, e)
+            stats.failed(e)
+            if let_through:
+                breaker.record(endpoint_failed)
+            retry_after = _retry_after(e)
+            delay = policy.backoff(n, _rng) if retry_after is None else min(retry_after, policy.max_delay)
+            out_of_time = policy.deadline is not None and clock() - start + delay >= policy.deadline
+            if not retryable or n == max_attempts or out_of_time:
+                print(f"[{type(e).__name__}] {provider} attempt {n}/{max_attempts}, giving up: {e}")
+                stats.end()
+                raise
+            print(f"[{type(e).__name__}] {provider} attempt {n}/{max_attempts}, retrying in {delay:.1f}s: {e}")
+            sleep(delay)
@@ -0,0 +1,435 @@
+"""
+Headless, vectorized simulator for games between RandomPlayers.
+
+BatchSimulator plays `n_games` complete games in lockstep with NumPy arrays.
+It follows the same rules as GameManager/Mission:
+    role selection (with re-rolls when everybody defects),
+    leader-rotated hand passing from Mission.advance_event_step,
+    slot scoring from Mission.compute_event_outcome,
+    retreat votes and Mission.calculate_final_mission_scores.
+There is no Tracer, no chat and no get_state(), so it is meant for payoff
+balance sweeps rather than for watching games.
+
+With record=True every random draw is kept, and SimResult.game_script(i)
+returns everything needed to replay game i through GameManager with
+scripted players and decks (see tests/test_sim.py).
+"""
+import time
+import argparse
+import numpy as np
+from typing import Dict, Any, Optional
+
+from deceptiongame.decks import ThemeConfig
+from deceptiongame.payoff_calculator import get_valid_combinations, POSSIBLE_SABOTAGE_BONUSES
+
+CARDS = ["a", "b", "c", "d", "e"]
+N_CARDS = len(CARDS)
+# Mission.start_new_event uses ActionDeck() with its default size
+ACTION_DECK_SIZE = 20
+PAYOFF_KEYS = [
+    'starting_points_defector',
+    'mission_sabotaged',
+    'defector_found',
+    'defector_unknown',
+    'cooperator_found',
+    'points_per_card',
+]
+
+
+class SimResult:
+    """
+    Per-game outcome arrays. N games, M missions, P players.
+        scores              (N, P)     cumulative scores at the end of the game
+        mission_scores      (N, M, P)  score change per mission
+        defector            (N, M, P)  True where the player picked the defector role
+        events_played       (N, M)     events played before the mission ended
+        retreat_votes       (N, M, P)  number of 'yes' retreat votes per player
+        nominations         (N, M, P)  player index each player nominated
+        defector_found, cooperator_found, sabotage_successful, mission_complete  (N, M)
+        aborted             (N,)       game quit after too many all-defector re-rolls
+    Missions a game never reached (because it aborted) are all zeros/False.
+    """
+    def __init__(self, config: Dict[str, Any], arrays: Dict[str, np.ndarray], record: Optional[Dict[str, Any]] = None):
+        self.config = config
+        for k, v in arrays.items():
+            setattr(self, k, v)
+        self._record = record
+
+    @property
+    def n_games(self) -> int:
+        return self.scores.shape[0]
+
+    def summary(self) -> Dict[str, float]:
+        played = (self.events_played > 0)
+        n_missions = max(int(played.sum()), 1)
+        has_def = self.defector.any(axis=2) & played
+        has_coop = (~self.defector).any(axis=2) & played
+        both = has_def & has_coop
+        # every defector (cooperator) scores the same within a mission, so take the best of each
+        def_delta = np.where(self.defector, self.mission_scores, np.iinfo(np.int64).min).max(axis=2)
+        coop_delta = np.where(~self.defector, self.mission_scores, np.iinfo(np.int64).min).max(axis=2)
+        n_both = max(int(both.sum()), 1)
+        return {
+            'n_games': self.n_games,
+            'aborted': float(self.aborted.mean()),
+            'defector_rate': float(self.defector[played].mean()) if played.any() else 0.0,
+            'mission_complete': float(self.mission_complete[played].sum() / n_missions),
+            'defector_found': float(self.defector_found[played].sum() / n_missions),
+            'cooperator_found': float(self.cooperator_found[played].sum() / n_missions),
+            'sabotage_successful': float((self.sabotage_successful & has_def)[played].sum() / n_missions),
+            'defector_won': float(((def_delta > coop_delta) & both).sum() / n_both),
+            'cooperator_won': float(((coop_delta > def_delta) & both & ~self.cooperator_found).sum() / n_both),
+            'mean_events_played': float(self.events_played[played].mean()) if played.any() else 0.0,
+        }
+
+    def game_script(self, game: int) -> Dict[str, Any]:
+        """
+        All random draws of one game, in the order the scalar engine consumes them.
+        Only available when the simulator ran with record=True.
+        """
+        if self._record is None:
+            raise ValueError("Run the simulator with record=True to get game scripts")
+        rec = self._record
+        P = self.config['num_players']
+        missions = []
+        for m in range(self.config['total_missions']):
+            attempts = int(rec['role_attempts'][game, m])
+            if attempts == 0:
+                break
+            roles = [
+                ['defector' if d else 'cooperator' for d in rec['role_draws'][m][a][game]]
+                for a in range(attempts)
+            ]
+            mission = {
+                'payoff_matrix': {k: int(rec['payoff'][k][game, m]) for k in PAYOFF_KEYS},
+                'roles': roles,
+                'events': [],
+                'nominations': None,
+            }
+            if self.aborted[game] and self.events_played[game, m] == 0:
+                missions.append(mission)
+                break
+            for e in range(int(self.events_played[game, m])):
+                leader = int(rec['leader'][game, m, e])
+                turns = {}
+                for j in range(P):
+                    pid = (leader + j) % P
+                    turns[pid] = {
+                        'card': CARDS[rec['choice'][game, m, e, j]],
+                        'is_discard': bool(rec['discard'][game, m, e, j]),
+                        'pick': int(rec['pick'][game, m, e, j]),
+                    }
+                is_final = e == self.config['events_per_mission'] - 1
+                mission['events'].append({
+                    'template': int(rec['event_order'][game, m, e]),
+                    'attribute_slots': {
+                        CARDS[k]: int(v) for k, v in enumerate(rec['slots'][game, m, e])
+                    },
+                    'action_deck': [CARDS[c] for c in rec['action_deck'][game, m, e]],
+                    'leader': leader,
+                    'turns': turns,
+                    'votes': None if is_final else {
+                        pid: 'yes' if v else 'no' for pid, v in enumerate(rec['votes'][game, m, e])
+                    },
+                })
+            mission['nominations'] = {pid: int(t) for pid, t in enumerate(self.nominations[game, m])}
+            missions.append(mission)
+        return {
+            'missions': missions,
+            'scores': {pid: int(s) for pid, s in enumerate(self.scores[game])},
+            'aborted': bool(self.aborted[game]),
+        }
+
+
+class BatchSimulator:
+    def __init__(
+        self,
+        n_games: int,
+        num_players: int = 5,
+        total_missions: int = 3,
+        events_per_mission: int = 5,
+        theme: str = 'default',
+        payoff_matrix: Optional[Dict[str, int]] = None,
+        scale_payoffs: bool = True,
+        p_defector: float = 0.5,
+        p_discard: float = 0.5,
+        p_retreat: float = 0.5,
+        max_rerolls: int = 25,
+        seed: Optional[int] = None,
+        record: bool = False,
+    ):
+        """
+        :param payoff_matrix: fixed (mission 1) payoff matrix used by every game. When None,
+            every mission samples its own the way MissionCard does with get_scores_and_ev().
+        :param scale_payoffs: multiply payoffs by the mission number, as MissionDeck.draw_mission_card does.
+        :param p_defector, p_discard, p_retreat: RandomPlayer policy; 0.5 matches RandomPlayer.
+        """
+        # one card leaves the event hand per player, and every discard draws 2 from the action deck
+        if not 2 <= num_players <= N_CARDS + 1:
+            raise ValueError(f"num_players must be between 2 and {N_CARDS + 1}")
+        if payoff_matrix is not None:
+            missing = [k for k in PAYOFF_KEYS if k not in payoff_matrix]
+            if missing:
+                raise ValueError(f"payoff_matrix is missing {missing}")
+        self.n_games = n_games
+        self.num_players = num_players
+        self.total_missions = total_missions
+        self.events_per_mission = events_per_mission
+        self.theme = theme
+        self.payoff_matrix = payoff_matrix
+        self.scale_payoffs = scale_payoffs
+        self.p_defector = p_defector
+        self.p_discard = p_discard
+        self.p_retreat = p_retreat
+        self.max_rerolls = max_rerolls
+        self.seed = seed
+        self.record = record
+        self.rng = np.random.default_rng(seed)
+        self._build_event_templates()
+
+    def _build_event_templates(self):
+        # EventDeck takes the first `deck_size` events of the theme, in file order
+        events = list(ThemeConfig(self.theme).get_events().values())[:self.events_per_mission]
+        if len(events) < self.events_per_mission:
+            raise ValueError(f"Theme '{self.theme}' only has {len(events)} events")
+        T = len(events)
+        self._slots = np.ones((T, N_CARDS), dtype=np.int64)
+        self._others = np.zeros((T, 3), dtype=np.int64)
+        for t, ev in enumerate(events):
+            coop, defect = CARDS.index(ev['pass']), CARDS.index(ev['fail'])
+            # EventCard: 3 primary cooperator slots, 2 primary defector slots, [1, 1, -1] shuffled over the rest
+            self._slots[t, coop] = 3
+            self._slots[t, defect] = -2
+            self._others[t] = [k for k in range(N_CARDS) if k not in (coop, defect)]
+        self._action_deck = np.repeat(np.arange(N_CARDS), ACTION_DECK_SIZE // N_CARDS)
+
+    def _draw_payoffs(self) -> Dict[str, np.ndarray]:
+        N, M = self.n_games, self.total_missions
+        if self.payoff_matrix is not None:
+            return {k: np.full((N, M), int(self.payoff_matrix[k]), dtype=np.int64) for k in PAYOFF_KEYS}
+        # same distribution as payoff_calculator.get_scores_and_ev
+        combos = np.array(get_valid_combinations(), dtype=np.int64)
+        picked = combos[self.rng.integers(0, len(combos), (N, M))]
+        starting, sabotage = picked[..., 0], picked[..., 1]
+        base = starting + sabotage
+        defector_found = self.rng.integers(np.maximum(0, base - 1), base + 2)
+        return {
+            'starting_points_defector': starting,
+            'mission_sabotaged': sabotage,
+            'defector_found': defector_found,
+            'defector_unknown': self.rng.integers(0, min(POSSIBLE_SABOTAGE_BONUSES), (N, M)),
+            'cooperator_found': defector_found.copy(),
+            'points_per_card': np.ones((N, M), dtype=np.int64),
+        }
+
+    def _select_roles(self, m: int, rerolls: np.ndarray, aborted: np.ndarray, rec: Optional[Dict[str, Any]]) -> np.ndarray:
+        N, P = self.n_games, self.num_players
+        defector = self.rng.random((N, P)) < self.p_defector
+        draws = [defector.copy()]
+        attempts = np.where(aborted, 0, 1)
+        # GameManager makes everyone pick again while all players are defectors
+        redo = defector.all(axis=1) & ~aborted
+        while redo.any():
+            rerolls += redo
+            aborted |= rerolls > self.max_rerolls
+            redo &= ~aborted
+            new = self.rng.random((N, P)) < self.p_defector
+            defector = np.where(redo[:, None], new, defector)
+            attempts += redo
+            draws.append(new)
+            redo &= defector.all(axis=1)
+        if rec is not None:
+            rec['role_draws'].append(draws)
+            rec['role_attempts'][:, m] = attempts
+        return defector
+
+    def _play_event(self, leader: np.ndarray, rec: Optional[Dict[str, Any]], m: int, e: int) -> np.ndarray:
+        """ One pass of the event hand around the table; returns played card counts (N, 5). """
+        N, P = self.n_games, self.num_players
+        ar = np.arange(N)
+        deck = self.rng.permuted(np.tile(self._action_deck, (N, 1)), axis=1)
+        # event hand: one of each card plus one drawn from the action deck
+        hand = np.ones((N, N_CARDS), dtype=np.int64)
+        hand[ar, deck[:, 0]] += 1
+        ptr = np.ones(N, dtype=np.int64)
+        played = np.zeros((N, N_CARDS), dtype=np.int64)
+        for j in range(P):
+            size = N_CARDS + 1 - j
+            # random.choice over the sorted hand == pick a card type proportionally to its count
+            u = self.rng.random(N) * size
+            choice = (np.cumsum(hand, axis=1) <= u[:, None]).sum(axis=1)
+            discard = self.rng.random(N) < self.p_discard
+            pick = (self.rng.random(N) < 0.5).astype(np.int64)
+            hand[ar, choice] -= 1
+            # a discard draws two new cards and the player plays one of them
+            redraw = deck[ar, ptr + pick]
+            card = np.where(discard, redraw, choice)
+            played[ar, card] += 1
+            ptr += 2 * discard
+            if rec is not None:
+                rec['choice'][:, m, e, j] = choice
+                rec['discard'][:, m, e, j] = discard
+                rec['pick'][:, m, e, j] = pick
+        if rec is not None:
+            rec['action_deck'][:, m, e] = deck
+        return played
+
+    def run(self) -> SimResult:
+        N, P, M, E = self.n_games, self.num_players, self.total_missions, self.events_per_mission
+        rng = self.rng
+        ar = np.arange(N)
+        payoff = self._draw_payoffs()
+
+        scores = np.zeros((N, P), dtype=np.int64)
+        out = {
+            'mission_scores': np.zeros((N, M, P), dtype=np.int64),
+            'defector': np.zeros((N, M, P), dtype=bool),
+            'events_played': np.zeros((N, M), dtype=np.int64),
+            'retreat_votes': np.zeros((N, M, P), dtype=np.int64),
+            'nominations': np.zeros((N, M, P), dtype=np.int64),
+            'defector_found': np.zeros((N, M), dtype=bool),
+            'cooperator_found': np.zeros((N, M), dtype=bool),
+            'sabotage_successful': np.zeros((N, M), dtype=bool),
+            'mission_complete': np.zeros((N, M), dtype=bool),
+        }
+        rec = None
+        if self.record:
+            rec = {
+                'payoff': payoff,
+                'role_draws': [],
+                'role_attempts': np.zeros((N, M), dtype=np.int64),
+                'event_order': np.zeros((N, M, E), dtype=np.int64),
+                'slots': np.zeros((N, M, E, N_CARDS), dtype=np.int8),
+                'action_deck': np.zeros((N, M, E, ACTION_DECK_SIZE), dtype=np.int8),
+                'leader': np.zeros((N, M, E), dtype=np.int64),
+                'choice': np.zeros((N, M, E, P), dtype=np.int8),
+                'discard': np.zeros((N, M, E, P), dtype=bool),
+                'pick': np.zeros((N, M, E, P), dtype=np.int8),
+                'votes': np.zeros((N, M, E, P), dtype=bool),
+            }
+
+        leader = np.zeros(N, dtype=np.int64)
+        rerolls = np.zeros(N, dtype=np.int64)
+        aborted = np.zeros(N, dtype=bool)
+        player_idx = np.arange(P)
+        for m in range(M):
+            scale = (m + 1) if self.scale_payoffs else 1
+            pm = {k: v[:, m] * scale for k, v in payoff.items()}
+            defector = self._select_roles(m, rerolls, aborted, rec)
+            active = ~aborted
+            in_mission = active.copy()
+            coop_pts = np.zeros(N, dtype=np.int64)
+            def_pts = np.zeros(N, dtype=np.int64)
+            complete = np.zeros(N, dtype=bool)
+
+            order = rng.permuted(np.tile(np.arange(E), (N, 1)), axis=1)
+            for e in range(E):
+                card = order[:, e]
+                slots = self._slots[card].copy()
+                neg = rng.integers(0, 3, N)
+                slots[ar, self._others[card, neg]] = -1
+                if rec is not None:
+                    rec['event_order'][:, m, e] = card
+                    rec['slots'][:, m, e] = slots
+                    rec['leader'][:, m, e] = leader
+                played = self._play_event(leader, rec, m, e)
+
+                used = np.minimum(played, np.abs(slots))
+                coop_pts += active * (used * (slots > 0)).sum(axis=1)
+                def_pts += active * (used * (slots < 0)).sum(axis=1)
+                out['events_played'][:, m] += active
+
+                if e < E - 1:
+                    votes = rng.random((N, P)) < self.p_retreat
+                    retreat = active & (votes.sum(axis=1) >= P // 2 + 1)
+                    out['retreat_votes'][:, m] += votes & active[:, None]
+                    if rec is not None:
+                        rec['votes'][:, m, e] = votes
+                else:
+                    # the last event never votes; reaching it empties the event deck
+                    retreat = np.zeros(N, dtype=bool)
+                    complete = active.copy()
+                leader = np.where(active, (leader + 1) % P, leader)
+                active &= ~retreat
+
+            # nominations: each player picks one of the others, only cooperators count
+            r = rng.integers(0, P - 1, (N, P))
+            nominations = r + (r >= player_idx)
+            cooperator = ~defector
+            against = ((nominations[:, :, None] == player_idx) & cooperator[:, :, None]).sum(axis=1)
+            n_coop = cooperator.sum(axis=1)
+            n_def = defector.sum(axis=1)
+            nominee = against.argmax(axis=1)
+            # a strict majority of cooperator votes is always a unique top vote-getter
+            majority = (2 * against[ar, nominee]) > n_coop
+            defector_found = majority & defector[ar, nominee]
+            cooperator_found = majority & cooperator[ar, nominee]
+
+            coop_scores = coop_pts * pm['points_per_card']
+            def_scores = def_pts * pm['points_per_card']
+            coop_share = -(-coop_scores // np.maximum(n_coop, 1))
+            def_share = -(-def_scores // np.maximum(n_def, 1))
+            sabotage_successful = (
+                (~complete & ~defector_found)
+                | (complete & ~defector_found & (def_scores >= 3 * n_def))
+            )
+            coop_bonus = np.where(
+                defector_found, pm['defector_found'],
+                np.where(cooperator_found, -pm['cooperator_found'], pm['defector_unknown'])
+            )
+            def_total = pm['starting_points_defector'] + def_share + sabotage_successful * pm['mission_sabotaged']
+            delta = np.where(defector, def_total[:, None], (coop_share + coop_bonus)[:, None])
+            delta *= in_mission[:, None]
+            scores += delta
+
+            out['mission_scores'][:, m] = delta
+            out['defector'][:, m] = defector & in_mission[:, None]
+            out['nominations'][:, m] = nominations
+            out['defector_found'][:, m] = defector_found & in_mission
+            out['cooperator_found'][:, m] = cooperator_found & in_mission
+            out['sabotage_successful'][:, m] = sabotage_successful & in_mission
+            out['mission_complete'][:, m] = complete
+
+        config = {
+            'n_games': N,
+            'num_players': P,
+            'total_missions': M,
+            'events_per_mission': E,
+            'theme': self.theme,
+            'payoff_matrix': self.payoff_matrix,
+            'scale_payoffs': self.scale_payoffs,
+            'p_defector': self.p_defector,
+            'p_discard': self.p_discard,
+            'p_retreat': self.p_retreat,
+            'seed': self.seed,
+        }
+        return SimResult(config, {'scores': scores, 'aborted': aborted, **out}, record=rec)
+
+
+def simulate(n_games: int, **kwargs: Any) -> SimResult:
+    return BatchSimulator(n_games, **kwargs).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized RandomPlayer simulation for payoff balance sweeps.")
+    parser.add_argument("--n_games", type=int, default=100_000)
+    parser.add_argument("--num_players", type=int, default=5)
+    parser.add_argument("--total_missions", type=int, default=3)
+    parser.add_argument("--events_per_mission", type=int, default=5)
+    parser.add_argument("--theme", type=str, default="default")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = simulate(
+        args.n_games,
+        num_players=args.num_players,
+        total_missions=args.total_missions,
+        events_per_mission=args.events_per_mission,
+        theme=args.theme,
+        seed=args.seed,
+    )
+    elapsed = time.perf_counter() - start
+    for k, v in result.summary().items():
+        print(f"{k:<22} {v}")
+    print(f"{args.n_games} games in {elapsed:.2f}s ({args.n_games / elapsed * 60:,.0f} games/minute)")
@@ -1,15 +1,11 @@
 import os
-import json
 from pick import pick
 
+from deceptiongame.tracer import find_traces, load_trace
+
 
 def browse_json_files(start_dir="game_logs"):
-    files = []
-    for root, _, filenames in os.walk(start_dir):
-        for f in filenames:
-            if f.endswith('.json'):
-                rel_path = os.path.relpath(os.path.join(root, f), start_dir)
-                files.append(rel_path)
+    files = [os.path.relpath(path, start_dir) for path in find_traces(start_dir)]
     if not files:
         print("No JSON files found.")
         return None
@@ -23,8 +19,7 @@ def state_browser(path, mission_idx=None, event_idx=None):
     Let the user pick a mission and then an event from the loaded trace.
     Returns (mission_idx, event_idx).
     """
-    with open(path, 'r') as f:
-        data = json.load(f)
+    data = load_trace(path)
 
     missions = data.get("missions", [])
     if not missions:
@@ -0,0 +1,122 @@
+"""
+Instruction templates of a theme, compiled once per process.
+
+Every OnlineAI action used to fill its instruction template with a dozen
+theme terms, each looked up, lowercased and capitalized on the spot, and
+every player imported its theme and read its rules.md on construction.
+`themed_prompts` does that once per theme and shares the result with all
+players and games in the process: the terms with their capitalized
+variants, the system prompt of each prompt profile and the INSTRUCTIONS
+templates with the terms already in, so only the per-call fields
+({available_roles}, {hand_cards}, {other_players}) are left to fill.
+
+    prompts = themed_prompts("hospital")
+    prompts.term("Mission")
+    prompts.instructions["nominate"].format(other_players="Bob, Eve")
+"""
+import string
+import pathlib
+import functools
+import importlib
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from deceptiongame.llm_instructions import INSTRUCTIONS
+
+# theme terms substituted into the compact legend of the system prompt
+COMPACT_LEGEND_TERMS = ('mission', 'missions', 'event', 'events', 'players', 'score', 'leader', 'cooperators',
+                        'defector', 'accused', 'cooperator', 'card', 'played', 'defectors', 'points', 'sabotaged',
+                        'cards', 'sabotage', 'hand', 'retreat')
+
+# terms of the event card JSON, see EventCard.get_card_info_formatted
+EVENT_CARD_TERMS = ('event', 'mission', 'cards', 'cooperators', 'defectors', 'sabotage')
+
+
+@dataclass(frozen=True)
+class ThemedPrompts:
+    name: str
+    theme: Dict[str, Any]
+    rules_md: str
+    # term key -> themed term, for the lowercase key and the key with a capital first letter
+    terms: Dict[str, str]
+    # INSTRUCTIONS key -> template with the theme terms in, to be filled with str.format
+    instructions: Dict[str, str]
+    # prompt profile -> system prompt
+    system_prompts: Dict[str, str]
+    # keyword arguments of EventCard.get_card_info_formatted
+    event_card_terms: Dict[str, str]
+
+    def term(self, key: str) -> str:
+        """Get themed term, auto-capitalizing if key starts with uppercase"""
+        try:
+            return self.terms[key]
+        except KeyError:
+            pass
+        keyl = key.lower()
+        if keyl not in self.theme["terms"]:
+            raise KeyError(f"Term not defined: {key}")
+        result = self.theme["terms"][keyl]
+        if key[0].isupper():
+            return result[0].upper() + result[1:]
+        return result
+
+
+def _capitalize(term: str) -> str:
+    return term[:1].upper() + term[1:]
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def compile_template(template: str, terms: Dict[str, str]) -> str:
+    """
+    `template` with the fields that are theme terms filled in, still a str.format template for the
+    others: those keep their conversion and format spec, and literal braces stay escaped.
+    """
+    out = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        out.append(_escape(literal))
+        if field is None:
+            continue
+        if field in terms and not spec and not conversion:
+            out.append(_escape(terms[field]))
+        else:
+            out.append("{" + field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=None)
+def themed_prompts(theme_name: str) -> ThemedPrompts:
+    """ The compiled prompts of `theme_name`, built on first use and shared after that. """
+    theme_pkg = f"deceptiongame.themes.{theme_name}"
+    try:
+        theme_module = importlib.import_module(f"{theme_pkg}.theme")
+        theme = getattr(theme_module, f"{theme_name.upper()}_THEME")
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f"Could not import theme data for '{theme_name}': {e}")
+    rules_path = pathlib.Path(__file__).parent / "themes" / theme_name / "rules.md"
+    if not rules_path.exists():
+        raise FileNotFoundError(f"rules.md not found for theme '{theme_name}' at {rules_path}")
+    with open(rules_path, "r", encoding="utf8") as f:
+        rules_md = f.read()
+    if not theme or "terms" not in theme:
+        raise ValueError(f"Theme terms not defined for theme: {theme_name}")
+
+    terms = {}
+    for key, term in theme["terms"].items():
+        terms[key] = term
+        terms.setdefault(_capitalize(key), _capitalize(term))
+    instructions = {key: compile_template(template, terms) for key, template in INSTRUCTIONS.items()}
+
+    system_prompt = INSTRUCTIONS["system_prompt_template"].format(rules_md=rules_md)
+    legend = INSTRUCTIONS["compact_legend"].format(**{term: terms[term] for term in COMPACT_LEGEND_TERMS})
+    return ThemedPrompts(
+        name=theme_name,
+        theme=theme,
+        rules_md=rules_md,
+        terms=terms,
+        instructions=instructions,
+        system_prompts={'default': system_prompt, 'compact': system_prompt + legend},
+        event_card_terms={term: terms[term] for term in EVENT_CARD_TERMS},
+    )
@@ -1,38 +1,87 @@
 import uuid, json, time, os, copy
+import io
+import re
+import sys
+import zlib
+import contextlib
+import gzip
+import queue
+import hashlib
+import weakref
 import functools
+import threading
 from datetime import datetime
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from deceptiongame.manifest import append_manifest, log_root, manifest_entry, read_manifest, walk_traces
+
+# file name suffix per compression; the trace format (.json/.jsonl) comes before it
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+TRACE_SUFFIXES = tuple(ext + comp for ext in ('.jsonl', '.json') for comp in ('.gz', '.zst', ''))
+# shared prompt store, at the root of the log directory of the traces that reference it
+PROMPT_STORE_DIR = 'prompts'
+# per-game summary written next to the trace when the game finishes
+SUMMARY_SUFFIX = '.summary.json'
+
+
+def _locked(method):
+    """ Runs the method under the tracer's lock. """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class Tracer:
-    def __init__(self, config, prompt_templates, save_path, save_trace):
+    def __init__(self, config, prompt_templates, save_path, save_trace, dedup_prompts=False, manifest=None):
         self.trace = {
             "game_id": str(uuid.uuid4()),
             "started_at": datetime.utcnow().isoformat() + "Z",
             "config": config,
+            # before the missions, so a streaming reader meets everything a record needs before the record
+            "prompt_templates": prompt_templates,
             "missions": [],
-            "prompt_templates": prompt_templates
         }
         self._current_mission = None
         self._current_event = None
         self._trace_save_path = save_path
         self._enabled = save_trace
-        
+        # saved files reference the prompts by sha256 in PROMPT_STORE_DIR instead of embedding them
+        self._dedup_prompts = dedup_prompts
+        self._saved_templates = None
+        # log directory whose manifest lists this game, updated on flush when the game starts and finishes
+        self._manifest = manifest
+        self._manifest_status = None
+        # players log their actions from the worker threads their decisions run on, while the server's
+        # event loop may start events and flush the same game; every read or change of the trace takes it
+        self._lock = threading.RLock()
+
+    @_locked
     def start_mission(self, mission_id, payoff_matrix):
         self._current_mission = {
             "mission_id": mission_id,
+            "payoff_matrix": payoff_matrix,
             'actions': [],
             "events": [],
             "llm_summary": None,
             "scores": None,
-            "payoff_matrix": payoff_matrix,
         }
         self.trace["missions"].append(self._current_mission)
+        self._emit("start_mission", mission_id=mission_id, payoff_matrix=payoff_matrix)
 
+    @_locked
     def end_mission(self, llm_summary=None):
         if llm_summary is not None:
             self._current_mission["llm_summary"] = llm_summary
         self._current_mission = None
+        self._emit("end_mission", llm_summary=llm_summary)
 
+    @_locked
     def start_event(self, event_id, card):
         ev = {
             "event_id": event_id,
@@ -42,57 +91,101 @@ class Tracer:
         }
         self._current_event = ev
         self._current_mission["events"].append(ev)
-        
+        self._emit("start_event", event_id=event_id, card=ev["card"])
+
+    @_locked
     def end_event(self, event_id, played_cards=None, used_attributes=None):
         if self._current_event and self._current_event["event_id"] == event_id:
             if played_cards is not None:
                 self._current_event["played_cards"] = played_cards
             if used_attributes is not None:
                 self._current_event["used_attributes"] = used_attributes
+            self._emit("end_event", event_id=event_id, played_cards=played_cards, used_attributes=used_attributes)
         else:
             raise ValueError("strange bug where end event tracer is called without an event")
 
-    def log_action(self, phase, player_id, payload):
+    def log_action(self, phase, player_id, payload, llm=None):
         if not self._enabled:
             return
-        if phase in ['select_role','summarize']  or (not self._current_event and phase == 'note_to_self'):
-            self._current_mission['actions'].append({
-                "phase": phase,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "player_id": player_id,
-                "payload": payload
-            })
-        else: 
-            if not self._current_event :
-                print ("Must start_event() before logging actions. Exiting trace logging")
-                return
-            self._current_event["actions"].append({
-                "phase": phase,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "player_id": player_id,
-                "payload": payload
-            })
+        record = {
+            "phase": phase,
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "player_id": player_id,
+            "payload": payload
+        }
+        if llm:
+            # CallStats dicts of the LLM calls that chose this action
+            record["llm"] = llm
+        with self._lock:
+            if phase in ['select_role','summarize']  or (not self._current_event and phase == 'note_to_self'):
+                self._current_mission['actions'].append(record)
+                self._emit("log_action", scope="mission", **record)
+            else: 
+                if not self._current_event :
+                    print ("Must start_event() before logging actions. Exiting trace logging")
+                    return
+                self._current_event["actions"].append(record)
+                self._emit("log_action", scope="event", **record)
 
+    @_locked
     def record_mission_scores(self, scores):
         assert self._current_mission, "Must start mission before recording scores"
         self._current_mission["scores"] = dict(scores)
         # breakpoint()
         self._current_mission["scores"] = copy.deepcopy(scores)
+        self._emit("record_mission_scores", scores=scores)
 
+    @_locked
     def finish_game(self, outcome):
         """ outcome = { 'scores': {...}, 'winner_id': X } """
         self.trace["outcome"] = outcome
+        self.trace["timing"] = timing_summary(self.trace)
+        self._emit("finish_game", outcome=outcome)
+        if self._enabled and self._trace_save_path:
+            write_summary(self._trace_save_path, summarize_trace(self.trace))
+
+    def _emit(self, kind, **fields):
+        """ Hook for streaming tracers, called once per recorded step. The in-memory trace is already updated. """
+        pass
 
+    @_locked
+    def flush(self):
+        """ Persist the trace so far; called by the GameManager on every step when save_trace is on. """
+        self.save_trace_to_json()
+        self._update_manifest()
+
+    def _update_manifest(self):
+        if self._manifest is None or not self._enabled or not self._trace_save_path:
+            return
+        status = "finished" if "outcome" in self.trace else "running"
+        if status != self._manifest_status:
+            append_manifest(self._manifest, manifest_entry(self._trace_save_path, self.trace, status))
+            self._manifest_status = status
+
+    @_locked
     def save_trace_to_json(self, path=None):
         if path is None:
             path = self._trace_save_path
-        s = json.dumps(self.trace, indent=2)
+        s = json.dumps({**self.trace, "prompt_templates": self._saved_prompt_templates(path)}, indent=2)
         if path:
-            with open(path, "w") as f:
+            with open_trace_file(path, "w") as f:
                 f.write(s)
         print (f'Dumped game trace to {path}')
         return s
     
+    def _saved_prompt_templates(self, path=None):
+        """ prompt_templates as written to disk: as is, or as references into the prompt store. """
+        path = path or self._trace_save_path
+        if not self._dedup_prompts or not path:
+            return self.trace["prompt_templates"]
+        if self._saved_templates is None:
+            store = os.path.join(log_root(path), PROMPT_STORE_DIR)
+            self._saved_templates = {
+                (f"{name}_sha256" if text else name): (store_prompt(store, text) if text else text)
+                for name, text in self.trace["prompt_templates"].items()
+            }
+        return self._saved_templates
+
     @classmethod
     def load_from_file(cls, path):
         """
@@ -101,8 +194,7 @@ class Tracer:
         have no “current” mission/event active.
         """
         print ('Loading tracer from file: ', path)
-        with open(path, 'r') as f:
-            data = json.load(f)
+        data = load_trace(path)
 
         tracer = cls(
             config=data.get("config", {}),
@@ -116,6 +208,824 @@ class Tracer:
 
         return tracer    
 
+    @staticmethod
+    def iter_records(path, start=None, end=None):
+        """
+        Records of a trace file one at a time, in the JSONL record layout
+        (start_game, start_mission, start_event, log_action, end_event,
+        record_mission_scores, end_mission, finish_game), whatever its format
+        and compression, so a game is never held in memory whole. Nested .json
+        traces are parsed incrementally.
+
+        Older nested traces stored the prompt templates after the missions and
+        each payoff matrix after its events; those arrive late, as a
+        prompt_templates record and on end_mission.
+
+        `start`/`end` restrict an uncompressed JSONL trace to the lines that
+        begin in that byte range (see split_byte_ranges), to share one big
+        trace between workers; only the first range has start_game.
+        """
+        if ".jsonl" in (trace_suffix(path) or ""):
+            records = _iter_jsonl_records(path, start, end)
+        elif start is not None or end is not None:
+            raise ValueError(f"Byte ranges need an uncompressed JSONL trace, got {path}")
+        else:
+            records = _iter_nested_records(path)
+        for record in records:
+            if record["type"] in ("start_game", "prompt_templates"):
+                resolve_prompt_templates(record, path)
+            yield record
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Rebuild the nested trace dict from JSONL records (see JsonlTracer) by
+        running them back through the same methods that built it live.
+        """
+        tracer = None
+        for record in records:
+            record = dict(record)
+            kind = record.pop("type")
+            if kind == "start_game":
+                tracer = cls(record["config"], record["prompt_templates"], save_path=None, save_trace=True)
+                tracer.trace["game_id"] = record["game_id"]
+                tracer.trace["started_at"] = record["started_at"]
+            elif tracer is None:
+                raise ValueError(f"Trace records must begin with start_game, got {kind}")
+            elif kind == "log_action":
+                scope = record.pop("scope")
+                target = tracer._current_mission if scope == "mission" else tracer._current_event
+                target["actions"].append(record)
+            elif kind == "record_mission_scores":
+                tracer._current_mission["scores"] = record["scores"]
+            elif kind == "prompt_templates":
+                tracer.trace["prompt_templates"] = record["prompt_templates"]
+            elif kind == "end_mission" and "payoff_matrix" in record:
+                tracer._current_mission["payoff_matrix"] = record.pop("payoff_matrix")
+                tracer.end_mission(**record)
+            elif kind in ("start_mission", "end_mission", "start_event", "end_event", "finish_game"):
+                getattr(tracer, kind)(**record)
+            else:
+                raise ValueError(f"Unknown trace record type {kind}")
+        if tracer is None:
+            raise ValueError("Empty trace")
+        return tracer.trace
+
+
+class JsonlTracer(Tracer):
+    """
+    Tracer that appends one JSON line per recorded step instead of rewriting
+    the whole trace, so saving costs O(1) per step. Tracer.load_from_file and
+    load_trace turn the file back into the usual nested layout.
+
+    Records are serialised on the game thread (payloads may change later) and
+    by default written by a TraceWriter thread; extra keyword arguments are
+    passed on to it (background, max_queue, flush_every, flush_interval_ms, fsync).
+    """
+    def __init__(self, config, prompt_templates, save_path, save_trace, dedup_prompts=False, manifest=None, **writer_options):
+        super().__init__(config, prompt_templates, save_path, save_trace, dedup_prompts, manifest)
+        self._writer = None
+        self._writer_options = writer_options
+
+    def _emit(self, kind, **fields):
+        if not self._enabled or not self._trace_save_path:
+            return
+        if self._writer is None:
+            # append, so a resumed game keeps writing to the same file
+            self._writer = TraceWriter(self._trace_save_path, **self._writer_options)
+            if self._writer.is_new:
+                self._write({
+                    "type": "start_game",
+                    "game_id": self.trace["game_id"],
+                    "started_at": self.trace["started_at"],
+                    "config": self.trace["config"],
+                    "prompt_templates": self._saved_prompt_templates(),
+                })
+        self._write({"type": kind, **fields})
+        if kind == "finish_game":
+            self.close()
+
+    def _write(self, record):
+        self._writer.write(json.dumps(record) + "\n")
+
+    @_locked
+    def flush(self):
+        # a background writer flushes on its own schedule
+        if self._writer is not None and not self._writer.background:
+            self._writer.flush()
+        self._update_manifest()
+
+    @_locked
+    def close(self):
+        """ Write out everything still queued and close the file. """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def stats(self):
+        return self._writer.stats() if self._writer is not None else {}
+
+    @_locked
+    def save_trace_to_json(self, path=None):
+        if path is None or path == self._trace_save_path:
+            # the JSONL file is already up to date, don't overwrite it with the nested layout
+            self.flush()
+            return ""
+        return super().save_trace_to_json(path)
+
+
+_CLOSE = object()
+_live_writers = weakref.WeakSet()
+
+
+class TraceWriter:
+    """
+    Appends lines to a file, by default from a background thread fed by a
+    bounded queue, so disk latency stays off the game loop. The file is
+    flushed every `flush_every` lines or `flush_interval_ms` after the first
+    unflushed line, whichever comes first. A full queue blocks the caller.
+
+    fsync: 'never', 'close' (once, when the writer is closed) or 'flush' (on every flush).
+    """
+    FSYNC_POLICIES = ('never', 'close', 'flush')
+
+    def __init__(self, path, background=True, max_queue=10000, flush_every=64, flush_interval_ms=200, fsync='close'):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of {list(self.FSYNC_POLICIES)}")
+        self.path = path
+        self.background = background
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval_ms / 1000
+        self.fsync = fsync
+        self.is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open_trace_file(path, "a")
+        self._error = None
+        self._closed = False
+        self._unflushed = 0
+        self._first_unflushed = None
+        self.counters = {
+            "records_written": 0,
+            "bytes_written": 0,
+            "flushes": 0,
+            "fsyncs": 0,
+            "flush_ms_total": 0.0,
+            "flush_ms_max": 0.0,
+            "max_queue_depth": 0,
+            "blocked_puts": 0,
+        }
+        if background:
+            self._queue = queue.Queue(maxsize=max_queue)
+            self._thread = threading.Thread(target=self._run, name=f"trace-writer-{os.path.basename(path)}", daemon=True)
+            self._thread.start()
+        _live_writers.add(self)
+
+    def write(self, line):
+        if self._closed:
+            raise ValueError(f"Trace writer for {self.path} is closed")
+        if self._error is not None:
+            raise self._error
+        if not self.background:
+            self._append(line)
+            return
+        if self._queue.full():
+            self.counters["blocked_puts"] += 1
+        self._queue.put(line)
+        depth = self._queue.qsize()
+        if depth > self.counters["max_queue_depth"]:
+            self.counters["max_queue_depth"] = depth
+
+    def _append(self, line):
+        self._file.write(line)
+        self.counters["records_written"] += 1
+        self.counters["bytes_written"] += len(line.encode())
+        self._unflushed += 1
+        if self._first_unflushed is None:
+            self._first_unflushed = time.monotonic()
+
+    def flush(self, fsync=None):
+        if self._unflushed == 0 and not fsync:
+            return
+        t0 = time.perf_counter()
+        self._file.flush()
+        if fsync is None:
+            fsync = self.fsync == 'flush'
+        if fsync:
+            os.fsync(self._file.fileno())
+            self.counters["fsyncs"] += 1
+        elapsed = 1e3 * (time.perf_counter() - t0)
+        self.counters["flushes"] += 1
+        self.counters["flush_ms_total"] += elapsed
+        self.counters["flush_ms_max"] = max(self.counters["flush_ms_max"], elapsed)
+        self._unflushed = 0
+        self._first_unflushed = None
+
+    def _flush_due(self):
+        return self._unflushed and (
+            self._unflushed >= self.flush_every
+            or time.monotonic() - self._first_unflushed >= self.flush_interval
+        )
+
+    def _run(self):
+        while True:
+            if self._first_unflushed is None:
+                timeout = None
+            else:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - self._first_unflushed))
+            try:
+                line = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                line = None
+            if line is _CLOSE:
+                return
+            if self._error is not None:
+                # keep draining so producers never block on a dead writer
+                continue
+            try:
+                if line is not None:
+                    self._append(line)
+                if self._flush_due():
+                    self.flush()
+            except OSError as e:
+                self._error = e
+
+    def close(self):
+        """ Drain the queue, flush, fsync unless the policy is 'never', and close the file. """
+        if self._closed:
+            return
+        self._closed = True
+        if self.background:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        try:
+            if self._error is None:
+                self.flush(fsync=self.fsync != 'never')
+        finally:
+            self._file.close()
+            _live_writers.discard(self)
+        if self._error is not None:
+            raise self._error
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats["queue_depth"] = self._queue.qsize() if self.background and not self._closed else 0
+        return stats
+
+
+def trace_writer_stats():
+    """ Counters summed over every open trace writer in the process, e.g. all games running on one node. """
+    writers = list(_live_writers)
+    total = {"open_writers": len(writers)}
+    for writer in writers:
+        for key, value in writer.stats().items():
+            if key.endswith("_max") or key == "max_queue_depth":
+                total[key] = max(total.get(key, 0), value)
+            else:
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+def open_trace_file(path, mode="r"):
+    """ Open a trace file as text for 'r', 'w' or 'a', (de)compressing according to its suffix. """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Reading or writing .zst traces needs the zstandard package (pip install zstandard)")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+        else:
+            # appending starts a new frame, which read_across_frames picks up
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, mode + "b"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode)
+
+
+def trace_suffix(path):
+    """ The trace suffix of `path` (e.g. '.jsonl.gz'), or None if it is not a trace file. """
+    if path.endswith(SUMMARY_SUFFIX):
+        return None
+    for suffix in TRACE_SUFFIXES:
+        if path.endswith(suffix):
+            return suffix
+    return None
+
+
+def trace_stem(path):
+    suffix = trace_suffix(path)
+    return path[:-len(suffix)] if suffix else path
+
+
+def find_traces(log_dir):
+    """
+    Trace files in `log_dir`, in any format and compression, as listed by its
+    manifest in the order the games started. A directory without a manifest
+    (older logs) is walked instead. Games whose file has been removed since
+    are left out.
+    """
+    entries = read_manifest(log_dir)
+    if entries is None:
+        return walk_traces(log_dir)
+    paths = (os.path.join(log_dir, path) for path in entries)
+    return [path for path in paths if os.path.exists(path)]
+
+
+def resolve_compression(compression):
+    """ Map a trace_compression setting to 'gzip', 'zstd' or None; 'auto' prefers zstd when it is installed. """
+    if compression in (None, "none"):
+        return None
+    if compression == "auto":
+        return "zstd" if zstandard is not None else "gzip"
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown trace compression {compression!r}, expected one of {[None, 'auto', *COMPRESSION_SUFFIXES]}")
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("zstd trace compression needs the zstandard package (pip install zstandard)")
+    return compression
+
+
+def store_prompt(store_dir, text):
+    """ Save `text` in the content-addressed prompt store (once) and return its sha256. """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    path = os.path.join(store_dir, f"{digest}.txt")
+    if not os.path.exists(path):
+        os.makedirs(store_dir, exist_ok=True)
+        # write then rename, concurrent games may store the same prompt
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    return digest
+
+
+def resolve_prompt_templates(trace, path):
+    """ Swap '<name>_sha256' references in prompt_templates for the stored text, in place. """
+    templates = trace.get("prompt_templates") or {}
+    if not any(name.endswith("_sha256") for name in templates):
+        return trace
+    store = os.path.join(log_root(path), PROMPT_STORE_DIR)
+    resolved = {}
+    for name, value in templates.items():
+        if name.endswith("_sha256"):
+            with open(os.path.join(store, f"{value}.txt"), encoding="utf-8") as f:
+                resolved[name[:-len("_sha256")]] = f.read()
+        else:
+            resolved[name] = value
+    trace["prompt_templates"] = resolved
+    return trace
+
+
+# what a compressed stream raises when it ends early, e.g. a game still being written
+TRUNCATED_ERRORS = (EOFError,) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def read_records(path):
+    """ Records of a JSONL trace. A torn last line (game still running or killed mid-write) is skipped. """
+    return list(_iter_jsonl_records(path))
+
+
+def _iter_jsonl_records(path, start=None, end=None):
+    if start is None and end is None:
+        with open_trace_file(path, "r") as f:
+            try:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    if line.strip():
+                        yield json.loads(line)
+            except TRUNCATED_ERRORS:
+                pass
+        return
+    if trace_suffix(path) != ".jsonl":
+        raise ValueError(f"Byte ranges need an uncompressed JSONL trace, got {path}")
+    start = start or 0
+    with open(path, "rb") as f:
+        if start > 0:
+            # a line belongs to the range its first byte is in
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.readline()
+        pos = f.tell()
+        while end is None or pos < end:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            pos += len(line)
+            if line.strip():
+                yield json.loads(line)
+
+
+def split_byte_ranges(path, n):
+    """ `n` (start, end) byte ranges covering a file, for Tracer.iter_records in parallel workers. """
+    size = os.path.getsize(path)
+    return [(i * size // n, (i + 1) * size // n) for i in range(n)]
+
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+class _JsonStream:
+    """
+    Just enough of an incremental JSON parser to walk a nested trace: the
+    caller steps through objects and arrays and decodes the leaves (actions,
+    configs, scores) whole, so only one leaf is buffered at a time.
+    """
+    CHUNK = 1 << 16
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.f.read(self.CHUNK)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Trace ends early")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in trace, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+                # a number at the end of the buffer may go on in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def keys(self):
+        """ Keys of the object starting here; the caller consumes each value before the next key. """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+    def elements(self):
+        """ One step per element of the array starting here; the caller consumes each element. """
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("]")
+                return
+
+
+def _iter_nested_records(path):
+    with open_trace_file(path, "r") as f:
+        stream = _JsonStream(f)
+        head = {}
+        started = False
+        for key in stream.keys():
+            if key == "missions":
+                yield _start_game_record(head)
+                started = True
+                for _ in stream.elements():
+                    yield from _iter_nested_mission(stream)
+            elif started and key == "prompt_templates":
+                yield {"type": "prompt_templates", "prompt_templates": stream.value()}
+            elif started and key == "outcome":
+                yield {"type": "finish_game", "outcome": stream.value()}
+            else:
+                head[key] = stream.value()
+        if not started:
+            yield _start_game_record(head)
+        if "outcome" in head:
+            yield {"type": "finish_game", "outcome": head["outcome"]}
+
+
+def _start_game_record(head):
+    return {
+        "type": "start_game",
+        "game_id": head.get("game_id"),
+        "started_at": head.get("started_at"),
+        "config": head.get("config", {}),
+        "prompt_templates": head.get("prompt_templates", {}),
+    }
+
+
+def _iter_nested_mission(stream):
+    mission = {}
+    started = payoff_sent = False
+    for key in stream.keys():
+        if key in ("actions", "events"):
+            if not started:
+                yield {"type": "start_mission", "mission_id": mission.get("mission_id"), "payoff_matrix": mission.get("payoff_matrix")}
+                started = True
+                payoff_sent = "payoff_matrix" in mission
+            if key == "actions":
+                for _ in stream.elements():
+                    yield {"type": "log_action", "scope": "mission", **stream.value()}
+            else:
+                for _ in stream.elements():
+                    yield from _iter_nested_event(stream)
+        else:
+            mission[key] = stream.value()
+    if not started:
+        yield {"type": "start_mission", "mission_id": mission.get("mission_id"), "payoff_matrix": mission.get("payoff_matrix")}
+        payoff_sent = True
+    if mission.get("scores") is not None:
+        yield {"type": "record_mission_scores", "scores": mission["scores"]}
+    end = {"type": "end_mission", "llm_summary": mission.get("llm_summary")}
+    if not payoff_sent and "payoff_matrix" in mission:
+        end["payoff_matrix"] = mission["payoff_matrix"]
+    yield end
+
+
+def _iter_nested_event(stream):
+    event = {}
+    started = False
+    for key in stream.keys():
+        if key == "actions":
+            yield {"type": "start_event", "event_id": event.get("event_id"), "card": event.get("card")}
+            started = True
+            for _ in stream.elements():
+                yield {"type": "log_action", "scope": "event", **stream.value()}
+        else:
+            event[key] = stream.value()
+    if not started:
+        yield {"type": "start_event", "event_id": event.get("event_id"), "card": event.get("card")}
+    if "played_cards" in event or "used_attributes" in event:
+        yield {"type": "end_event", "event_id": event.get("event_id"),
+               "played_cards": event.get("played_cards"), "used_attributes": event.get("used_attributes")}
+
+
+def trace_records(trace):
+    """ The records of a nested trace dict already in memory, as Tracer.iter_records would read them from its file. """
+    yield _start_game_record(trace)
+    for mission in trace.get("missions", []):
+        yield {"type": "start_mission", "mission_id": mission["mission_id"], "payoff_matrix": mission.get("payoff_matrix")}
+        for action in mission.get("actions", []):
+            yield {"type": "log_action", "scope": "mission", **action}
+        for event in mission.get("events", []):
+            yield {"type": "start_event", "event_id": event["event_id"], "card": event.get("card")}
+            for action in event.get("actions", []):
+                yield {"type": "log_action", "scope": "event", **action}
+            if "played_cards" in event or "used_attributes" in event:
+                yield {"type": "end_event", "event_id": event["event_id"],
+                       "played_cards": event.get("played_cards"), "used_attributes": event.get("used_attributes")}
+        if mission.get("scores") is not None:
+            yield {"type": "record_mission_scores", "scores": mission["scores"]}
+        yield {"type": "end_mission", "llm_summary": mission.get("llm_summary")}
+    if "outcome" in trace:
+        yield {"type": "finish_game", "outcome": trace["outcome"]}
+
+
+def load_trace(path):
+    """ Nested trace dict from a trace file in any format and compression, with stored prompts filled in. """
+    if ".jsonl" in (trace_suffix(path) or ""):
+        trace = Tracer.from_records(read_records(path))
+    else:
+        with open_trace_file(path, "r") as f:
+            trace = json.load(f)
+    return resolve_prompt_templates(trace, path)
+
+
+def summarize_trace(trace):
+    """ summarize_records of a nested trace dict already in memory. """
+    return summarize_records(trace_records(trace))
+
+
+def summarize_records(records):
+    """
+    The facts analytics need from a game, without the chat, notes and prompts:
+    per mission the roles picked, each player's last nomination, how often
+    each player voted to retreat, and the cumulative scores and their deltas,
+    plus the timing section once the game has finished. Player ids are string
+    keys, as in a loaded trace. Reads `records` (see Tracer.iter_records) in
+    one pass, keeping only the summary.
+    """
+    summary = None
+    missions = []
+    previous = {}
+    calls_by_model = {}
+    mission = None
+    for record in records:
+        kind = record["type"]
+        if kind == "start_game":
+            config = record.get("config", {})
+            players = config.get("players", [])
+            previous = {str(p["player_id"]): 0 for p in players}
+            summary = {
+                "game_id": record.get("game_id"),
+                "started_at": record.get("started_at"),
+                "theme": config.get("theme"),
+                "seed": config.get("seed"),
+                "players": [
+                    {"player_id": p["player_id"], "username": p["username"], "model_name": p.get("model_name")}
+                    for p in players
+                ],
+                "finished": False,
+                "outcome": None,
+                "timing": None,
+                "missions": missions,
+            }
+        elif kind == "start_mission":
+            mission = {
+                "mission_id": record["mission_id"],
+                "roles": {},
+                "nominations": {},
+                "retreat_votes": {},
+                "scores": None,
+                "score_deltas": None,
+            }
+            missions.append(mission)
+        elif kind == "log_action":
+            for call in record.get("llm", ()):
+                calls_by_model.setdefault(call.get("model"), []).append(call)
+            pid = str(record["player_id"])
+            phase, payload = record["phase"], record["payload"]
+            if record["scope"] == "mission":
+                if phase == "select_role":
+                    mission["roles"][pid] = payload.get("role_default_theme")
+            elif phase == "nominate":
+                mission["nominations"][pid] = payload.get("nominated_player_id")
+            elif phase == "vote" and payload.get("vote_choice") == "yes":
+                mission["retreat_votes"][pid] = mission["retreat_votes"].get(pid, 0) + 1
+        elif kind == "record_mission_scores":
+            scores = {str(pid): score for pid, score in record["scores"].items()}
+            mission["scores"] = scores
+            mission["score_deltas"] = {pid: score - previous.get(pid, 0) for pid, score in scores.items()}
+            previous = scores
+        elif kind == "finish_game":
+            summary["finished"] = True
+            summary["outcome"] = record["outcome"]
+            summary["timing"] = _timing(calls_by_model)
+    if summary is None:
+        raise ValueError("Empty trace")
+    return summary
+
+
+def _distribution(values):
+    if not values:
+        return None
+    values = sorted(values)
+    rank = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {
+        "total": sum(values),
+        "mean": sum(values) / len(values),
+        "p50": rank(0.5),
+        "p95": rank(0.95),
+        "max": values[-1],
+    }
+
+
+def _call_totals(calls):
+    errors = {}
+    for call in calls:
+        if call.get("error"):
+            errors[call["error"]] = errors.get(call["error"], 0) + 1
+    wall_ms = [c["wall_ms"] for c in calls if c.get("wall_ms") is not None]
+    completion_tokens = sum(c.get("completion_tokens") or 0 for c in calls)
+    return {
+        "calls": len(calls),
+        "failed_calls": sum(c.get("completion_tokens") is None for c in calls),
+        "retries": sum(c.get("retries", 0) for c in calls),
+        "errors": errors,
+        "wall_ms": _distribution(wall_ms),
+        "queue_ms": _distribution([c["queue_ms"] for c in calls if c.get("queue_ms") is not None]),
+        "prompt_tokens": sum(c.get("prompt_tokens") or 0 for c in calls),
+        "completion_tokens": completion_tokens,
+        "completion_tokens_per_s": 1e3 * completion_tokens / sum(wall_ms) if sum(wall_ms) else None,
+    }
+
+
+def timing_summary(trace):
+    """
+    Per-model and overall totals of the LLM calls recorded on a trace's
+    actions: call, retry and error counts, wall and queue time distributions
+    (ms) and token counts, to see which model a game was waiting on.
+    """
+    by_model = {}
+    for mission in trace.get("missions", []):
+        for action in mission.get("actions", []) + [a for ev in mission.get("events", []) for a in ev.get("actions", [])]:
+            for call in action.get("llm", ()):
+                by_model.setdefault(call.get("model"), []).append(call)
+    return _timing(by_model)
+
+
+def _timing(by_model):
+    return {
+        "models": {model: _call_totals(calls) for model, calls in by_model.items()},
+        "total": _call_totals([c for calls in by_model.values() for c in calls]),
+    }
+
+
+def summary_path(trace_path):
+    return trace_stem(trace_path) + SUMMARY_SUFFIX
+
+
+def write_summary(trace_path, summary):
+    path = summary_path(trace_path)
+    # write then rename, so a reader never sees half a summary
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(summary, f)
+    os.replace(tmp, path)
+
+
+def load_summary(trace_path, fallback=True):
+    """
+    Summary of the game in `trace_path`, read from its sidecar. Without a
+    sidecar (game unfinished, or traced before summaries existed) the full
+    trace is streamed when `fallback` is set, otherwise None is returned.
+    """
+    try:
+        with open(summary_path(trace_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if not fallback:
+            return None
+    return summarize_records(Tracer.iter_records(trace_path))
+
+
+def iter_summaries(log_dir, fallback=True):
+    """ (trace path, summary) for every trace in `log_dir`; see load_summary. """
+    for path in find_traces(log_dir):
+        try:
+            summary = load_summary(path, fallback=fallback)
+        except FileNotFoundError:
+            # removed since it was listed
+            continue
+        if summary is not None:
+            yield path, summary
+
+
+class NullTracer(Tracer):
+    """ Tracer that records nothing, for forked games and rollouts. """
+    def __init__(self, config=None):
+        # skip Tracer.__init__, a fork should not pay for a uuid and a timestamp
+        self.trace = {"config": config or {}, "missions": []}
+        self._current_mission = None
+        self._current_event = None
+        self._trace_save_path = None
+        self._enabled = False
+        self._dedup_prompts = False
+        self._saved_templates = None
+        self._manifest = None
+
+    def start_mission(self, mission_id, payoff_matrix):
+        pass
+
+    def end_mission(self, llm_summary=None):
+        pass
+
+    def start_event(self, event_id, card):
+        pass
+
+    def end_event(self, event_id, played_cards=None, used_attributes=None):
+        pass
+
+    def log_action(self, phase, player_id, payload, llm=None):
+        pass
+
+    def record_mission_scores(self, scores):
+        pass
+
+    def finish_game(self, outcome):
+        pass
+
+    def flush(self):
+        pass
+
+    def save_trace_to_json(self, path=None):
+        return ""
+
+
 def log_action(phase: str):
     """
     after the action is chosen, pull out all non‐private fields
@@ -128,8 +1038,13 @@ def log_action(phase: str):
             
             # Handle both single action and list of actions
             actions = result if isinstance(result, list) else [result]
-            
-            for action in actions:
+            # LLM calls made for this action (and any that failed since the last one) go on its last entry
+            llm_calls = getattr(self, "llm_calls", None)
+            if llm_calls:
+                self.llm_calls = []
+            last = max((i for i, a in enumerate(actions) if a is not None), default=None)
+
+            for i, action in enumerate(actions):
                 if action is None: continue
                 payload = {
                     k: getattr(action, k)
@@ -158,7 +1073,8 @@ def log_action(phase: str):
                 self.tracer.log_action(
                     phase=action_phase,
                     player_id=self.player_id,
-                    payload=payload
+                    payload=payload,
+                    llm=llm_calls if i == last else None,
                 )
             
             return result
@@ -183,9 +1099,8 @@ def pretty_trace_watcher(path, poll_interval=0.5):
         if mtime != last_mtime:
             last_mtime = mtime
             try:
-                with open(path) as f:
-                    current_trace = json.load(f)
-            except json.JSONDecodeError:
+                current_trace = load_trace(path)
+            except (json.JSONDecodeError,) + TRUNCATED_ERRORS:
                 time.sleep(poll_interval)
                 continue
 
@@ -330,19 +1245,195 @@ def print_event_actions(actions, id_to_name):
         else:
             print(f"{player:<10} did phase '{phase}': {json.dumps(payload)}")
 
+#following JSONL traces live, by byte offset instead of re-reading the whole file
+
+
+class _StreamDecoder:
+    """ Incremental gzip/zstd decoding of bytes appended to a file, across concatenated members/frames. """
+    def __init__(self, new_decompressor):
+        self._new = new_decompressor
+        self._d = new_decompressor()
+
+    def decode(self, data):
+        out = []
+        while data:
+            out.append(self._d.decompress(data))
+            if not self._d.eof:
+                break
+            # the writer was reopened in append mode, which starts a new member/frame
+            data = self._d.unused_data
+            self._d = self._new()
+        return b"".join(out)
+
+
+def _stream_decoder(path):
+    if path.endswith(".gz"):
+        return _StreamDecoder(lambda: zlib.decompressobj(zlib.MAX_WBITS | 16))
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Following .zst traces needs the zstandard package (pip install zstandard)")
+        return _StreamDecoder(lambda: zstandard.ZstdDecompressor().decompressobj())
+    return None
+
+
+class TraceFollower:
+    """
+    Reads the records appended to a JSONL trace since the last poll, starting
+    from a byte offset, so following a game costs O(new records) per poll.
+    A record is only returned once its line is complete.
+    """
+    def __init__(self, path):
+        if ".jsonl" not in (trace_suffix(path) or ""):
+            raise ValueError(f"Only JSONL traces can be followed, got {path}")
+        self.path = path
+        self.offset = 0
+        self.done = False
+        self.id_to_name = {}
+        self._pending = b""
+        self._decoder = _stream_decoder(path)
+
+    def poll(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            # the file was replaced, start over
+            self.offset = 0
+            self._pending = b""
+            self._decoder = _stream_decoder(self.path)
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        if self._decoder is not None:
+            data = self._decoder.decode(data)
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        records = [json.loads(line) for line in lines if line.strip()]
+        for record in records:
+            if record["type"] == "start_game":
+                self.id_to_name = {p["player_id"]: p["username"] for p in record["config"].get("players", [])}
+            elif record["type"] == "finish_game":
+                self.done = True
+        return records
+
+
+def print_record(record, id_to_name):
+    """ Print one JSONL trace record the way pretty_trace_watcher prints the nested trace. """
+    kind = record["type"]
+    if kind == "start_game":
+        players = ", ".join(f"{name} ({pid})" for pid, name in id_to_name.items())
+        print(f"Game {record['game_id']} ({record['config'].get('theme')}) with {players}")
+    elif kind == "start_mission":
+        print(f"Starting Mission {record['mission_id']}")
+    elif kind == "start_event":
+        print(f"  Event {record['event_id']} with card {record['card']}")
+    elif kind == "log_action":
+        action = {k: record[k] for k in ("phase", "timestamp", "player_id", "payload")}
+        if record["scope"] == "mission":
+            print_mission_actions([action], id_to_name)
+        else:
+            print_event_actions([action], id_to_name)
+    elif kind == "end_event":
+        if record.get("played_cards") is not None:
+            print(f"    Played cards: {record['played_cards']}")
+        used_attrs = record.get("used_attributes") or {}
+        if used_attrs:
+            coop_used = used_attrs.get('cooperator', {})
+            defect_used = used_attrs.get('defector', {})
+            print(f"    Used attributes - Cooperator: {coop_used}, Defector: {defect_used}")
+    elif kind == "record_mission_scores":
+        print(f"  Scores: {record['scores']}")
+    elif kind == "finish_game":
+        print(f"Game over. Scores: {record['outcome'].get('scores')}")
+
+
+def follow_traces(paths, poll_interval=0.5, recent=60.0, stop_when_done=False):
+    """
+    Follow any number of JSONL games at once. `paths` are trace files or log
+    directories; a directory is rescanned every poll, so new games are picked
+    up as they start, and games already there are followed if they changed in
+    the last `recent` seconds. With several games each line is prefixed with
+    the game's file name.
+    """
+    followers = {}
+    started = time.time()
+
+    def last_changes(log_dir):
+        # finished games are dated by the manifest, only running ones need a stat
+        entries = read_manifest(log_dir)
+        if entries is None:
+            entries = {os.path.relpath(p, log_dir): {"status": "running"} for p in walk_traces(log_dir)}
+        changes = {}
+        for p, entry in entries.items():
+            p = os.path.join(log_dir, p)
+            if entry["status"] == "finished":
+                changes[p] = entry["updated_at"]
+            elif os.path.exists(p):
+                changes[p] = os.path.getmtime(p)
+            else:
+                # not written yet
+                changes[p] = started
+        return changes
+
+    def discover():
+        for path in paths:
+            if not os.path.isdir(path):
+                if path not in followers:
+                    followers[path] = TraceFollower(path)
+                continue
+            for candidate, changed in last_changes(path).items():
+                if candidate in followers or ".jsonl" not in trace_suffix(candidate):
+                    continue
+                followers[candidate] = TraceFollower(candidate) if changed >= started - recent else None
+
+    while True:
+        discover()
+        active = [f for f in followers.values() if f is not None]
+        for follower in active:
+            records = follower.poll()
+            if not records:
+                continue
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                for record in records:
+                    print_record(record, follower.id_to_name)
+            text = out.getvalue()
+            if len(active) > 1:
+                label = os.path.basename(trace_stem(follower.path))
+                text = "".join(f"[{label}] {line}" for line in text.splitlines(keepends=True))
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        if stop_when_done and active and all(f.done for f in active):
+            return
+        time.sleep(poll_interval)
+
+
 if __name__ == "__main__":
     import argparse
-    import glob
-    parser = argparse.ArgumentParser(description="Live pretty-printer for game trace JSON.")
-    parser.add_argument("--path", type=str, default="game_logs", help="Path to the trace JSON file or directory")
+    parser = argparse.ArgumentParser(description="Live pretty-printer for game traces.")
+    parser.add_argument("--path", type=str, nargs="+", default=["game_logs"],
+                        help="Trace files or directories; JSONL games are followed together, new ones as they start")
     parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds")
+    parser.add_argument("--recent", type=float, default=60.0,
+                        help="Also follow JSONL games already in a directory if modified this many seconds ago")
     args = parser.parse_args()
 
-    if os.path.isdir(args.path):
-        time.sleep(2)
-        json_files = glob.glob(os.path.join(args.path, "*.json"))
-        if not json_files:
-            raise FileNotFoundError("No JSON files found in directory after 2 seconds.")
-        args.path = max(json_files, key=os.path.getmtime)
+    def is_jsonl(path):
+        return ".jsonl" in (trace_suffix(path) or "")
 
-    pretty_trace_watcher(args.path, poll_interval=args.interval)
\ No newline at end of file
+    path = args.path[0]
+    if len(args.path) == 1 and not (is_jsonl(path) or os.path.isdir(path) and any(map(is_jsonl, find_traces(path)))):
+        # nested .json traces are rewritten as a whole, watch the newest one
+        if os.path.isdir(path):
+            time.sleep(2)
+            json_files = find_traces(path)
+            if not json_files:
+                raise FileNotFoundError("No JSON files found in directory after 2 seconds.")
+            path = max(json_files, key=os.path.getmtime)
+        pretty_trace_watcher(path, poll_interval=args.interval)
+    else:
+        follow_traces(args.path, poll_interval=args.interval, recent=args.recent)
@@ -31,6 +31,8 @@ from deceptiongame.online_game_manager import GameManager
 from deceptiongame.player_llm import OnlineAI
 from deceptiongame.actions import SelectRoleAction, NoteToSelfAction
 from deceptiongame.state_loader import state_browser, browse_json_files
+from deceptiongame.replay import TraceReplay
+from deceptiongame.tracer import trace_stem
 from openai import AzureOpenAI
 import httpx
 
@@ -102,31 +104,29 @@ async def run_llm_direct_test():
     
     load_action_trace = False
 
-    if load_action_trace:
-        load_action_trace = browse_json_files()
-        replay = True
-        #load_action_trace = "game_logs/20250710-002413-b27cf5.json" # 20250703-100010-115931.json"
-        mission_to_load, event_to_load = state_browser(load_action_trace) # , mission_idx=1, event_idx=0)
-    else:
-        replay = False
-        mission_to_load, event_to_load = None, None
-        
     config = {
         'total_missions': 3,
         'events_per_mission': 5,
         'theme' : theme, 
         "save_trace" : save_trace,
-        'load_action_trace': load_action_trace,
         'debug_mode': True,
         'turn_based_chat': True,
-        'replay_to':(mission_to_load, event_to_load),
         'seed': 42
         
     }
     
     # 3. Instantiate manager and start
-    manager = GameManager(players, **config)
-    manager.start_mission()
+    if load_action_trace:
+        load_action_trace = browse_json_files()
+        #load_action_trace = "game_logs/20250710-002413-b27cf5.json" # 20250703-100010-115931.json"
+        mission_to_load, event_to_load = state_browser(load_action_trace) # , mission_idx=1, event_idx=0)
+        # jump straight to the chosen event, then let the LLM players take over from there
+        replay = TraceReplay.from_file(load_action_trace)
+        replay.seek(mission_to_load, event_to_load)
+        manager = replay.resume(players, save_trace=save_trace, save_path=trace_stem(load_action_trace) + '.new.json')
+    else:
+        manager = GameManager(players, **config)
+        manager.start_mission()
     
     pending = manager.advance_game_to_next_action()
     state   = manager.get_state()
@@ -168,7 +168,7 @@ async def run_llm_direct_test():
         # 5. process each returned action
         for act_list in all_actions:
             for action in act_list:
-                manager.process_player_action(action, replay=replay)
+                manager.process_player_action(action)
 
         # yield so other tasks can run
         await asyncio.sleep(0.1)
@@ -75,7 +75,7 @@ async def run_llm_direct_test():
         state   = manager.get_state()
         for player in players:
             if all([p is not None for p in players]):
-                state['game_over'] = True
+                state = {**state, 'game_over': True}
     ## 6. report scores
     #print("Final cumulative scores:")
     #for pid, score in manager.cumulative_scores.items():
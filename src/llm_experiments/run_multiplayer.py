@@ -4,8 +4,11 @@ sys.stdout.reconfigure(line_buffering=True)
 sys.stderr.reconfigure(line_buffering=True)
 
 from deceptiongame.online_game_manager import GameManager
-from deceptiongame.player_llm import OnlineAI
+from deceptiongame.player_llm import OnlineAI, PROMPT_LAYOUTS, PROMPT_MODES, PROMPT_PROFILES
 from deceptiongame.actions import SelectRoleAction
+from deceptiongame.tracer import trace_stem, timing_summary
+from deceptiongame.client_pool import configure_pool, pool_stats
+from deceptiongame.rate_limit import limiter_stats
 
 # Optional sanity check for HF repos:
 _HF_MODEL_TO_URL = {
@@ -75,6 +78,30 @@ def parse_args():
                    metavar="SPEC",
                    help="IDX:type=hf,url=...,key=...  OR  IDX:type=api,model=...,provider=...")
 
+    # trace storage
+    p.add_argument("--trace_format", type=str, choices=["json", "jsonl"], default="json")
+    p.add_argument("--trace_compression", type=str, choices=["gzip", "zstd", "auto"], default=None)
+    p.add_argument("--dedup_prompts", action="store_true",
+                   help="Store the system prompt once under multiplayer_game_logs/prompts")
+    p.add_argument("--trace_layout", type=str, choices=["sharded", "flat"], default="sharded",
+                   help="sharded: multiplayer_game_logs/<date>/<hex prefix>/, listed in multiplayer_game_logs/manifest.jsonl")
+
+    # HTTP connections, shared by all players on the same endpoint
+    p.add_argument("--max_connections", type=int, default=100)
+    p.add_argument("--keepalive_expiry", type=float, default=30.0,
+                   help="Seconds an idle connection is kept open")
+    p.add_argument("--no_http2", action="store_true",
+                   help="Stay on HTTP/1.1 even where the h2 package is installed")
+
+    # How the players' prompts are built, see player_llm.PROMPT_MODES, PROMPT_LAYOUTS and PROMPT_PROFILES
+    p.add_argument("--prompt_mode", type=str, choices=PROMPT_MODES, default="state",
+                   help="transcript: one chat per mission that only appends what changed since the last turn")
+    p.add_argument("--prompt_layout", type=str, choices=PROMPT_LAYOUTS, default="default")
+    p.add_argument("--prompt_profile", type=str, choices=PROMPT_PROFILES, default="default",
+                   help="compact: one short line per state section, with a legend in the system prompt")
+    p.add_argument("--prompt_budget", type=int, default=None,
+                   help="Max prompt tokens per call; older history is elided to fit (state prompt mode only)")
+
     return p.parse_args()
 
 # ---------- Helpers ---------- #
@@ -102,7 +129,7 @@ def _verify_hf_url(url: str, key: str):
     if expected and expected != model_id:
         raise AssertionError(f"{expected} != {model_id} (url: {url})")
 
-def _build_online_ai(player_desc: dict, theme: str, slot: int) -> OnlineAI:
+def _build_online_ai(player_desc: dict, theme: str, slot: int, **prompt_kwargs) -> OnlineAI:
     if player_desc["type"] == "api":
         creds = _resolve_api_creds(player_desc["provider"], player_desc["model"])
         return OnlineAI(
@@ -113,7 +140,7 @@ def _build_online_ai(player_desc: dict, theme: str, slot: int) -> OnlineAI:
             url=creds["url"], model_name=player_desc["model"],
             api_key=creds["api_key"], provider=player_desc["provider"],
             api_version=creds["api_version"], summarization_level=2,
-            theme_name=theme
+            theme_name=theme, **prompt_kwargs
         )
     else:  # hf
         _verify_hf_url(player_desc["url"], player_desc["key"])
@@ -124,7 +151,7 @@ def _build_online_ai(player_desc: dict, theme: str, slot: int) -> OnlineAI:
             password="", avatar="",
             url=player_desc["url"], model_name=player_desc["key"],
             api_key=None, provider=None, api_version=None,
-            summarization_level=2, theme_name=theme
+            summarization_level=2, theme_name=theme, **prompt_kwargs
         )
 
 def _compute_scores(mgr: GameManager, players: list[OnlineAI]) -> dict:
@@ -140,7 +167,7 @@ def _compute_scores(mgr: GameManager, players: list[OnlineAI]) -> dict:
 
 
 # ---------- Game loop ---------- #
-async def run_game(players: list[OnlineAI], theme: str, out_path: str|None):
+async def run_game(players: list[OnlineAI], theme: str, out_path: str|None, trace_kwargs: dict|None = None):
     game_id = random.randint(0, 1_000_000)
     config = dict(
         total_missions=3,
@@ -151,6 +178,7 @@ async def run_game(players: list[OnlineAI], theme: str, out_path: str|None):
         save_trace=True,
         seed=game_id,
         multiplayer=True,
+        **(trace_kwargs or {}),
     )
     mgr = GameManager(players, **config)
     mgr.start_mission()
@@ -182,9 +210,12 @@ async def run_game(players: list[OnlineAI], theme: str, out_path: str|None):
     rtnof = sum(not m['mission_complete'] and not m['defector_found'] for m in mh)
 
     print(f"[game {game_id}] coop={coop}, def={defe}")
+    calls = timing_summary(mgr.tracer.trace)["total"]
+    print(f"[game {game_id}] llm calls={calls['calls']}, prompt_tokens={calls['prompt_tokens']}, "
+          f"completion_tokens={calls['completion_tokens']}")
 
-    # CSV append (legacy)
-    with open(f'multiplayer_game_logs/llm_game_results_{game_id}.csv','a', newline='') as f:
+    # CSV append (legacy), next to the game's trace rather than one more file in the log root
+    with open(f'{trace_stem(mgr.tracer._trace_save_path)}.results.csv','a', newline='') as f:
         csv.writer(f).writerow(
             ["mixed", theme, len(mh), coop, defe, defl, found, sabnf, rtnof]
         )
@@ -213,9 +244,23 @@ async def main():
                 url = args.vllm_url or f"http://localhost:{args.port}/v1"
                 players_desc = [{"idx":0,"type":"hf","url":url,"key":args.model}]
 
+    configure_pool(max_connections=args.max_connections, keepalive_expiry=args.keepalive_expiry,
+                   http2=not args.no_http2)
     # Build OnlineAI list
-    players = [_build_online_ai(pd, args.theme, slot=i) for i, pd in enumerate(players_desc)]
-    await run_game(players, args.theme, args.out)
+    players = [_build_online_ai(pd, args.theme, slot=i, prompt_mode=args.prompt_mode, prompt_layout=args.prompt_layout,
+                                prompt_profile=args.prompt_profile, prompt_budget=args.prompt_budget)
+               for i, pd in enumerate(players_desc)]
+    trace_kwargs = dict(
+        trace_format=args.trace_format,
+        trace_compression=args.trace_compression,
+        dedup_prompts=args.dedup_prompts,
+        trace_layout=args.trace_layout,
+    )
+    await run_game(players, args.theme, args.out, trace_kwargs)
+    for stats in pool_stats():
+        print(f"[pool] {stats}")
+    for model, stats in limiter_stats().items():
+        print(f"[limits] {model}: {stats}")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Shared by the tests: games of RandomPlayers, played to the end or a round of
+pending actions at a time, and a fake clock for the retry and rate limit tests.
+"""
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+def decide(player, action, context=None):
+    """ `player`'s answer to the pending `action` class; `context` is the state the RandomPlayer sees. """
+    context = context or {}
+    if action is SelectRoleAction:
+        return player.select_role(context)
+    if action is DiscardableCardAction:
+        return player.play_card(context, discardable=True)
+    if action is PlayCardAction:
+        return player.play_card(context)
+    if action is NominatePlayerAction:
+        return player.nominate_player(context)
+    if action is VoteAction:
+        return player.vote(context)
+    return player.participate_in_discussion(context)
+
+
+def new_game(seed, models=(), **game_kwargs):
+    """ A started game of five RandomPlayers, 2 missions of 3 events unless `game_kwargs` say otherwise. """
+    players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+    for player, model in zip(players, models):
+        player.model_name = model
+    game_kwargs = {'total_missions': 2, 'events_per_mission': 3, 'turn_based_chat': True, **game_kwargs}
+    gm = GameManager(players, seed=seed, **game_kwargs)
+    gm.start_mission()
+    return gm
+
+
+def act(gm, pending, overrides=None, context=None):
+    """
+    Answer every pending action, player by player; `overrides` maps (player_id, action class) to a
+    fixed action. Returns how many actions were answered.
+    """
+    n_actions = 0
+    for player in gm.players:
+        for action in pending.get(player.player_id, []):
+            if overrides and (player.player_id, action) in overrides:
+                chosen = overrides[(player.player_id, action)]
+            else:
+                chosen = decide(player, action, context)
+            gm.process_player_action(chosen)
+            n_actions += 1
+    return n_actions
+
+
+def step(gm, overrides=None, context=None):
+    """ Advance a game by one round of pending actions. Returns False once it is over. """
+    if gm.game_over():
+        return False
+    pending = gm.advance_game_to_next_action()
+    if pending == 'quit_game':
+        return False
+    act(gm, pending, overrides, context)
+    return True
+
+
+def play_game(seed, max_actions=None, models=(), context=None, **game_kwargs):
+    """ A traced game, played to the end or until the round in which it reaches `max_actions` actions. """
+    gm = new_game(seed, models, save_trace=True, **game_kwargs)
+    n_actions = 0
+    while not gm.game_over() and (max_actions is None or n_actions < max_actions):
+        pending = gm.advance_game_to_next_action()
+        if pending == 'quit_game':
+            break
+        n_actions += act(gm, pending, context=context)
+    return gm
+
+
+def strip_run_info(trace):
+    """ Drop the fields that differ between two runs of the same seeded game. """
+    trace = {k: v for k, v in trace.items() if k not in ('game_id', 'started_at')}
+    for mission in trace['missions']:
+        for action in mission['actions'] + [a for ev in mission['events'] for a in ev['actions']]:
+            del action['timestamp']
+    return trace
+
+
+class FakeClock:
+    """ time.monotonic and time.sleep stand-in: sleeping only moves the clock on, and is recorded. """
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
@@ -0,0 +1,94 @@
+import io
+import os
+import tempfile
+import unittest
+import functools
+import contextlib
+
+from deceptiongame.catalog import Catalog, main
+
+import helpers
+from helpers import NAMES
+
+# the players nominate by name, so accusations can be matched to them
+play_game = functools.partial(helpers.play_game, context={'available_players': NAMES}, total_missions=3)
+
+
+class TestCatalog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.TemporaryDirectory()
+        os.chdir(cls.tmp.name)
+        cls.games = [play_game(seed, models=['model-a', 'model-b'] * 3) for seed in range(6)]
+        # plus one unfinished game
+        play_game(10, max_actions=40, models=['model-c'] * 5, theme='hospital')
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        self.catalog = Catalog(f'{self.id()}.sqlite')
+
+    def tearDown(self):
+        self.catalog.close()
+
+    def test_ingest_is_idempotent(self):
+        self.assertEqual(self.catalog.ingest(['game_logs'])['added'], 7)
+        self.assertEqual(self.catalog.ingest(['game_logs']), {'added': 0, 'updated': 0, 'skipped': 7, 'failed': 0})
+        # a file that changed since (e.g. a game still running) is re-indexed, without duplicating rows
+        path = self.games[0].tracer._trace_save_path
+        os.utime(path, (1, 1))
+        self.assertEqual(self.catalog.ingest(['game_logs'])['updated'], 1)
+        _, rows = self.catalog.query("SELECT COUNT(*) FROM games")
+        self.assertEqual(rows, [(7,)])
+        _, rows = self.catalog.query("SELECT COUNT(*) FROM mission_players WHERE game_id = ?",
+                                     (self.games[0].tracer.trace['game_id'],))
+        self.assertEqual(rows, [(len(NAMES) * len(self.games[0].mission_history),)])
+
+    def test_accusations_match_the_engine(self):
+        self.catalog.ingest(['game_logs'])
+        for gm in self.games:
+            _, rows = self.catalog.query("SELECT mission_id, accused FROM missions WHERE game_id = ? ORDER BY mission_id",
+                                         (gm.tracer.trace['game_id'],))
+            expected = [
+                "defector" if m['defector_found'] else "cooperator" if m['cooperator_found'] else "none"
+                for m in gm.mission_history
+            ]
+            self.assertEqual([accused for _, accused in rows], expected)
+        _, rows = self.catalog.query("SELECT COUNT(*) FROM missions WHERE accused != 'none'")
+        self.assertGreater(rows[0][0], 0)
+
+    def test_find_missions(self):
+        self.catalog.ingest(['game_logs'])
+        columns, rows = self.catalog.find_missions(model='model-a', role='defector')
+        self.assertTrue(rows)
+        row = dict(zip(columns, rows[0]))
+        self.assertEqual((row['model_name'], row['role']), ('model-a', 'defector'))
+        expected = sum(
+            1 for gm in self.games for m in gm.mission_history for p in m['player_info']
+            if p['role'] == 'defector' and p['name'] in NAMES[::2]
+        )
+        self.assertEqual(len(rows), expected)
+        # the unfinished hospital game is indexed too
+        _, rows = self.catalog.find_missions(theme='hospital')
+        self.assertTrue(rows)
+        _, rows = self.catalog.find_missions(theme='hospital', finished=True)
+        self.assertEqual(rows, [])
+
+    def test_cli(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(['--db', 'cli.sqlite', 'ingest', 'game_logs'])
+            main(['--db', 'cli.sqlite', 'query', '--sql', 'SELECT COUNT(*) AS n FROM games'])
+            main(['--db', 'cli.sqlite', 'query', '--model', 'model-b', '--accused', 'none'])
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], '7 added, 0 updated, 0 skipped, 0 failed')
+        self.assertEqual(lines[1:3], ['n', '7'])
+        self.assertTrue(lines[3].startswith('game_id\tmission_id'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+
+from deceptiongame import client_pool, retry
+from deceptiongame.client_pool import close_clients, configure_pool, pool_stats, shared_client
+from deceptiongame.inference_utils import CallStats, call_chat_completion_vllm
+from deceptiongame.player_llm import OnlineAI
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """ Minimal OpenAI-compatible /chat/completions endpoint. """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({
+            "id": "x", "object": "chat.completion", "created": 0, "model": "m",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "hello"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """ Answers every request with a 503 and counts them in server.hits. """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.hits += 1
+        body = b'{"error": {"message": "unavailable"}}'
+        self.send_response(503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestClientPool(unittest.TestCase):
+    def setUp(self):
+        close_clients()
+        self.config = client_pool._config
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CompletionHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def tearDown(self):
+        close_clients()
+        client_pool._config = self.config
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_players_share_a_client_per_endpoint(self):
+        players = [OnlineAI(i, f"p{i}", model_name="llama-3.3", url=self.url) for i in range(5)]
+        other = OnlineAI(5, "p5", model_name="llama-3.3", url=self.url + "/")
+        self.assertEqual(len({id(p.client) for p in players}), 1)
+        self.assertIsNot(other.client, players[0].client)
+        self.assertEqual(sorted(s["users"] for s in pool_stats()), [1, 5])
+
+    def test_connections_are_reused(self):
+        configure_pool(max_connections=2)
+        client = shared_client("vllm", self.url, "test-dummy")
+        msg = [{"role": "user", "content": "hi"}]
+        for _ in range(3):
+            self.assertEqual(call_chat_completion_vllm(client, "m", msg, 1.0), "hello")
+        [stats] = pool_stats()
+        self.assertEqual((stats["requests"], stats["in_flight"], stats["max_connections"]), (3, 0, 2))
+        self.assertEqual((stats["connections"], stats["idle_connections"]), (1, 1))
+
+        with ThreadPoolExecutor(6) as pool:
+            answers = list(pool.map(lambda _: call_chat_completion_vllm(client, "m", msg, 1.0), range(12)))
+        self.assertEqual(answers, ["hello"] * 12)
+        [stats] = pool_stats()
+        # a connection the server resets under load costs a retried request
+        self.assertGreaterEqual(stats["requests"], 15)
+        self.assertLessEqual(stats["connections"], 2)
+        self.assertLessEqual(stats["peak_in_flight"], 6)
+        self.assertEqual(stats["utilization"], 0)
+
+    def test_one_request_per_policy_attempt(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), UnavailableHandler)
+        server.hits = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/v1"
+        try:
+            client = shared_client("vllm", url, "test-dummy")
+            stats = CallStats("m")
+            with self.assertRaises(openai.InternalServerError):
+                call_chat_completion_vllm(client, "m", [{"role": "user", "content": "hi"}], 1.0, max_retries=2, stats=stats)
+            # the SDK doesn't retry underneath the policy
+            self.assertEqual((server.hits, stats.retries), (2, 2))
+        finally:
+            retry._breakers.pop(str(client.base_url), None)
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import functools
+
+from deceptiongame.online_game_manager import Phase
+from deceptiongame.actions import VoteAction
+from deceptiongame.players import RandomPlayer
+from deceptiongame.tracer import NullTracer
+
+import helpers
+from helpers import NAMES, act, step
+
+new_game = functools.partial(helpers.new_game, total_missions=3, events_per_mission=4)
+
+
+def play_out(gm, overrides=None):
+    while step(gm, overrides):
+        pass
+    return gm.cumulative_scores, [m['mission_complete'] for m in gm.mission_history]
+
+
+def advance_to_vote(gm):
+    """ Play until the first retreat vote is pending. """
+    while True:
+        pending = gm.advance_game_to_next_action()
+        if gm.phase is Phase.VOTE:
+            return
+        act(gm, pending)
+
+
+class TestFork(unittest.TestCase):
+    def test_forks_leave_parent_untouched(self):
+        expected = play_out(new_game(5))
+
+        gm = new_game(5)
+        advance_to_vote(gm)
+        n_trace_missions = len(gm.tracer.trace['missions'])
+        for _ in range(10):
+            play_out(gm.fork())
+        self.assertEqual(len(gm.tracer.trace['missions']), n_trace_missions)
+        self.assertEqual(play_out(gm), expected)
+
+    def test_fork_is_reproducible(self):
+        gm = new_game(8)
+        advance_to_vote(gm)
+        a, b = gm.fork(seed=1), gm.fork(seed=1)
+        self.assertIsInstance(a.tracer, NullTracer)
+        self.assertIsNot(a.players[0], gm.players[0])
+        self.assertEqual(play_out(a), play_out(b))
+
+    def test_counterfactual_vote(self):
+        gm = new_game(2)
+        advance_to_vote(gm)
+        retreat = {(p.player_id, VoteAction): VoteAction(p.player_id, 'yes') for p in gm.players}
+        stay = {(p.player_id, VoteAction): VoteAction(p.player_id, 'no') for p in gm.players}
+        retreated, stayed = gm.fork(), gm.fork()
+        for fork, votes in ((retreated, retreat), (stayed, stay)):
+            step(fork, votes)
+            fork.advance_game_to_next_action()
+        # a unanimous retreat ends the mission, staying moves on to the next event
+        self.assertIs(retreated.phase, Phase.PRE_NOMINATION_CHAT)
+        self.assertIs(stayed.phase, Phase.PLAY_CARD)
+        self.assertEqual(gm.mission.mission_event_idx, stayed.mission.mission_event_idx - 1)
+
+    def test_stand_in_players_take_over_state(self):
+        gm = new_game(4)
+        advance_to_vote(gm)
+        stand_ins = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+        fork = gm.fork(players=stand_ins)
+        self.assertIs(fork.players[2], stand_ins[2])
+        self.assertEqual([p.role for p in fork.players], [p.role for p in gm.players])
+        play_out(fork)
+        self.assertTrue(fork.game_over() or fork.pending_actions == 'quit_game')
+        self.assertIs(gm.phase, Phase.VOTE)
+
+
+if __name__ == '__main__':
+    unittest.main()
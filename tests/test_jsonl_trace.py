@@ -0,0 +1,134 @@
+import os
+import time
+import tempfile
+import unittest
+import functools
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.players import RandomPlayer
+from deceptiongame.replay import TraceReplay
+from deceptiongame.tracer import JsonlTracer, TraceWriter, load_trace, read_records, trace_writer_stats
+
+import helpers
+from helpers import NAMES, strip_run_info
+
+play_game = functools.partial(helpers.play_game, total_missions=3, events_per_mission=4)
+
+
+class TestJsonlTrace(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_loader_matches_json_layout(self):
+        for seed in (1, 7):
+            json_game = play_game(seed, trace_format='json')
+            jsonl_game = play_game(seed, trace_format='jsonl')
+            self.assertIsInstance(jsonl_game.tracer, JsonlTracer)
+            self.assertTrue(jsonl_game.tracer._trace_save_path.endswith('.jsonl'))
+            from_json = load_trace(json_game.tracer._trace_save_path)
+            from_jsonl = load_trace(jsonl_game.tracer._trace_save_path)
+            self.assertIn('outcome', from_jsonl)
+            self.assertEqual(strip_run_info(from_jsonl), strip_run_info(from_json))
+            # the materialized trace is what the live tracer held in memory
+            self.assertEqual(from_jsonl['game_id'], jsonl_game.tracer.trace['game_id'])
+
+    def test_one_record_per_step(self):
+        gm = play_game(3, trace_format='jsonl')
+        records = read_records(gm.tracer._trace_save_path)
+        self.assertEqual(records[0]['type'], 'start_game')
+        self.assertEqual(records[-1]['type'], 'finish_game')
+        n_actions = sum(len(m['actions']) + sum(len(ev['actions']) for ev in m['events'])
+                        for m in gm.tracer.trace['missions'])
+        self.assertEqual(sum(r['type'] == 'log_action' for r in records), n_actions)
+
+    def test_torn_last_line_is_ignored(self):
+        gm = play_game(5, trace_format='jsonl')
+        path = gm.tracer._trace_save_path
+        with open(path) as f:
+            lines = f.readlines()
+        # cut the file in the middle of the last action of the first event
+        cut = next(i for i, line in enumerate(lines) if '"end_event"' in line) - 1
+        with open(path, 'w') as f:
+            f.writelines(lines[:cut])
+            f.write(lines[cut][:20])
+        trace = load_trace(path)
+        self.assertNotIn('outcome', trace)
+        self.assertEqual(len(trace['missions']), 1)
+        self.assertNotIn('played_cards', trace['missions'][0]['events'][0])
+
+    def test_replay_reads_jsonl(self):
+        gm = play_game(2, trace_format='jsonl')
+        replay = TraceReplay.from_file(gm.tracer._trace_save_path)
+        self.assertEqual(replay.seek_to(len(replay)).cumulative_scores, gm.cumulative_scores)
+
+    def test_trace_options_need_jsonl(self):
+        players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+        with self.assertRaises(ValueError):
+            GameManager(players, total_missions=1, save_trace=True, trace_format='json',
+                        trace_options={'background': False})
+
+
+class TestTraceWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'trace.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_close_drains_queue(self):
+        writer = TraceWriter(self.path, max_queue=4, flush_every=1000, flush_interval_ms=60000)
+        lines = [f'{{"n": {i}}}\n' for i in range(500)]
+        for line in lines:
+            writer.write(line)
+        self.assertEqual(trace_writer_stats()['open_writers'], 1)
+        writer.close()
+        self.assertEqual(self.read(), ''.join(lines))
+        stats = writer.stats()
+        self.assertEqual(stats['records_written'], 500)
+        self.assertEqual(stats['bytes_written'], len(''.join(lines)))
+        self.assertEqual(stats['fsyncs'], 1)
+        self.assertLessEqual(stats['max_queue_depth'], 4)
+        self.assertEqual(trace_writer_stats()['open_writers'], 0)
+        with self.assertRaises(ValueError):
+            writer.write('{}\n')
+
+    def test_flush_every_n_records_or_t_ms(self):
+        writer = TraceWriter(self.path, flush_every=3, flush_interval_ms=50, fsync='never')
+        for _ in range(3):
+            writer.write('{}\n')
+        # a lone record is flushed once the interval has passed, without waiting for close
+        writer.write('{"last": 1}\n')
+        deadline = time.monotonic() + 5
+        while '"last"' not in self.read() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIn('"last"', self.read())
+        self.assertEqual(writer.stats()['flushes'], 2)
+        writer.close()
+        self.assertEqual(writer.stats()['fsyncs'], 0)
+
+    def test_synchronous_writer(self):
+        writer = TraceWriter(self.path, background=False, fsync='flush')
+        writer.write('{}\n')
+        writer.flush()
+        self.assertEqual(self.read(), '{}\n')
+        self.assertEqual(writer.stats()['fsyncs'], 1)
+        writer.close()
+
+    def test_unknown_fsync_policy(self):
+        with self.assertRaises(ValueError):
+            TraceWriter(self.path, fsync='sometimes')
+
+
+if __name__ == '__main__':
+    unittest.main()
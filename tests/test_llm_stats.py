@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import random
+import asyncio
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.player_llm import OnlineAI
+from deceptiongame.inference_utils import CallStats, call_chat_completion_vllm
+from deceptiongame.tracer import Tracer, load_trace, load_summary, timing_summary
+from deceptiongame.retry import POLICIES, RetryPolicy
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+class FakeCompletions:
+    """ Stands in for an OpenAI client's chat.completions: answers guided_json with random valid choices. """
+    def __init__(self, seed, usage=True, fail_every=0, delay=0):
+        self.rng = random.Random(seed)
+        self.usage = usage
+        self.fail_every = fail_every
+        self.delay = delay
+        self.n_calls = 0
+
+    def create(self, model, messages, temperature, extra_body=None, timeout=None):
+        self.n_calls += 1
+        time.sleep(self.delay)
+        if self.fail_every and self.n_calls % self.fail_every == 0:
+            raise ConnectionError("connection reset")
+        properties = extra_body["guided_json"]["properties"] if extra_body else {}
+        answer = {name: self.rng.choice(p.get("enum") or [p.get("const", "ok")]) for name, p in properties.items()}
+        content = json.dumps(answer) if extra_body else "summary"
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=20) if self.usage else None
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+def new_game(fail_every=0, usage=True, delay=0):
+    players = []
+    for i, name in enumerate(NAMES):
+        player = OnlineAI(i, name, model_name="llama-3.3" if i % 2 else "qwen-3", url="http://localhost:1/v1")
+        player.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(i, usage, fail_every, delay)))
+        players.append(player)
+    gm = GameManager(players, total_missions=2, events_per_mission=2, turn_based_chat=True,
+                     save_trace=True, seed=0, trace_format='jsonl', trace_options={'background': False})
+    gm.start_mission()
+    return gm
+
+
+def play_game(fail_every=0, usage=True):
+    gm = new_game(fail_every, usage)
+    players = gm.players
+    pending = gm.advance_game_to_next_action()
+    while not gm.game_over():
+        state = gm.get_state()
+        for pid, actions in pending.items():
+            for action in asyncio.run(players[pid].perform_action(actions, state)):
+                gm.process_player_action(action)
+        pending = gm.advance_game_to_next_action()
+    return gm
+
+
+def logged_actions(trace):
+    for mission in trace["missions"]:
+        yield from mission["actions"]
+        for event in mission["events"]:
+            yield from event["actions"]
+
+
+class TestLlmCallStats(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        # retry at once
+        self.policies = mock.patch.dict(POLICIES, vllm=RetryPolicy(max_attempts=10, base_delay=0))
+        self.policies.start()
+
+    def tearDown(self):
+        self.policies.stop()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_calls_are_attached_to_actions(self):
+        gm = play_game(fail_every=5)
+        trace = load_trace(gm.tracer._trace_save_path)
+        n_calls = sum(p.client.chat.completions.n_calls for p in gm.players)
+        with_calls = [a for a in logged_actions(trace) if "llm" in a]
+        # one call per decision, on the decision rather than the note that came with it
+        self.assertTrue(all(a["phase"] != "note_to_self" for a in with_calls))
+        calls = [c for a in with_calls for c in a["llm"]]
+        self.assertEqual(sum(1 + c["retries"] for c in calls), n_calls)
+        retried = [c for c in calls if c["retries"]]
+        self.assertTrue(retried)
+        self.assertEqual({c["error"] for c in retried}, {"ConnectionError"})
+        for call in calls:
+            self.assertEqual((call["prompt_tokens"], call["completion_tokens"], call["tokens_from"]), (1000, 20, "usage"))
+            self.assertGreaterEqual(call["wall_ms"], 0)
+            self.assertGreaterEqual(call["queue_ms"], 0)
+        # replayed actions don't see the stats
+        self.assertTrue(all("model" not in a["payload"] for a in with_calls))
+
+        timing = trace["timing"]
+        self.assertEqual(timing, timing_summary(trace))
+        self.assertEqual(load_summary(gm.tracer._trace_save_path, fallback=False)["timing"], timing)
+        self.assertEqual(set(timing["models"]), {"Qwen/Qwen3-32B", "meta-llama/Llama-3.3-70B-Instruct"})
+        self.assertEqual(timing["total"]["calls"], len(calls))
+        self.assertEqual(timing["total"]["retries"], len(retried))
+        self.assertEqual(timing["total"]["errors"], {"ConnectionError": len(retried)})
+        self.assertEqual(timing["total"]["completion_tokens"], 20 * len(calls))
+        self.assertEqual(sum(m["calls"] for m in timing["models"].values()), len(calls))
+
+    def test_tokens_are_estimated_without_usage(self):
+        gm = play_game(usage=False)
+        calls = [c for a in logged_actions(load_trace(gm.tracer._trace_save_path)) for c in a.get("llm", ())]
+        self.assertTrue(calls)
+        for call in calls:
+            self.assertEqual(call["tokens_from"], "estimate")
+            self.assertGreater(call["prompt_tokens"], 100)
+
+    def test_failed_call(self):
+        client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(0, fail_every=1)))
+        stats = CallStats("m")
+        with self.assertRaises(ConnectionError):
+            call_chat_completion_vllm(client, "m", [{"role": "user", "content": "hi"}], 1.0, max_retries=3, stats=stats)
+        self.assertEqual((stats.retries, stats.error, stats.completion_tokens), (3, "ConnectionError", None))
+        self.assertIsNotNone(stats.wall_ms)
+
+
+class TestConcurrentPlayers(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    async def act_together(self, gm, pending):
+        state = gm.get_state()
+        results = await asyncio.gather(*(gm.players[pid].perform_action(actions, state) for pid, actions in pending.items()))
+        for actions in results:
+            for action in actions:
+                gm.process_player_action(action)
+
+    def test_simultaneous_phase_overlaps(self):
+        delay = 0.1
+        gm = new_game(delay=delay)
+        pending = gm.advance_game_to_next_action()
+        self.assertEqual(len(pending), len(NAMES))
+        start = time.perf_counter()
+        asyncio.run(self.act_together(gm, pending))
+        elapsed = time.perf_counter() - start
+        gm.tracer.close()
+
+        calls_per_player = {p.client.chat.completions.n_calls for p in gm.players}
+        self.assertEqual(len(calls_per_player), 1)
+        one_player = calls_per_player.pop() * delay
+        # the players' calls overlap: about one player's latency, not the sum over all five
+        self.assertLess(elapsed, 2 * one_player)
+        roles = [a for a in load_trace(gm.tracer._trace_save_path)["missions"][0]["actions"] if a["phase"] == "select_role"]
+        self.assertEqual(sorted(a["player_id"] for a in roles), list(range(len(NAMES))))
+
+    def test_trace_is_saved_while_players_log(self):
+        tracer = Tracer({}, {}, save_path="trace.json", save_trace=True)
+        tracer.start_mission(1, {})
+        tracer.start_event(1, "card")
+
+        def log(pid):
+            for i in range(300):
+                tracer.log_action("play_card", pid, {"card": "a", "i": i})
+
+        threads = [threading.Thread(target=log, args=(pid,)) for pid in range(4)]
+        for thread in threads:
+            thread.start()
+        # what the server's loop does between the players' actions
+        for event_id in range(2, 12):
+            json.loads(tracer.save_trace_to_json())
+            tracer.end_event(event_id - 1)
+            tracer.start_event(event_id, "card")
+            tracer.flush()
+        for thread in threads:
+            thread.join()
+        tracer.flush()
+        events = load_trace("trace.json")["missions"][0]["events"]
+        self.assertEqual(sum(len(e["actions"]) for e in events), 4 * 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
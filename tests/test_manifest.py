@@ -0,0 +1,98 @@
+import os
+import json
+import tempfile
+import unittest
+import functools
+
+from deceptiongame.manifest import MANIFEST_NAME, log_root, read_manifest, rebuild_manifest
+from deceptiongame.tracer import Tracer, PROMPT_STORE_DIR, find_traces, iter_summaries, load_trace
+from deceptiongame.catalog import Catalog
+
+import helpers
+from helpers import NAMES
+
+play_game = functools.partial(helpers.play_game, models=[f'model-{i % 2}' for i in range(len(NAMES))],
+                              theme='hospital')
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_sharded_games_are_listed(self):
+        games = [play_game(1), play_game(2, trace_format='jsonl', trace_compression='gzip'), play_game(3, max_actions=20)]
+        paths = [gm.tracer._trace_save_path for gm in games]
+        for path in paths:
+            date, prefix, name = os.path.relpath(path, 'game_logs').split(os.sep)
+            self.assertEqual((date, prefix), (name[:8], name[16:18]))
+            self.assertEqual(log_root(path), 'game_logs')
+        self.assertEqual(find_traces('game_logs'), paths)
+
+        entries = read_manifest('game_logs')
+        self.assertEqual([e['status'] for e in entries.values()], ['finished', 'finished', 'running'])
+        for gm, path, entry in zip(games, paths, entries.values()):
+            self.assertEqual(entry['game_id'], gm.tracer.trace['game_id'])
+            self.assertEqual(entry['theme'], 'hospital')
+            self.assertEqual(entry['models'], ['model-0', 'model-1'] * 2 + ['model-0'])
+        for path, entry in list(zip(paths, entries.values()))[:2]:
+            self.assertEqual(entry['bytes'], os.path.getsize(path))
+        # one line when the game starts, one when it finishes
+        with open(os.path.join('game_logs', MANIFEST_NAME)) as f:
+            self.assertEqual([json.loads(line)['status'] for line in f], ['running', 'finished'] * 2 + ['running'])
+
+    def test_prompt_store_stays_at_the_root(self):
+        path = os.path.join('game_logs', '20250710', 'b2', '20250710-002413-b27cf5-default.json')
+        os.makedirs(os.path.dirname(path))
+        tracer = Tracer({'players': []}, {'system_prompt': 'rules'}, path, True, dedup_prompts=True, manifest='game_logs')
+        tracer.start_mission(1, {})
+        tracer.flush()
+        digest = tracer._saved_templates['system_prompt_sha256']
+        self.assertEqual(os.listdir(os.path.join('game_logs', PROMPT_STORE_DIR)), [f'{digest}.txt'])
+        self.assertEqual(load_trace(path)['prompt_templates'], {'system_prompt': 'rules'})
+        self.assertEqual(find_traces('game_logs'), [path])
+
+    def test_existing_logs_are_indexed(self):
+        old = [play_game(seed, trace_layout='flat').tracer._trace_save_path for seed in (5, 6)]
+        os.remove(os.path.join('game_logs', MANIFEST_NAME))
+        # without a manifest the directory is walked
+        self.assertEqual(find_traces('game_logs'), sorted(old))
+        # the next game indexes what is there before listing itself
+        new = play_game(7).tracer._trace_save_path
+        self.assertEqual(find_traces('game_logs'), sorted(old) + [new])
+        self.assertEqual(rebuild_manifest('game_logs'), 3)
+        self.assertEqual(sorted(find_traces('game_logs')), sorted(old + [new]))
+        self.assertTrue(all(e['status'] == 'finished' for e in read_manifest('game_logs').values()))
+
+    def test_other_json_files_are_not_traces(self):
+        flat = play_game(8, trace_layout='flat').tracer._trace_save_path
+        sharded = play_game(9).tracer._trace_save_path
+        os.remove(os.path.join('game_logs', MANIFEST_NAME))
+        for path in ('notes.json', os.path.join('themes', 'default.json'), os.path.join('20250710', 'b2', 'theme.json'),
+                     os.path.join('20250710', 'themes', '20250710-002413-b27cf5-default.json')):
+            path = os.path.join('game_logs', path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump({'terms': {}}, f)
+        self.assertEqual(find_traces('game_logs'), [flat, sharded])
+        self.assertEqual([path for path, _ in iter_summaries('game_logs')], [flat, sharded])
+        # the working directory itself holds no traces
+        self.assertEqual(list(iter_summaries('.')), [])
+
+    def test_removed_games_are_left_out(self):
+        kept, removed = [play_game(seed).tracer._trace_save_path for seed in (10, 11)]
+        os.remove(removed)
+        self.assertEqual(find_traces('game_logs'), [kept])
+        self.assertEqual([path for path, _ in iter_summaries('game_logs')], [kept])
+        with Catalog('catalog.db') as catalog:
+            self.assertEqual(catalog.ingest(['game_logs']), {'added': 1, 'updated': 0, 'skipped': 0, 'failed': 0})
+            self.assertEqual(catalog.ingest_file(removed), 'failed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+from deceptiongame.online_game_manager import GameManager, Phase
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    DiscussionAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+def act(player, action):
+    if action is SelectRoleAction:
+        return player.select_role({})
+    if action is DiscardableCardAction:
+        return player.play_card({}, discardable=True)
+    if action is PlayCardAction:
+        return player.play_card({})
+    if action is NominatePlayerAction:
+        return player.nominate_player({})
+    if action is VoteAction:
+        return player.vote({})
+    return player.participate_in_discussion({})
+
+
+class TestPhases(unittest.TestCase):
+    def setUp(self):
+        players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+        self.gm = GameManager(players, total_missions=2, events_per_mission=3, turn_based_chat=True, seed=3)
+        self.gm.start_mission()
+
+    def test_polling_is_idempotent(self):
+        # the server polls /get_next_action without anyone acting in between
+        gm = self.gm
+        for _ in range(200):
+            pending = gm.advance_game_to_next_action()
+            if gm.game_over() or pending == 'quit_game':
+                break
+            phase = gm.phase
+            self.assertEqual(gm.advance_game_to_next_action(), pending)
+            self.assertIs(gm.phase, phase)
+            for player in gm.players:
+                for action in pending.get(player.player_id, []):
+                    gm.process_player_action(act(player, action))
+
+    def test_phase_order(self):
+        gm = self.gm
+        seen = []
+        while not gm.game_over():
+            pending = gm.advance_game_to_next_action()
+            if pending == 'quit_game':
+                break
+            if not seen or seen[-1] is not gm.phase:
+                seen.append(gm.phase)
+            for player in gm.players:
+                for action in pending.get(player.player_id, []):
+                    gm.process_player_action(act(player, action))
+        self.assertIs(seen[0], Phase.SELECT_ROLE)
+        self.assertIs(gm.phase, Phase.GAME_OVER)
+        # every event is followed by its chat, and only the mission end asks for nominations
+        for before, after in zip(seen, seen[1:]):
+            if after is Phase.POST_EVENT_CHAT:
+                self.assertIs(before, Phase.PLAY_CARD)
+            if after is Phase.NOMINATE:
+                self.assertIs(before, Phase.PRE_NOMINATION_CHAT)
+        self.assertEqual(seen.count(Phase.NOMINATE), 2)
+
+    def test_out_of_turn_chat_is_rejected(self):
+        gm = self.gm
+        while gm.phase is not Phase.POST_EVENT_CHAT:
+            pending = gm.advance_game_to_next_action()
+            for player in gm.players:
+                for action in pending.get(player.player_id, []):
+                    gm.process_player_action(act(player, action))
+        pending = gm.advance_game_to_next_action()
+        (speaker,) = pending
+        other = next(p for p in gm.players if p.player_id != speaker)
+        with self.assertRaises(ValueError):
+            gm.process_player_action(DiscussionAction(other.player_id, "not my turn"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import os
+import json
+import random
+import asyncio
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from deceptiongame.inference_utils import count_tokens
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.player_llm import OnlineAI
+from deceptiongame.tracer import trace_records
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+class RecordingCompletions:
+    """ Answers guided_json with random valid choices and keeps every prompt it was sent. """
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.prompts = []
+
+    def create(self, model, messages, temperature, extra_body=None, timeout=None):
+        self.prompts.append(json.dumps(messages))
+        properties = extra_body["guided_json"]["properties"] if extra_body else {}
+        answer = {name: self.rng.choice(p.get("enum") or [p.get("const", f"line one\nline {self.rng.random()}")])
+                  for name, p in properties.items()}
+        content = json.dumps(answer) if extra_body else f"summary {self.rng.random()}\nof the mission"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def play_game(cache_prompts, seed=0, save_trace=False, **kwargs):
+    players = []
+    for i, name in enumerate(NAMES):
+        player = OnlineAI(i, name, model_name="llama-3.3", url="http://localhost:1/v1",
+                          summarization_level=2 if i % 2 else 0, **kwargs)
+        player.cache_prompts = cache_prompts
+        player.client = SimpleNamespace(chat=SimpleNamespace(completions=RecordingCompletions(i)))
+        players.append(player)
+    gm = GameManager(players, total_missions=3, events_per_mission=2, turn_based_chat=True, seed=seed,
+                     save_trace=save_trace)
+    gm.start_mission()
+    pending = gm.advance_game_to_next_action()
+    while not gm.game_over():
+        state = gm.get_state()
+        for pid, actions in pending.items():
+            for action in asyncio.run(players[pid].perform_action(actions, state)):
+                gm.process_player_action(action)
+        pending = gm.advance_game_to_next_action()
+    return gm
+
+
+class GameTestCase(unittest.TestCase):
+    """ Runs each test in a temporary directory, the games write their logs to the working directory. """
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+
+class TestPromptCache(GameTestCase):
+    def test_prompts_are_unchanged(self):
+        for seed in (0, 1):
+            cached, rendered = play_game(True, seed), play_game(False, seed)
+            for a, b in zip(cached.players, rendered.players):
+                prompts = a.client.chat.completions.prompts
+                self.assertGreater(len(prompts), 20)
+                self.assertEqual(prompts, b.client.chat.completions.prompts)
+            # the summarizing players saw prior missions and a history cut at their summaries
+            self.assertTrue(any('Here is the summary (you wrote)' in p for p in cached.players[1].client.chat.completions.prompts))
+
+    def test_forked_players_render_their_own_game(self):
+        gm = play_game(True)
+        player = gm.players[0]
+
+        def render(p, state, cache_prompts=True):
+            p.cache_prompts = cache_prompts
+            p.rng = random.Random(1)
+            return p._build_game_state_prompt(state, is_summary=False)
+
+        prompt = render(player, gm.get_state())
+        fork = gm.fork()
+        clone = fork.players[0]
+        fork.full_action_history.pop()
+        fork._touch()
+        forked_prompt = render(clone, fork.get_state())
+        self.assertNotEqual(forked_prompt, prompt)
+        self.assertEqual(forked_prompt, render(clone, fork.get_state(), cache_prompts=False))
+        self.assertEqual(render(player, gm.get_state()), prompt)
+
+
+class TestPrefixLayout(GameTestCase):
+    def test_stable_sections_come_first(self):
+        def user_messages(cache_prompts):
+            gm = play_game(cache_prompts, prompt_layout='prefix')
+            return [json.loads(p)[1]["content"] for p in gm.players[0].client.chat.completions.prompts]
+
+        prompts = user_messages(True)
+        self.assertEqual(prompts, user_messages(False))
+        tables = {}
+        for prompt in prompts:
+            order = [prompt.index(marker) for marker in ('Reward Structure: ', 'action history', '"mission info"',
+                                                          'Description of other players: ', 'Private Info: ')
+                     if marker in prompt]
+            self.assertEqual(order, sorted(order))
+            mission = json.loads(prompt[prompt.index('{"mission info"'):].split('\n', 1)[0])["mission info"]["current mission"]
+            table = prompt[prompt.index('Description of other players: '):prompt.index('Private Info: ')]
+            names = [line.split('"')[3] for line in table.splitlines() if '"player"' in line]
+            # the table keeps its order for the whole mission
+            self.assertEqual(tables.setdefault(mission, names), names)
+        self.assertEqual(len(tables), 3)
+
+    def test_unknown_layout(self):
+        with self.assertRaises(ValueError):
+            OnlineAI(0, "Alice", model_name="llama-3.3", url="http://localhost:1/v1", prompt_layout="suffix")
+
+
+class TestTranscript(GameTestCase):
+    def test_calls_append_to_the_mission_chat(self):
+        gm = play_game(True, prompt_mode='transcript')
+        for player in gm.players[:2]:
+            calls = [json.loads(p) for p in player.client.chat.completions.prompts]
+            n_chats = 1
+            for previous, msg in zip(calls, calls[1:]):
+                if len(msg) == 2:
+                    # a new mission starts from the state
+                    n_chats += 1
+                    self.assertIn("here is the current state", msg[1]["content"])
+                    continue
+                # the previous turn without its instructions, and the answer to it
+                self.assertEqual(msg[:len(previous) - 1], previous[:-1])
+                self.assertTrue(previous[-1]["content"].startswith(msg[len(previous) - 1]["content"]))
+                self.assertEqual(msg[len(previous)]["role"], "assistant")
+                self.assertTrue(msg[-1]["content"].startswith(f"{player.username}, since your last turn:"))
+            self.assertEqual(n_chats, 3)
+        # the summary goes to the mission's chat, and the next mission starts with it
+        summarizer = gm.players[1]
+        calls = [json.loads(p) for p in summarizer.client.chat.completions.prompts]
+        self.assertEqual(len(summarizer.mission_summarizations), 2)
+        first_turns = [msg[1]["content"] for msg in calls if len(msg) == 2][1:]
+        for summary, turn in zip(summarizer.mission_summarizations, first_turns):
+            self.assertIn(json.dumps(summary)[1:-1], turn)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            OnlineAI(0, "Alice", model_name="llama-3.3", url="http://localhost:1/v1", prompt_mode="chat")
+
+
+class TestCompactProfile(GameTestCase):
+    def test_state_sections_are_one_line_each(self):
+        def calls(cache_prompts):
+            gm = play_game(cache_prompts, prompt_profile='compact')
+            return [json.loads(p) for p in gm.players[1].client.chat.completions.prompts]
+
+        msgs = calls(True)
+        self.assertEqual(msgs, calls(False))
+        self.assertIn("# Game state format", msgs[0][0]["content"])
+        last = msgs[-1][1]["content"]
+        for prefix in ("PRIOR:", "M 3/3: ", "P: ", "R coop: def_acc +", "EV: ", "ME: "):
+            self.assertEqual(sum(line.lstrip().startswith(prefix) for line in last.splitlines()), 1, prefix)
+        self.assertNotIn("{", last)
+
+
+class TestPromptBudget(GameTestCase):
+    def test_history_is_elided_to_fit(self):
+        gm = play_game(True, save_trace=True, prompt_budget=2700)
+        player = gm.players[0]
+        for msg in map(json.loads, player.client.chat.completions.prompts):
+            self.assertLessEqual(sum(count_tokens(player.model_name, m["content"]) for m in msg), 2700)
+
+        calls = [call for record in trace_records(gm.tracer.trace) for call in record.get("llm", ())]
+        elided = [call["elided"] for call in calls if "elided" in call]
+        self.assertTrue(elided)
+        self.assertLess(len(elided), len(calls))
+        history = gm.full_action_history
+        for record in elided:
+            self.assertGreater(record["tokens"], 2700)
+            self.assertLessEqual(record["fitted_tokens"], 2700)
+            # old actions only, the last 2 * num_players are always kept
+            dropped = record["dropped"]
+            self.assertTrue(dropped)
+            self.assertLess(max(dropped), len(history) - 10)
+
+    def test_budget_needs_the_state_mode(self):
+        with self.assertRaises(ValueError):
+            OnlineAI(0, "Alice", model_name="llama-3.3", url="http://localhost:1/v1", prompt_mode="transcript",
+                     prompt_budget=1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.players import RandomPlayer
+from deceptiongame.prompt_report import DECISION_PHASES, prompt_token_report
+from deceptiongame.tracer import find_traces
+
+from helpers import NAMES, decide
+
+
+class TestPromptReport(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def record_game(self, seed, theme):
+        players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+        gm = GameManager(players, total_missions=2, events_per_mission=2, turn_based_chat=True,
+                         save_trace=True, seed=seed, theme=theme, trace_format='jsonl')
+        gm.start_mission()
+        while not gm.game_over():
+            pending = gm.advance_game_to_next_action()
+            for pid, actions in pending.items():
+                for action in actions:
+                    gm.process_player_action(decide(gm.player_from_id(pid), action))
+
+    def test_compact_is_smaller_for_every_phase_and_theme(self):
+        self.record_game(0, 'default')
+        self.record_game(1, 'hospital')
+        report = prompt_token_report(find_traces('game_logs'))
+        self.assertEqual({theme for theme, _ in report}, {'default', 'hospital'})
+        for (theme, phase), by_profile in report.items():
+            self.assertIn(phase, DECISION_PHASES)
+            default, compact = by_profile['default'], by_profile['compact']
+            self.assertEqual(len(default), len(compact))
+            # the legend makes the system prompt longer, the state gets shorter
+            for (default_system, default_state), (compact_system, compact_state) in zip(default, compact):
+                self.assertGreater(compact_system, default_system)
+                self.assertLess(compact_state, default_state)
+            self.assertLess(sum(map(sum, compact)), sum(map(sum, default)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import pathlib
+import threading
+import unittest
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from deceptiongame import rate_limit
+from deceptiongame.actions import VoteAction
+from deceptiongame.player_llm import OnlineAI
+from deceptiongame.rate_limit import (
+    Limiter,
+    ModelLimits,
+    TokenBucket,
+    configure_limits,
+    limiter_for,
+    limiter_stats,
+    load_model_limits,
+)
+
+from helpers import FakeClock
+
+MODELS_YAML = pathlib.Path(__file__).resolve().parents[1] / "models.yaml"
+
+
+class SlowCompletions:
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = 0
+
+    def create(self, model, messages, temperature, extra_body=None, timeout=None):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="summary"))], usage=usage)
+
+
+class TestRateLimit(unittest.TestCase):
+    def tearDown(self):
+        rate_limit._limits = None
+        rate_limit._limiters.clear()
+
+    def test_bucket_spaces_out_requests(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock, clock.sleep)
+        # a minute's worth goes at once, then one a second
+        self.assertEqual(sum(bucket.take(1) for _ in range(60)), 0)
+        self.assertEqual([bucket.take(1) for _ in range(3)], [1.0, 1.0, 1.0])
+        clock.now += 120
+        self.assertEqual(bucket.take(30), 0)
+        # oversized requests wait for a full bucket rather than forever
+        self.assertEqual(bucket.take(1000), 30.0)
+
+    def test_token_estimates_are_settled(self):
+        clock = FakeClock()
+        limiter = Limiter(ModelLimits(tokens_per_minute=600), clock, clock.sleep)
+        with limiter.slot(500) as reservation:
+            reservation.settle(100)
+        # 500 estimated, 100 used: 500 left for the next call
+        with limiter.slot(500):
+            pass
+        self.assertEqual(clock.slept, [])
+        with limiter.slot(100):
+            pass
+        self.assertEqual(clock.slept, [10.0])
+        stats = limiter.stats()
+        self.assertEqual((stats["calls"], stats["in_flight"], stats["tokens_per_minute"]), (3, 0, 600))
+
+    def test_limits_come_from_models_yaml(self):
+        limits = load_model_limits(MODELS_YAML)
+        self.assertEqual(limits["llama-3.3"], ModelLimits(max_concurrency=5))
+        self.assertEqual(limits["meta-llama/Llama-3.3-70B-Instruct"], limits["llama-3.3"])
+        self.assertEqual(limits["gpt-4o"].max_concurrency, 15)
+        configure_limits(MODELS_YAML)
+        self.assertIs(limiter_for("llama-3.3", "http://a/v1"), limiter_for("llama-3.3", "http://a/v1"))
+        self.assertIsNot(limiter_for("llama-3.3", "http://a/v1"), limiter_for("llama-3.3", "http://b/v1"))
+        self.assertEqual(limiter_for("unknown").limits, ModelLimits())
+
+    def test_players_share_the_concurrency_cap(self):
+        configure_limits({"llama-3.3": ModelLimits(max_concurrency=2)})
+        completions = SlowCompletions(0.05)
+        players = []
+        for i in range(5):
+            player = OnlineAI(i, f"p{i}", model_name="llama-3.3", url="http://localhost:1/v1")
+            player.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+            players.append(player)
+        msg = [{"role": "user", "content": "hi"}]
+
+        async def call_all():
+            await asyncio.gather(*(asyncio.to_thread(p._call_chat_completion, msg, 1.0) for p in players))
+
+        asyncio.run(call_all())
+        self.assertEqual(completions.peak, 2)
+        [stats] = limiter_stats().values()
+        self.assertEqual((stats["calls"], stats["peak_in_flight"], stats["max_concurrency"]), (5, 2, 2))
+
+    def test_waiting_players_leave_the_default_executor_free(self):
+        configure_limits({"llama-3.3": ModelLimits(max_concurrency=1)})
+        completions = SlowCompletions(0.05)
+        msg = [{"role": "user", "content": "hi"}]
+        threads = set()
+        players = []
+        for i in range(4):
+            player = OnlineAI(i, f"p{i}", model_name="llama-3.3", url="http://localhost:1/v1")
+            player.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+            def decide(act, state, player=player):
+                threads.add(threading.current_thread().name)
+                return player._call_chat_completion(msg, 1.0)
+            player._decide = decide
+            players.append(player)
+
+        async def play():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(1))
+            decisions = asyncio.gather(*(p.perform_action([VoteAction], {}) for p in players))
+            await asyncio.sleep(0.01)
+            # the one default worker is free while the players queue for the one slot
+            await asyncio.to_thread(lambda: None)
+            self.assertFalse(decisions.done())
+            return await decisions
+
+        self.assertEqual(asyncio.run(play()), [["summary"]] * 4)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads.pop().startswith("llm-call"))
+        self.assertEqual(completions.peak, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import random
+import tempfile
+import unittest
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.players import RandomPlayer
+from deceptiongame.replay import TraceReplay
+
+from helpers import NAMES, decide
+
+
+def fingerprint(gm):
+    return (
+        gm.current_mission,
+        gm.phase,
+        dict(gm.cumulative_scores),
+        gm.mission.mission_event_idx,
+        tuple(gm.mission.event_played),
+        gm.mission.coop_scores,
+        gm.mission.defector_scores,
+        tuple((p.role, tuple(p.hand), p.vote_choice, p.nomination, p.is_leader) for p in gm.players),
+    )
+
+
+class TestTraceReplay(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def record_game(self, seed):
+        """ Play one action at a time, fingerprinting the engine before each one. """
+        players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+        gm = GameManager(players, total_missions=3, events_per_mission=4, turn_based_chat=True,
+                         save_trace=True, seed=seed)
+        gm.start_mission()
+        fingerprints = []
+        while not gm.game_over():
+            pending = gm.advance_game_to_next_action()
+            if gm.game_over():
+                break
+            fingerprints.append(fingerprint(gm))
+            pid, actions = next(iter(pending.items()))
+            gm.process_player_action(decide(gm.player_from_id(pid), actions[0]))
+        fingerprints.append(fingerprint(gm))
+        return gm, fingerprints
+
+    def test_seek_anywhere(self):
+        gm, fingerprints = self.record_game(seed=4)
+        replay = TraceReplay.from_file(gm.tracer._trace_save_path)
+        self.assertEqual(len(replay), len(fingerprints) - 1)
+
+        positions = list(range(len(fingerprints)))
+        random.Random(0).shuffle(positions)
+        for pos in positions + [len(replay), 0, len(replay) // 2, 3]:
+            self.assertEqual(fingerprint(replay.seek_to(pos)), fingerprints[pos], pos)
+        self.assertEqual(replay.seek_to(len(replay)).mission_history, gm.mission_history)
+
+    def test_seek_by_mission_and_event(self):
+        gm, _ = self.record_game(seed=9)
+        replay = TraceReplay.from_file(gm.tracer._trace_save_path)
+        game = replay.seek(1, 0)
+        self.assertEqual((game.current_mission, game.mission.mission_event_idx), (2, 1))
+        self.assertTrue(game.mission.event_started)
+        game = replay.seek(0)
+        self.assertEqual(game.current_mission, 1)
+        self.assertTrue(all(p.role is None for p in game.players))
+
+    def test_resume_with_live_players(self):
+        gm, _ = self.record_game(seed=6)
+        replay = TraceReplay.from_file(gm.tracer._trace_save_path)
+        middle = replay.entries[len(replay) // 2]
+        replay.seek(middle.mission, middle.event, middle.action)
+        players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+        resumed = replay.resume(players, save_trace=True, save_path='resumed.json')
+        self.assertEqual([p.role for p in players], [p.role for p in replay.game.players])
+        while not resumed.game_over():
+            pending = resumed.advance_game_to_next_action()
+            if pending == 'quit_game':
+                break
+            for player in players:
+                for action in pending.get(player.player_id, []):
+                    resumed.process_player_action(decide(player, action))
+        # the resumed trace starts with the recorded prefix and replays to the same point
+        prefix = TraceReplay.from_file('resumed.json')
+        self.assertEqual(fingerprint(prefix.seek_to(replay.pos)), fingerprint(replay.seek_to(replay.pos)))
+
+    def test_mismatched_trace_is_reported(self):
+        gm, _ = self.record_game(seed=2)
+        replay = TraceReplay.from_file(gm.tracer._trace_save_path)
+        first_vote = next(i for i, e in enumerate(replay.entries) if e.phase == 'vote')
+        replay.entries[first_vote] = replay.entries[0]
+        with self.assertRaisesRegex(ValueError, "does not match"):
+            replay.seek_to(first_vote + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
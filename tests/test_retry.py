@@ -0,0 +1,149 @@
+import random
+import unittest
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from deceptiongame import retry
+from deceptiongame.inference_utils import CallStats, call_chat_completion_gemini
+from deceptiongame.rate_limit import Limiter, ModelLimits
+from deceptiongame.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retries, classify
+
+from helpers import FakeClock
+
+REQUEST = httpx.Request("POST", "http://localhost:1/v1/chat/completions")
+
+
+def status_error(cls, status, headers=None):
+    return cls("error", response=httpx.Response(status, headers=headers, request=REQUEST), body=None)
+
+
+class Attempts:
+    """ Raises the given errors in turn, then answers. """
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.n_calls = 0
+
+    def __call__(self, timeout):
+        self.n_calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok", 10, 2
+
+
+class TestRetry(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.slept = self.clock.slept
+
+    def tearDown(self):
+        retry._breakers.clear()
+
+    def run_attempts(self, attempts, provider="vllm", endpoint=None, policy=RetryPolicy()):
+        stats = CallStats("m")
+        stats.begin([{"role": "user", "content": "hi"}])
+        output = call_with_retries(attempts, provider, stats, endpoint, policy=policy,
+                                  sleep=self.clock.sleep, clock=self.clock)
+        return output, stats
+
+    def test_backoff_is_exponential_with_jitter(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=10.0)
+        rng = random.Random(0)
+        for attempt, cap in [(1, 1), (2, 2), (3, 4), (4, 8), (8, 10)]:
+            delays = [policy.backoff(attempt, rng) for _ in range(200)]
+            self.assertTrue(all(0 <= d <= cap for d in delays))
+            self.assertGreater(max(delays), cap * 0.8)
+
+    def test_errors_are_classified(self):
+        connection = openai.APIConnectionError(request=REQUEST)
+        self.assertEqual(classify("vllm", connection), (True, True))
+        self.assertEqual(classify("vllm", status_error(openai.InternalServerError, 503)), (True, True))
+        self.assertEqual(classify("azure", status_error(openai.RateLimitError, 429)), (True, False))
+        self.assertEqual(classify("azure", status_error(openai.AuthenticationError, 401)), (False, False))
+        self.assertEqual(classify("anthropic", SimpleNamespace(response={"Error": {"Code": "ThrottlingException"}})), (True, False))
+        self.assertEqual(classify("anthropic", SimpleNamespace(response={"Error": {"Code": "ValidationException"}})), (False, False))
+        self.assertEqual(classify("gemini", SimpleNamespace(code=500)), (True, True))
+        self.assertEqual(classify("vllm", ValueError("Expecting value")), (True, False))
+        self.assertEqual(classify("vllm", TypeError("unexpected keyword")), (False, False))
+
+    def test_retries_until_success(self):
+        attempts = Attempts(ConnectionError(), ValueError("bad json"), status_error(openai.RateLimitError, 429, {"retry-after": "7"}))
+        output, stats = self.run_attempts(attempts)
+        self.assertEqual((output, attempts.n_calls, stats.retries), ("ok", 4, 3))
+        self.assertEqual(self.slept[-1], 7.0)
+        self.assertEqual((stats.prompt_tokens, stats.completion_tokens), (10, 2))
+
+    def test_gives_up(self):
+        # not worth retrying
+        attempts = Attempts(status_error(openai.BadRequestError, 400))
+        with self.assertRaises(openai.BadRequestError):
+            self.run_attempts(attempts)
+        self.assertEqual((attempts.n_calls, self.slept), (1, []))
+        # out of attempts
+        attempts = Attempts(*[ConnectionError()] * 10)
+        with self.assertRaises(ConnectionError):
+            self.run_attempts(attempts, policy=RetryPolicy(max_attempts=3))
+        self.assertEqual(attempts.n_calls, 3)
+        # the next sleep would end past the deadline
+        attempts = Attempts(*[status_error(openai.RateLimitError, 429, {"retry-after": "30"})] * 10)
+        with self.assertRaises(openai.RateLimitError):
+            self.run_attempts(attempts, policy=RetryPolicy(deadline=60))
+        self.assertEqual(attempts.n_calls, 2)
+
+    def test_gemini_errors_are_raised(self):
+        def generate_content(**kwargs):
+            raise status_error(openai.AuthenticationError, 403)
+        client = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+        with self.assertRaises(openai.AuthenticationError):
+            call_chat_completion_gemini(client, "gemini-2.5-flash", [{"role": "user", "content": "hi"}], 1.0)
+
+    def test_gemini_calls_get_the_time_left(self):
+        timeouts = []
+        def generate_content(model, contents, config):
+            timeouts.append(config["http_options"]["timeout"])
+            if len(timeouts) == 1:
+                raise ConnectionError()
+            return SimpleNamespace(text="ok", usage_metadata=None)
+        client = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+        output = call_chat_completion_gemini(client, "gemini-2.5-flash", [{"role": "user", "content": "hi"}], 1.0)
+        self.assertEqual(output, "ok")
+        # milliseconds, within the gemini deadline and shrinking with the time spent
+        self.assertLessEqual(timeouts[0], retry.POLICIES["gemini"].deadline * 1000)
+        self.assertLessEqual(timeouts[1], timeouts[0])
+
+    def test_timeout_is_what_is_left_after_the_limiter(self):
+        limiter = Limiter(ModelLimits(requests_per_minute=60), self.clock, self.clock.sleep)
+        limiter._requests.take(60)
+        timeouts = []
+        stats = CallStats("m")
+        stats.begin([{"role": "user", "content": "hi"}])
+        call_with_retries(lambda timeout: timeouts.append(timeout) or ("ok", 10, 2), "vllm", stats, limiter=limiter,
+                          policy=RetryPolicy(deadline=10.0), sleep=self.clock.sleep, clock=self.clock)
+        # one second waiting for the request bucket
+        self.assertEqual(self.slept, [1.0])
+        self.assertEqual(timeouts, [9.0])
+
+    def test_circuit_breaker(self):
+        clock = FakeClock()
+        breaker = retry._breakers["http://dead/v1"] = CircuitBreaker("http://dead/v1", failure_threshold=3, reset_after=30, clock=clock)
+        attempts = Attempts(*[ConnectionError()] * 100)
+        with self.assertRaises(CircuitOpenError):
+            self.run_attempts(attempts, endpoint="http://dead/v1")
+        self.assertEqual((attempts.n_calls, breaker.state), (3, "open"))
+        # open: fails without calling the endpoint
+        with self.assertRaises(CircuitOpenError):
+            self.run_attempts(attempts, endpoint="http://dead/v1")
+        self.assertEqual(attempts.n_calls, 3)
+        # half open: one failed trial opens it again, a good one closes it
+        clock.now += 31
+        with self.assertRaises(CircuitOpenError):
+            self.run_attempts(attempts, endpoint="http://dead/v1")
+        self.assertEqual((attempts.n_calls, breaker.state), (4, "open"))
+        clock.now += 31
+        output, _ = self.run_attempts(Attempts(), endpoint="http://dead/v1")
+        self.assertEqual((output, breaker.state, breaker.failures), ("ok", "closed", 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
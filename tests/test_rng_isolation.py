@@ -0,0 +1,42 @@
+import random
+import unittest
+
+from helpers import new_game, step
+
+
+def outcome(gm):
+    # event cards compare by identity, so compare their rendered slots instead
+    events = [{**ev, 'event_card': repr(ev['event_card'])} for ev in gm.full_event_history]
+    return gm.cumulative_scores, gm.mission_history, events
+
+
+class TestRngIsolation(unittest.TestCase):
+    def test_same_seed_same_game(self):
+        a, b = new_game(11), new_game(11)
+        while step(a):
+            pass
+        while step(b):
+            pass
+        self.assertEqual(outcome(a), outcome(b))
+
+    def test_interleaved_games_do_not_interfere(self):
+        solo = new_game(5)
+        while step(solo):
+            pass
+
+        # touching the global generator or running another game in between must not change the result
+        games = [new_game(5), new_game(6)]
+        running = True
+        while running:
+            random.random()
+            running = any([step(gm) for gm in games])
+        self.assertEqual(outcome(games[0]), outcome(solo))
+
+    def test_unseeded_game_records_its_seed(self):
+        gm = new_game(None)
+        self.assertIsInstance(gm.seed, int)
+        self.assertEqual(gm.tracer.trace['config']['seed'], gm.seed)
+
+
+if __name__ == '__main__':
+    unittest.main()
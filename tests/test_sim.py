@@ -0,0 +1,168 @@
+import unittest
+from unittest import mock
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    PlayCardAction,
+    DiscussionAction,
+    NominatePlayerAction,
+    VoteAction,
+)
+from deceptiongame.players import PlayerInterface
+from deceptiongame.sim import BatchSimulator, simulate
+
+NAMES = ["Alice", "Bob", "Charlie", "David", "Eve"]
+
+
+class ScriptedCard:
+    def __init__(self, attribute_slots):
+        self.attribute_slots = attribute_slots
+
+
+class ScriptedEventDeck:
+    def __init__(self, cards, num_players):
+        self.cards = list(reversed(cards))
+        self.num_players = num_players
+
+    def __len__(self):
+        return len(self.cards)
+
+    def draw_event_card(self):
+        return self.cards.pop()
+
+
+class ScriptedActionDeck:
+    def __init__(self, cards):
+        self.deck = list(reversed(cards))
+
+    def draw(self):
+        return self.deck.pop()
+
+
+class ScriptedPlayer(PlayerInterface):
+    """ Replays the decisions the simulator drew for this player. """
+    def __init__(self, player_id, name, script, gm_ref):
+        super().__init__(player_id, name)
+        self.script = script
+        self.gm_ref = gm_ref
+        self.role_attempts = {}
+
+    def _mission(self):
+        return self.script['missions'][self.gm_ref[0].current_mission - 1]
+
+    def _turn(self):
+        event = self._mission()['events'][self.gm_ref[0].mission.mission_event_idx - 1]
+        return event
+
+    def select_role(self, context):
+        m = self.gm_ref[0].current_mission
+        attempt = self.role_attempts.get(m, 0)
+        self.role_attempts[m] = attempt + 1
+        role = self._mission()['roles'][attempt][self.player_id]
+        return SelectRoleAction(self.player_id, role, role)
+
+    def play_card(self, context, discardable=False):
+        turn = self._turn()['turns'][self.player_id]
+        if discardable:
+            return DiscardableCardAction(self.player_id, turn['card'], turn['is_discard'])
+        return PlayCardAction(self.player_id, self.hand[turn['pick']])
+
+    def participate_in_discussion(self, context):
+        return DiscussionAction(self.player_id, "...")
+
+    def nominate_player(self, context):
+        target = self._mission()['nominations'][self.player_id]
+        return NominatePlayerAction(self.player_id, NAMES[target])
+
+    def vote(self, context):
+        return VoteAction(self.player_id, self._turn()['votes'][self.player_id])
+
+
+def replay_in_game_manager(script, num_players, total_missions, events_per_mission):
+    gm_ref = []
+    players = [ScriptedPlayer(i, NAMES[i], script, gm_ref) for i in range(num_players)]
+    # events after a retreat are never drawn, but they keep the deck from reporting the mission complete
+    event_decks = iter([
+        ScriptedEventDeck(
+            [ScriptedCard(ev['attribute_slots']) for ev in m['events']]
+            + [ScriptedCard({})] * (events_per_mission - len(m['events'])),
+            num_players,
+        )
+        for m in script['missions']
+    ])
+    action_decks = iter([
+        ScriptedActionDeck(ev['action_deck']) for m in script['missions'] for ev in m['events']
+    ])
+    with mock.patch('deceptiongame.online_game_manager.EventDeck', lambda **kwargs: next(event_decks)), \
+         mock.patch('deceptiongame.mission_manager.ActionDeck', lambda *args, **kwargs: next(action_decks)):
+        gm = GameManager(players, total_missions=total_missions, events_per_mission=events_per_mission,
+                         turn_based_chat=True)
+        gm_ref.append(gm)
+        # MissionDeck pops from the end and scales by mission number on draw
+        for m, mission in enumerate(script['missions']):
+            gm.mission_deck.cards[-1 - m].payoff_matrix = dict(mission['payoff_matrix'])
+        gm.start_mission()
+        while not gm.game_over():
+            pending = gm.advance_game_to_next_action()
+            if pending == 'quit_game':
+                break
+            for player in players:
+                for action in pending.get(player.player_id, []):
+                    if action is SelectRoleAction:
+                        act = player.select_role({})
+                    elif action is DiscardableCardAction:
+                        act = player.play_card({}, discardable=True)
+                    elif action is PlayCardAction:
+                        act = player.play_card({})
+                    elif action is NominatePlayerAction:
+                        act = player.nominate_player({})
+                    elif action is VoteAction:
+                        act = player.vote({})
+                    else:
+                        act = player.participate_in_discussion({})
+                    gm.process_player_action(act)
+    return gm
+
+
+class TestBatchSimulator(unittest.TestCase):
+    def test_matches_game_manager(self):
+        for seed in (0, 1, 2):
+            sim = BatchSimulator(4, total_missions=3, events_per_mission=5, seed=seed, record=True)
+            result = sim.run()
+            for g in range(result.n_games):
+                script = result.game_script(g)
+                gm = replay_in_game_manager(script, 5, 3, 5)
+                self.assertEqual(gm.cumulative_scores, script['scores'])
+                for m, end_state in enumerate(gm.mission_history):
+                    self.assertEqual(end_state['defector_found'], bool(result.defector_found[g, m]))
+                    self.assertEqual(end_state['cooperator_found'], bool(result.cooperator_found[g, m]))
+                    self.assertEqual(end_state['mission_complete'], bool(result.mission_complete[g, m]))
+                    self.assertEqual(end_state['sabotage_successful'], bool(result.sabotage_successful[g, m]))
+
+    def test_seed_is_reproducible(self):
+        a = simulate(1000, seed=7)
+        b = simulate(1000, seed=7)
+        self.assertTrue((a.scores == b.scores).all())
+        self.assertTrue((a.mission_scores.sum(axis=1) == a.scores).all())
+
+    def test_fixed_payoff_matrix(self):
+        payoff_matrix = {
+            'starting_points_defector': 2,
+            'mission_sabotaged': 4,
+            'defector_found': 6,
+            'defector_unknown': 1,
+            'cooperator_found': 6,
+            'points_per_card': 1,
+        }
+        result = simulate(2000, payoff_matrix=payoff_matrix, seed=3, p_retreat=0.0)
+        # nobody votes to retreat, so every mission plays all of its events
+        self.assertTrue((result.events_played == 5).all())
+        self.assertTrue(result.mission_complete.all())
+        summary = result.summary()
+        self.assertAlmostEqual(summary['mission_complete'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
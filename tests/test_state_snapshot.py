@@ -0,0 +1,109 @@
+import json
+import unittest
+
+from deceptiongame.online_game_manager import GameManager
+from deceptiongame.actions import (
+    SelectRoleAction,
+    DiscardableCardAction,
+    DiscussionAction,
+    VoteAction,
+)
+from deceptiongame.players import RandomPlayer
+
+from helpers import NAMES, decide
+
+
+class TestStateSnapshot(unittest.TestCase):
+    def setUp(self):
+        players = [RandomPlayer(i, name) for i, name in enumerate(NAMES)]
+        self.gm = GameManager(players, total_missions=2, events_per_mission=3, turn_based_chat=True, seed=3)
+        self.gm.start_mission()
+
+    def test_snapshot_is_reused_until_something_changes(self):
+        gm = self.gm
+        pending = gm.advance_game_to_next_action()
+        state = gm.get_state()
+        self.assertIs(gm.get_state(), state)
+        # polling without acting does not change anything either
+        gm.advance_game_to_next_action()
+        self.assertIs(gm.get_state(), state)
+
+        version = gm.state_version
+        player = gm.players[0]
+        self.assertEqual(pending[player.player_id], [SelectRoleAction])
+        gm.process_player_action(SelectRoleAction(player.player_id, 'cooperator', 'cooperator'))
+        self.assertGreater(gm.state_version, version)
+        new_state = gm.get_state()
+        self.assertIsNot(new_state, state)
+        self.assertEqual(new_state['player_info'][0]['role'], 'cooperator')
+        # the old snapshot still describes the old version
+        self.assertIsNone(state['player_info'][0]['role'])
+        self.assertEqual(state['state_version'], version)
+
+    def test_snapshot_is_read_only(self):
+        state = self.gm.get_state()
+        with self.assertRaises(TypeError):
+            state['game_over'] = True
+        with self.assertRaises(TypeError):
+            state['player_info'][0]['score'] = 3
+        with self.assertRaises(TypeError):
+            state['cumulative_scores'].update({0: 1})
+        copied = {**state, 'game_over': True}
+        self.assertTrue(copied['game_over'])
+
+    def test_clean_sections_are_shared(self):
+        gm = self.gm
+        pending = gm.advance_game_to_next_action()
+        for player in gm.players:
+            gm.process_player_action(SelectRoleAction(player.player_id, 'cooperator', 'cooperator'))
+        # play cards and chat until the retreat vote
+        while VoteAction not in pending.get(0, []):
+            pending = gm.advance_game_to_next_action()
+            for player in gm.players:
+                for action in pending.get(player.player_id, []):
+                    if action is DiscussionAction:
+                        gm.process_player_action(player.participate_in_discussion({}))
+                    elif action is not VoteAction:
+                        gm.process_player_action(player.play_card({}, discardable=action is DiscardableCardAction))
+        before = gm.get_state()
+        gm.process_player_action(VoteAction(gm.players[0].player_id, 'no'))
+        after = gm.get_state()
+        # a vote only touches the players section
+        self.assertIs(after['cumulative_scores'], before['cumulative_scores'])
+        self.assertIs(after['event_hand'], before['event_hand'])
+        self.assertEqual(after['player_info'][0]['vote_choice'], 'no')
+        json.dumps(after['player_info'])
+
+    def test_old_snapshot_is_unchanged_by_later_actions(self):
+        gm = self.gm
+
+        def play(until):
+            while not gm.game_over() and not until():
+                pending = gm.advance_game_to_next_action()
+                for pid, actions in pending.items():
+                    for action in actions:
+                        gm.process_player_action(decide(gm.player_from_id(pid), action))
+
+        # into the second mission's chat
+        play(lambda: gm.mission_history and len(gm.get_state()['chat_history']) > 4)
+        state = gm.get_state()
+        keys = ('full_action_history', 'full_event_history', 'mission_history', 'chat_history', 'event_results',
+                'mission_scores', 'payoff_matrix')
+        before = {key: repr(state[key]) for key in keys}
+        lengths = {key: len(state[key]) for key in keys if key != 'payoff_matrix'}
+
+        play(lambda: len(gm.mission_history) > 1)
+        self.assertTrue(gm.game_over())
+        self.assertEqual({key: repr(state[key]) for key in keys}, before)
+        self.assertEqual({key: len(state[key]) for key in lengths}, lengths)
+        later = gm.get_state()
+        self.assertGreater(len(later['full_action_history']), lengths['full_action_history'])
+        self.assertEqual(later['full_action_history'][:lengths['full_action_history']], state['full_action_history'])
+        with self.assertRaises(TypeError):
+            state['mission_history'][0]['mission_id'] = None
+        with self.assertRaises(AttributeError):
+            state['chat_history'].append(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import string
+import pathlib
+import unittest
+
+from deceptiongame.decks import EventDeck
+from deceptiongame.llm_instructions import INSTRUCTIONS
+from deceptiongame.player_llm import OnlineAI
+from deceptiongame.themed_prompts import compile_template, themed_prompts
+
+THEMES = sorted(p.parent.name for p in (pathlib.Path(__file__).parent.parent / "src" / "deceptiongame" / "themes").glob("*/theme.py"))
+CALL_FIELDS = {"available_roles": "Cooperator, Defector", "hand_cards": "a, b, c", "other_players": "Bob, Unknown",
+               "rules_md": "# Rules"}
+
+
+def term(theme, key):
+    result = theme["terms"][key.lower()]
+    return result[0].upper() + result[1:] if key[0].isupper() else result
+
+
+class TestThemedPrompts(unittest.TestCase):
+    def test_compiled_instructions_match_formatting_per_call(self):
+        self.assertGreater(len(THEMES), 5)
+        for theme_name in THEMES:
+            prompts = themed_prompts(theme_name)
+            for key, template in INSTRUCTIONS.items():
+                fields = {f for _, f, _, _ in string.Formatter().parse(template) if f}
+                expected = template.format(**{f: CALL_FIELDS[f] if f in CALL_FIELDS else term(prompts.theme, f)
+                                              for f in fields})
+                compiled = prompts.instructions[key].format(**{f: CALL_FIELDS[f] for f in fields & CALL_FIELDS.keys()})
+                self.assertEqual(compiled, expected, (theme_name, key))
+            self.assertEqual(prompts.term("Mission"), term(prompts.theme, "Mission"))
+            with self.assertRaises(KeyError):
+                prompts.term("no_such_term")
+
+    def test_compile_keeps_other_fields_and_braces(self):
+        template = "{{literal}} {mission} for {who!r:>6} {Mission}"
+        compiled = compile_template(template, {"mission": "case {1}", "Mission": "Case {1}"})
+        self.assertEqual(compiled.format(who="me"), "{literal} case {1} for   'me' Case {1}")
+
+    def test_shared_by_players(self):
+        a = OnlineAI(0, "Alice", model_name="llama-3.3", url="http://localhost:1/v1", theme_name="hospital")
+        b = OnlineAI(1, "Bob", model_name="llama-3.3", url="http://localhost:1/v1", theme_name="hospital",
+                     prompt_profile="compact")
+        self.assertIs(a.prompts, b.prompts)
+        self.assertIs(a.theme, b.theme)
+        self.assertTrue(b.system_prompt.startswith(a.system_prompt))
+        self.assertIn("# Game state format", b.system_prompt)
+
+    def test_event_card_is_formatted_once_per_terms(self):
+        card = EventDeck(theme="hospital", seed=0).cards[0]
+        terms = themed_prompts("hospital").event_card_terms
+        formatted = card.get_card_info_formatted(**terms)
+        self.assertNotIn("{{", formatted)
+        self.assertIn(terms["sabotage"], formatted)
+        self.assertIs(card.get_card_info_formatted(**terms), formatted)
+        self.assertIn("{{event}}", card.get_card_info_formatted())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+
+from deceptiongame.tracer import TraceFollower, follow_traces, print_record, read_records, trace_stem
+
+import helpers
+from helpers import NAMES
+
+
+def new_game(seed, **trace_kwargs):
+    return helpers.new_game(seed, save_trace=True, trace_format='jsonl', trace_options={'background': False},
+                            **trace_kwargs)
+
+
+def step(gm):
+    """ helpers.step, then write the round's records out for the followers. """
+    if not helpers.step(gm):
+        return False
+    gm.tracer.flush()
+    return True
+
+
+class TestTraceFollower(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def follow_to_end(self, gm):
+        follower = TraceFollower(gm.tracer._trace_save_path)
+        records, polls_with_news = [], 0
+        while step(gm):
+            new = follower.poll()
+            polls_with_news += bool(new)
+            records.extend(new)
+        records.extend(follower.poll())
+        self.assertTrue(follower.done)
+        self.assertGreater(polls_with_news, 10)
+        self.assertEqual(follower.id_to_name[0], 'Alice')
+        return records
+
+    def test_follow_reads_every_record_once(self):
+        gm = new_game(3)
+        records = self.follow_to_end(gm)
+        self.assertEqual(records, read_records(gm.tracer._trace_save_path))
+
+    def test_follow_gzip_trace(self):
+        gm = new_game(3, trace_compression='gzip')
+        records = self.follow_to_end(gm)
+        self.assertEqual(records, read_records(gm.tracer._trace_save_path))
+        self.assertEqual(records[-1]['type'], 'finish_game')
+
+    def test_partial_line_waits_for_newline(self):
+        with open('partial.jsonl', 'w') as f:
+            f.write('{"type": "start_mission", "mission_id": 1, "payoff_matrix": {}}\n{"type": "start_ev')
+        follower = TraceFollower('partial.jsonl')
+        self.assertEqual([r['type'] for r in follower.poll()], ['start_mission'])
+        self.assertEqual(follower.poll(), [])
+        with open('partial.jsonl', 'a') as f:
+            f.write('ent", "event_id": 0, "card": "x"}\n')
+        self.assertEqual(follower.poll(), [{'type': 'start_event', 'event_id': 0, 'card': 'x'}])
+
+    def test_print_record(self):
+        gm = new_game(5)
+        while step(gm):
+            pass
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for record in read_records(gm.tracer._trace_save_path):
+                print_record(record, {i: name for i, name in enumerate(NAMES)})
+        text = out.getvalue()
+        self.assertIn('Starting Mission 2', text)
+        self.assertIn('Played cards:', text)
+        self.assertIn('Game over. Scores:', text)
+        self.assertRegex(text, r'Alice +(played|discarded)')
+
+    def test_follow_many_games(self):
+        games = [new_game(seed) for seed in (1, 2)]
+        while any([step(gm) for gm in games]):
+            pass
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            follow_traces(['game_logs'], poll_interval=0.01, stop_when_done=True)
+        lines = out.getvalue().splitlines()
+        for gm in games:
+            label = f"[{os.path.basename(trace_stem(gm.tracer._trace_save_path))}] "
+            game_lines = [line for line in lines if line.startswith(label)]
+            self.assertTrue(game_lines[-1].startswith(label + 'Game over.'))
+
+
+if __name__ == '__main__':
+    unittest.main()
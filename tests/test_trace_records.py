@@ -0,0 +1,105 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from deceptiongame.tracer import (
+    Tracer,
+    _JsonStream,
+    load_trace,
+    split_byte_ranges,
+    summarize_records,
+    summarize_trace,
+)
+
+import helpers
+from helpers import NAMES
+
+
+def play_game(seed, max_actions=None, **trace_kwargs):
+    gm = helpers.play_game(seed, max_actions, context={'available_players': NAMES}, **trace_kwargs)
+    gm.tracer.flush()
+    return gm
+
+
+def legacy_layout(trace):
+    """ Key order of nested traces written before iter_records: prompts after the missions, payoffs after the events. """
+    trace = dict(trace)
+    missions = [{k: v for k, v in m.items() if k != 'payoff_matrix'} | {'payoff_matrix': m['payoff_matrix']}
+                for m in trace.pop('missions')]
+    prompt_templates = trace.pop('prompt_templates')
+    outcome = {'outcome': trace.pop('outcome')} if 'outcome' in trace else {}
+    return {**trace, 'missions': missions, 'prompt_templates': prompt_templates, **outcome}
+
+
+class TestIterRecords(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def assertStreamsLikeLoad(self, path):
+        records = list(Tracer.iter_records(path))
+        self.assertEqual(records[0]['type'], 'start_game')
+        self.assertEqual(Tracer.from_records(records), load_trace(path))
+        self.assertEqual(summarize_records(records), summarize_trace(load_trace(path)))
+        return records
+
+    def test_all_formats(self):
+        streamed = []
+        for kwargs in ({}, {'trace_compression': 'gzip'}, {'trace_format': 'jsonl'}):
+            path = play_game(2, **kwargs).tracer._trace_save_path
+            records = self.assertStreamsLikeLoad(path)
+            # game_id and timestamps differ between runs
+            streamed.append([{k: v for k, v in r.items() if k not in ('game_id', 'started_at', 'timestamp')} for r in records])
+        # nested traces stream in the order of the nesting, JSONL ones in the order things happened
+        self.assertEqual(streamed[0], streamed[1])
+        self.assertCountEqual(map(json.dumps, streamed[0]), map(json.dumps, streamed[2]))
+
+    def test_unfinished_games(self):
+        for trace_format in ('json', 'jsonl'):
+            gm = play_game(3, max_actions=25, trace_format=trace_format)
+            if trace_format == 'jsonl':
+                gm.tracer.close()
+            records = self.assertStreamsLikeLoad(gm.tracer._trace_save_path)
+            self.assertNotIn('finish_game', [r['type'] for r in records])
+
+    def test_legacy_key_order(self):
+        trace = load_trace(play_game(4).tracer._trace_save_path)
+        with open('legacy.json', 'w') as f:
+            json.dump(legacy_layout(trace), f, indent=2)
+        records = list(Tracer.iter_records('legacy.json'))
+        self.assertEqual(records[-2]['type'], 'prompt_templates')
+        self.assertIn('payoff_matrix', records[-3])
+        # leaves straddling chunk boundaries
+        with mock.patch.object(_JsonStream, 'CHUNK', 7):
+            self.assertEqual(list(Tracer.iter_records('legacy.json')), records)
+        self.assertEqual(Tracer.from_records(records), trace)
+        self.assertEqual(summarize_records(records), summarize_trace(trace))
+
+    def test_truncated_json_trace(self):
+        path = play_game(5).tracer._trace_save_path
+        with open(path) as f:
+            text = f.read()
+        with open('torn.json', 'w') as f:
+            f.write(text[:len(text) // 2])
+        with self.assertRaises(ValueError):
+            list(Tracer.iter_records('torn.json'))
+
+    def test_byte_ranges(self):
+        path = play_game(6, trace_format='jsonl').tracer._trace_save_path
+        records = list(Tracer.iter_records(path))
+        for n in (1, 3, 16):
+            chunks = [list(Tracer.iter_records(path, start, end)) for start, end in split_byte_ranges(path, n)]
+            self.assertEqual([r for chunk in chunks for r in chunk], records)
+        with self.assertRaises(ValueError):
+            list(Tracer.iter_records(play_game(6).tracer._trace_save_path, 0, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import gzip
+import tempfile
+import unittest
+
+from deceptiongame.tracer import (
+    Tracer,
+    JsonlTracer,
+    PROMPT_STORE_DIR,
+    find_traces,
+    iter_summaries,
+    load_summary,
+    load_trace,
+    resolve_compression,
+    summarize_trace,
+    summary_path,
+    trace_stem,
+    zstandard,
+)
+
+from helpers import NAMES, play_game, strip_run_info
+
+RULES = "# Rules\n" + "Cooperate, or do not. " * 300
+
+
+class TestTraceStorage(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_gzip_traces_read_back_transparently(self):
+        expected = strip_run_info(load_trace(play_game(4).tracer._trace_save_path))
+        for trace_format in ('json', 'jsonl'):
+            path = play_game(4, trace_format=trace_format, trace_compression='gzip').tracer._trace_save_path
+            self.assertTrue(path.endswith(f'.{trace_format}.gz'))
+            with gzip.open(path, 'rt') as f:
+                f.read()
+            self.assertEqual(strip_run_info(load_trace(path)), expected)
+            self.assertEqual(trace_stem(path), path[:-len(f'.{trace_format}.gz')])
+        self.assertEqual(len(find_traces('game_logs')), 3)
+
+    def test_running_gzip_game_is_readable(self):
+        gm = play_game(6, max_actions=12, trace_format='jsonl', trace_compression='gzip',
+                       trace_options={'background': False})
+        gm.tracer.flush()
+        trace = load_trace(gm.tracer._trace_save_path)
+        self.assertNotIn('outcome', trace)
+        self.assertEqual(len(trace['missions'][0]['actions']), len(NAMES))
+
+    def test_system_prompt_is_stored_once(self):
+        paths = []
+        for trace_cls, name in ((Tracer, 'a.json'), (JsonlTracer, 'b.jsonl.gz'), (Tracer, 'c.json')):
+            tracer = trace_cls({'players': []}, {'system_prompt': RULES}, name, True, dedup_prompts=True)
+            tracer.start_mission(1, {})
+            tracer.finish_game({'scores': {}})
+            tracer.save_trace_to_json()
+            paths.append(name)
+        self.assertEqual(len(os.listdir(PROMPT_STORE_DIR)), 1)
+        with open('a.json') as f:
+            self.assertNotIn('Cooperate, or do not', f.read())
+        for path in paths:
+            trace = load_trace(path)
+            self.assertEqual(trace['prompt_templates'], {'system_prompt': RULES})
+            self.assertEqual(len(trace['missions']), 1)
+
+    def test_compression_setting(self):
+        self.assertIsNone(resolve_compression(None))
+        self.assertEqual(resolve_compression('gzip'), 'gzip')
+        self.assertEqual(resolve_compression('auto'), 'zstd' if zstandard is not None else 'gzip')
+        with self.assertRaises(ValueError):
+            resolve_compression('lz4')
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd_traces_read_back_transparently(self):
+        expected = strip_run_info(load_trace(play_game(4).tracer._trace_save_path))
+        for trace_format in ('json', 'jsonl'):
+            path = play_game(4, trace_format=trace_format, trace_compression='zstd').tracer._trace_save_path
+            self.assertEqual(strip_run_info(load_trace(path)), expected)
+
+
+class TestTraceSummary(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_finished_game_writes_summary(self):
+        for trace_format in ('json', 'jsonl'):
+            gm = play_game(3, trace_format=trace_format, trace_compression='gzip')
+            path = gm.tracer._trace_save_path
+            self.assertTrue(os.path.exists(summary_path(path)))
+            summary = load_summary(path, fallback=False)
+            self.assertEqual(summary, summarize_trace(load_trace(path)))
+            self.assertTrue(summary['finished'])
+            self.assertEqual(len(summary['missions']), len(gm.mission_history))
+            for mission in summary['missions']:
+                self.assertEqual(len(mission['roles']), len(NAMES))
+            totals = {pid: sum(m['score_deltas'][pid] for m in summary['missions']) for pid in summary['missions'][0]['scores']}
+            self.assertEqual(totals, {str(pid): score for pid, score in gm.cumulative_scores.items()})
+        # sidecars are not traces
+        self.assertEqual(len(find_traces('game_logs')), 2)
+
+    def test_unfinished_game_falls_back_to_trace(self):
+        gm = play_game(5, max_actions=30)
+        path = gm.tracer._trace_save_path
+        self.assertFalse(os.path.exists(summary_path(path)))
+        self.assertIsNone(load_summary(path, fallback=False))
+        summary = load_summary(path)
+        self.assertFalse(summary['finished'])
+        self.assertIsNone(summary['missions'][-1]['score_deltas'])
+        finished = play_game(6)
+        self.assertEqual(
+            [s['finished'] for _, s in iter_summaries('game_logs')],
+            [p == finished.tracer._trace_save_path for p in find_traces('game_logs')],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()